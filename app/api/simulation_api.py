@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, FileResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, validator
+from typing import Optional
 import numpy as np
 import json
 from app.services.simulation_service import SimulationService
+from app.services.scheduler import Saturado
 
 router = APIRouter()
 simulation_service = SimulationService()
@@ -33,6 +36,7 @@ class NightSimulationRequest(BaseModel):
     grueros: int = Field(..., alias="Grueros", gt=0)
     chequeadores: int = Field(..., alias="Chequeadores", gt=0)
     parrilleros: int = Field(..., alias="parrilleros", gt=0)
+    seed: Optional[int] = Field(None, alias="Seed")
 
     class Config:
         populate_by_name = True
@@ -43,20 +47,123 @@ class NightSimulationRequest(BaseModel):
             raise ValueError('Las cajas piqueadas no pueden ser mayores que las facturadas')
         return v
 
+class NightLogRequest(NightSimulationRequest):
+    formato: str = Field("jsonl", alias="Formato")
+    comprimir: bool = Field(True, alias="Comprimir")
+
+    @validator('formato')
+    def validate_formato(cls, v):
+        if v not in ("jsonl", "csv", "bin"):
+            raise ValueError('El formato debe ser jsonl, csv o bin')
+        return v
+
+def _cabecera_costo(estimacion):
+    """Valor de X-Costo-Estimado: mediana y p90 de tiempo (s) y memoria (MB) y el modo elegido."""
+    return (f"wall_s={estimacion['wall_s']:.3f}; wall_s_p90={estimacion['wall_s_p90']:.3f}; "
+            f"memoria_mb={estimacion['memoria_mb']:.1f}; memoria_mb_p90={estimacion['memoria_mb_p90']:.1f}; "
+            f"modo={estimacion['modo']}")
+
+def _cliente(http_request: Request):
+    """Cliente para el reparto justo: cabecera X-Cliente o, si no viene, la IP."""
+    return http_request.headers.get("X-Cliente") or (http_request.client.host if http_request.client else "anonimo")
+
+def _saturado(e, cabeceras=None):
+    """429 con Retry-After para un scheduler.Saturado."""
+    return HTTPException(status_code=429, detail=str(e),
+                         headers=dict(cabeceras or {}, **{"Retry-After": str(e.reintentar_s)}))
+
+def _escenario(request: NightSimulationRequest):
+    return dict(
+        cajas_facturadas=request.cajas_facturadas,
+        cajas_piqueadas=request.cajas_piqueadas,
+        pickers=request.pickers,
+        grueros=request.grueros,
+        chequeadores=request.chequeadores,
+        parrilleros=request.parrilleros,
+    )
+
+async def _turno_simulacion(http_request: Request, escenario):
+    """
+    Admisión de una ruta que siempre simula (sin caché): costo estimado (422 si
+    excede el presupuesto) y turno del planificador (429 si está saturado),
+    devuelto ya con trabajador. Devuelve (turno, cabeceras)
+    """
+    # en un hilo: el primer uso abre el almacén; sin semilla no se busca en la caché
+    estimacion = await run_in_threadpool(simulation_service.estimate_night_cost, **escenario)
+    cabeceras = {"X-Costo-Estimado": _cabecera_costo(estimacion)}
+    if estimacion["modo"] == "rechazar":
+        raise HTTPException(
+            status_code=422,
+            detail="El escenario excede el presupuesto de tiempo o memoria de la simulación",
+            headers=cabeceras
+        )
+    try:
+        turno = simulation_service.reservar_turno(_cliente(http_request), "interactiva")
+    except Saturado as e:
+        raise _saturado(e, cabeceras)
+    await turno.esperar()
+    return turno, cabeceras
+
 @router.post("/simulate")
-async def run_night_simulation(request: NightSimulationRequest):
+async def run_night_simulation(
+    request: NightSimulationRequest,
+    http_request: Request,
+    perfil_memoria: bool = Query(False, description="Perfil de memoria (tracemalloc), guardado con la corrida"),
+):
     """
-    Ejecuta la simulación de noche con los parámetros especificados
+    Ejecuta la simulación de noche con los parámetros especificados.
+
+    Según el costo estimado (cabecera X-Costo-Estimado) corre en el momento,
+    se encola (202, consultar /trabajos/{id}) o se rechaza por exceder el
+    presupuesto (422). Con el planificador o la cola saturados responde 429
+    con Retry-After
     """
+    parametros = dict(
+        cajas_facturadas=request.cajas_facturadas,
+        cajas_piqueadas=request.cajas_piqueadas,
+        pickers=request.pickers,
+        grueros=request.grueros,
+        chequeadores=request.chequeadores,
+        parrilleros=request.parrilleros,
+        seed=request.seed,
+        perfil_memoria=perfil_memoria
+    )
+    # en un hilo: consulta el almacén (SQLite)
+    estimacion = await run_in_threadpool(simulation_service.estimate_night_cost, **parametros)
+    cabeceras = {"X-Costo-Estimado": _cabecera_costo(estimacion)}
+    if estimacion["modo"] == "rechazar":
+        # el escenario en sí es demasiado pesado: reintentar no cambia la respuesta
+        raise HTTPException(
+            status_code=422,
+            detail="El escenario excede el presupuesto de tiempo o memoria de la simulación",
+            headers=cabeceras
+        )
+    cliente = _cliente(http_request)
+    turno = None
     try:
-        result = simulation_service.run_night_simulation(
-            cajas_facturadas=request.cajas_facturadas,
-            cajas_piqueadas=request.cajas_piqueadas,
-            pickers=request.pickers,
-            grueros=request.grueros,
-            chequeadores=request.chequeadores,
-            parrilleros=request.parrilleros
+        if estimacion["modo"] == "cola":
+            trabajo = simulation_service.submit_night_simulation(estimacion=estimacion, cliente=cliente, **parametros)
+        elif not estimacion["desde_cache"]:
+            # sólo lo que hay que simular pasa por la admisión (lo guardado o en curso no ocupa trabajador)
+            turno = simulation_service.reservar_turno(cliente, "interactiva")
+    except Saturado as e:
+        raise _saturado(e, cabeceras)
+    if estimacion["modo"] == "cola":
+        cabeceras["Location"] = f"/api/trabajos/{trabajo['id']}"
+        return JSONResponse(
+            content={"success": True, "data": trabajo, "message": "Simulación encolada"},
+            status_code=202,
+            headers=cabeceras
         )
+
+    try:
+        # el turno se espera en el event loop: los pedidos en cola no ocupan hilos del threadpool
+        if turno is not None:
+            await turno.esperar()
+        # en un hilo: no bloquea el event loop y los pedidos idénticos se agrupan en el servicio
+        # (sin turno, si al final hay que simular el servicio reserva uno)
+        result = await run_in_threadpool(simulation_service.run_night_simulation, turno=turno, cliente=cliente,
+                                         **parametros)
         
         response_data = {
             "success": True,
@@ -69,9 +176,12 @@ async def run_night_simulation(request: NightSimulationRequest):
         
         return JSONResponse(
             content=json.loads(json_str),
-            status_code=200
+            status_code=200,
+            headers=cabeceras
         )
     
+    except Saturado as e:
+        raise _saturado(e, cabeceras)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -82,6 +192,269 @@ async def run_night_simulation(request: NightSimulationRequest):
         }
         raise HTTPException(status_code=500, detail=f"Error en la simulación: {str(e)}")
 
+@router.get("/planificador")
+async def get_scheduler_metrics():
+    """
+    Cola del planificador: profundidad por prioridad, trabajadores ocupados,
+    admitidos/rechazados y tiempos de espera
+    """
+    return {"success": True, "data": simulation_service.scheduler_metrics()}
+
+@router.get("/trabajos/{id_trabajo}")
+async def get_job(id_trabajo: str):
+    """
+    Estado de una simulación encolada; con 'resultado' cuando terminó
+    """
+    try:
+        trabajo = simulation_service.get_job(id_trabajo)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    json_str = json.dumps({"success": True, "data": trabajo}, cls=NumpyEncoder, ensure_ascii=False, default=str)
+    return JSONResponse(content=json.loads(json_str), status_code=200)
+
+@router.post("/simulate/registros")
+async def run_night_simulation_with_logs(request: NightLogRequest, http_request: Request):
+    """
+    Simulación de noche escribiendo los logs de operaciones a disco durante la
+    corrida; la respuesta trae los links de descarga en 'registros_en_disco'.
+    Pasa por el presupuesto de costo (422) y el planificador (429) como /simulate
+    """
+    turno, cabeceras = await _turno_simulacion(http_request, _escenario(request))
+    try:
+        # en un hilo: la simulación y la escritura de los archivos no bloquean el event loop
+        result = await run_in_threadpool(
+            simulation_service.run_night_simulation_con_registros,
+            **_escenario(request),
+            seed=request.seed,
+            formato=request.formato,
+            comprimir=request.comprimir,
+            turno=turno,
+            cliente=_cliente(http_request)
+        )
+        json_str = json.dumps({"success": True, "data": result}, cls=NumpyEncoder, ensure_ascii=False, default=str)
+        return JSONResponse(content=json.loads(json_str), status_code=200, headers=cabeceras)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la simulación: {str(e)}")
+    finally:
+        turno.cerrar()
+
+@router.get("/registros/{id_corrida}/{archivo}")
+async def download_log(id_corrida: str, archivo: str):
+    """
+    Descarga un log volcado por /simulate/registros
+    """
+    try:
+        ruta = simulation_service.ruta_registro(id_corrida, archivo)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    media_type = "application/gzip" if archivo.endswith(".gz") else {
+        "jsonl": "application/x-ndjson", "csv": "text/csv", "bin": "application/octet-stream",
+    }.get(archivo.rsplit(".", 1)[-1], "application/octet-stream")
+    return FileResponse(ruta, media_type=media_type, filename=archivo)
+
+@router.get("/corridas")
+async def list_runs(
+    total_cajas_facturadas: Optional[int] = None,
+    cajas_para_pick: Optional[int] = None,
+    cap_picker: Optional[int] = None,
+    cap_gruero: Optional[int] = None,
+    cap_chequeador: Optional[int] = None,
+    cap_parrillero: Optional[int] = None,
+    seed: Optional[int] = None,
+    desde: Optional[float] = Query(None, description="Creadas desde (epoch, segundos)"),
+    hasta: Optional[float] = Query(None, description="Creadas hasta (epoch, segundos)"),
+    limite: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Corridas guardadas, filtradas por parámetros del escenario y fecha (más recientes primero)
+    """
+    filtros = {k: v for k, v in {
+        "total_cajas_facturadas": total_cajas_facturadas, "cajas_para_pick": cajas_para_pick,
+        "cap_picker": cap_picker, "cap_gruero": cap_gruero, "cap_chequeador": cap_chequeador,
+        "cap_parrillero": cap_parrillero, "seed": seed,
+    }.items() if v is not None}
+    try:
+        # en un hilo: COUNT + SELECT en SQLite y, en el primer uso, la carga del historial en los modelos
+        result = await run_in_threadpool(simulation_service.list_runs, filtros, desde=desde, hasta=hasta,
+                                         limite=limite, offset=offset)
+        return {"success": True, "data": result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la consulta: {str(e)}")
+
+@router.get("/corridas/{id_corrida}")
+async def get_run(id_corrida: str):
+    """
+    Entradas, KPIs y logs disponibles de una corrida guardada
+    """
+    try:
+        # en un hilo: SQLite y, si la corrida es recién guardada, la espera de su escritura de fondo
+        return {"success": True, "data": await run_in_threadpool(simulation_service.get_run, id_corrida)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@router.get("/corridas/{id_corrida}/registros/{coleccion}")
+async def get_run_records(
+    id_corrida: str,
+    coleccion: str,
+    cursor: Optional[str] = Query(None, description="'siguiente' de la página anterior"),
+    limite: int = Query(100, ge=1, le=1000),
+    orden: str = Query("asc", pattern="^(asc|desc)$"),
+    vuelta: Optional[int] = None,
+    camion_id: Optional[str] = None,
+    label: Optional[str] = None,
+    t_desde: Optional[float] = Query(None, description="Minutos desde el inicio del turno"),
+    t_hasta: Optional[float] = Query(None, description="Minutos desde el inicio del turno"),
+):
+    """
+    Página ordenada por tiempo de timeline, centro_eventos, grua_operaciones o
+    cronograma_dia de una corrida guardada, con cursor y filtros
+    """
+    try:
+        # en un hilo, como get_run
+        result = await run_in_threadpool(
+            simulation_service.get_run_records, id_corrida, coleccion, cursor=cursor, limite=limite, orden=orden,
+            vuelta=vuelta, camion=camion_id, label=label, t_desde=t_desde, t_hasta=t_hasta
+        )
+        return {"success": True, "data": result}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/corridas/{id_corrida}/perfil_memoria")
+async def get_run_memory_profile(id_corrida: str):
+    """
+    Perfil de memoria de una corrida simulada con ?perfil_memoria=true: pico
+    total y por fase, memoria por módulo del motor y sitios de asignación más pesados
+    """
+    try:
+        # en un hilo, como get_run
+        return {"success": True, "data": await run_in_threadpool(simulation_service.get_run_memory_profile,
+                                                                 id_corrida)}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+@router.get("/corridas/{id_corrida}/lod")
+async def get_run_lod(
+    id_corrida: str,
+    ancho_min: float = Query(15, gt=0, description="Ancho de cada bucket, en minutos"),
+    t_desde: Optional[float] = Query(None, description="Minutos desde el inicio del turno"),
+    t_hasta: Optional[float] = Query(None, description="Minutos desde el inicio del turno"),
+    recursos: Optional[str] = Query(None, description="Recursos separados por coma (por defecto, todos)"),
+):
+    """
+    Ocupación, usuarios y cola de grúa, chequeo, picking y patio de una corrida
+    guardada, agregados en buckets de 'ancho_min' para gráficos
+    """
+    try:
+        # en un hilo, como get_run: además lee la pirámide del disco
+        result = await run_in_threadpool(
+            simulation_service.get_run_lod, id_corrida, ancho_min, t_desde=t_desde, t_hasta=t_hasta,
+            recursos=[r.strip() for r in recursos.split(",") if r.strip()] if recursos else None
+        )
+        return {"success": True, "data": result}
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/debug/perfil")
+async def profile_night_simulation(request: NightSimulationRequest, http_request: Request):
+    """
+    Perfil de la simulación de noche: tiempo de pared, eventos y tiempo simulado por tipo de proceso.
+    Pasa por el presupuesto de costo (422) y el planificador (429) como /simulate
+    """
+    turno, _ = await _turno_simulacion(http_request, _escenario(request))
+    try:
+        # en un hilo: la simulación perfilada no bloquea el event loop
+        result = await run_in_threadpool(
+            simulation_service.profile_night_simulation,
+            **_escenario(request),
+            seed=request.seed,
+            turno=turno,
+            cliente=_cliente(http_request)
+        )
+        return {"success": True, "data": result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en el perfil: {str(e)}")
+    finally:
+        turno.cerrar()
+
+@router.post("/what-if")
+async def run_what_if(request: NightSimulationRequest, http_request: Request):
+    """
+    Estimación instantánea de KPIs con el metamodelo (fallback a simulación,
+    que pasa por el presupuesto de costo y el planificador como /simulate)
+    """
+    escenario = _escenario(request)
+    try:
+        # en un hilo: el primer uso abre el almacén y carga el historial en el metamodelo
+        result = await run_in_threadpool(simulation_service.predict_what_if, **escenario, solo_sustituto=True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la estimación: {str(e)}")
+    if result is not None:
+        return {"success": True, "data": result}
+
+    # el metamodelo no alcanza: la simulación real necesita turno
+    turno, _ = await _turno_simulacion(http_request, escenario)
+    try:
+        result = await run_in_threadpool(simulation_service.predict_what_if, **escenario, turno=turno,
+                                         cliente=_cliente(http_request))
+        return {"success": True, "data": result}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la estimación: {str(e)}")
+    finally:
+        turno.cerrar()
+
+@router.post("/preview/noche")
+async def preview_night_plan(request: NightSimulationRequest):
+    """
+    Planificación del turno noche (vueltas/camiones) sin ejecutar la simulación
+    """
+    try:
+        result = simulation_service.preview_night_plan(
+            cajas_facturadas=request.cajas_facturadas,
+            cajas_piqueadas=request.cajas_piqueadas,
+            seed=request.seed
+        )
+        json_str = json.dumps({"success": True, "data": result}, cls=NumpyEncoder, ensure_ascii=False, default=str)
+        return JSONResponse(content=json.loads(json_str), status_code=200)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la planificación: {str(e)}")
+
+@router.post("/preview/analitico")
+async def preview_analytic_loads(request: NightSimulationRequest):
+    """
+    Pre-estimación analítica de cargas de recursos (sin simular)
+    """
+    try:
+        result = simulation_service.preview_night_loads(
+            cajas_facturadas=request.cajas_facturadas,
+            cajas_piqueadas=request.cajas_piqueadas,
+            pickers=request.pickers,
+            grueros=request.grueros,
+            chequeadores=request.chequeadores,
+            parrilleros=request.parrilleros,
+            seed=request.seed
+        )
+        json_str = json.dumps({"success": True, "data": result}, cls=NumpyEncoder, ensure_ascii=False, default=str)
+        return JSONResponse(content=json.loads(json_str), status_code=200)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la estimación: {str(e)}")
+
 @router.get("/test")
 async def test_endpoint():
     """Endpoint de prueba"""
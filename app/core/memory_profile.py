@@ -0,0 +1,140 @@
+# app/core/memory_profile.py
+"""
+Perfil de memoria (tracemalloc) de un pedido de simulación, a pedido.
+
+    with PerfilMemoria() as perfil:
+        resultado = simular(...)               # el motor anota el pico por sección
+        perfil.picos_motor(resultado)
+        with perfil.fase("serializacion"):
+            serializable = convertir(resultado)
+        perfil.captura()                       # memoria viva por módulo que la asignó
+    perfil.resumen()
+
+- Pico total y pico por fase: las secciones del motor (seccion() en
+  instrumentation guarda el pico de cada una) más las fases del servicio.
+- Memoria viva al capturar (con el resultado crudo y el serializado todavía
+  en memoria) agrupada por módulo: cada bloque se atribuye al frame más
+  reciente de la app (night/centro.py, night/planning.py, night/metrics.py,
+  night/reporting.py, ...; lo asignado por el servicio cuenta como
+  'serializacion') y se listan los sitios (archivo:línea) más pesados.
+
+tracemalloc es global al proceso: un solo perfil a la vez (los demás
+esperan) y lo que asignen otros pedidos concurrentes también se cuenta.
+Con tracemalloc la simulación corre varias veces más lenta.
+"""
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from functools import lru_cache
+
+MB = 1024.0 * 1024.0
+_APP = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# módulos que se informan con otro nombre
+ALIAS_MODULOS = {"services/simulation_service.py": "serializacion"}
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def _relativo(archivo):
+    """Ruta del archivo relativa a la app (sin 'simulations/'), o None si es de afuera."""
+    # normpath: con sys.path relativo los frames traen rutas como test/../app/...
+    archivo = os.path.normpath(os.path.abspath(archivo))
+    if not archivo.startswith(_APP + os.sep) or archivo.endswith("memory_profile.py"):
+        return None
+    relativo = os.path.relpath(archivo, _APP).replace(os.sep, "/")
+    return relativo[len("simulations/"):] if relativo.startswith("simulations/") else relativo
+
+
+def _modulo(traceback):
+    """(módulo, sitio) del frame más reciente dentro de la app; ('otros', None) si no hay."""
+    for frame in reversed(traceback):
+        relativo = _relativo(frame.filename)
+        if relativo is not None:
+            return ALIAS_MODULOS.get(relativo, relativo), f"{relativo}:{frame.lineno}"
+    return "otros", None
+
+
+class PerfilMemoria:
+
+    def __init__(self, frames=25, top=15):
+        self.frames = int(frames)
+        self.top = int(top)
+        self.fases = {}
+        self._inicio = 0
+        self._pico = 0
+        self._snapshot = None
+        self._inicio_propio = False
+
+    def __enter__(self):
+        _lock.acquire()
+        self._inicio_propio = not tracemalloc.is_tracing()
+        if self._inicio_propio:
+            tracemalloc.start(self.frames)
+        tracemalloc.reset_peak()
+        self._inicio = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self._actualizar_pico()
+            if self._inicio_propio:
+                tracemalloc.stop()
+        finally:
+            _lock.release()
+        return False
+
+    def _actualizar_pico(self, pico=None):
+        if pico is None:
+            pico = tracemalloc.get_traced_memory()[1]
+        self._pico = max(self._pico, pico)
+
+    @contextmanager
+    def fase(self, nombre):
+        """Pico de memoria trazada dentro del bloque."""
+        self._actualizar_pico()
+        tracemalloc.reset_peak()
+        try:
+            yield
+        finally:
+            pico = tracemalloc.get_traced_memory()[1]
+            self.fases[nombre] = max(self.fases.get(nombre, 0), pico)
+            self._actualizar_pico(pico)
+
+    def picos_motor(self, resultado):
+        """Suma al perfil los picos por sección que anotó el motor."""
+        for seccion, pico in (resultado.get("secciones_memoria_pico_bytes") or {}).items():
+            self.fases[seccion] = max(self.fases.get(seccion, 0), pico)
+            self._actualizar_pico(pico)
+
+    def captura(self):
+        """Snapshot de la memoria viva ahora (para agruparla por módulo)."""
+        self._actualizar_pico()
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def resumen(self):
+        modulos, sitios = {}, {}
+        if self._snapshot is not None:
+            for traza in self._snapshot.traces:
+                modulo, sitio = _modulo(traza.traceback)
+                m = modulos.setdefault(modulo, {"bytes": 0, "bloques": 0})
+                m["bytes"] += traza.size
+                m["bloques"] += 1
+                if sitio is not None:
+                    s = sitios.setdefault(sitio, {"sitio": sitio, "modulo": modulo, "bytes": 0, "bloques": 0})
+                    s["bytes"] += traza.size
+                    s["bloques"] += 1
+        total = sum(m["bytes"] for m in modulos.values()) or 1
+        return {
+            "pico_mb": self._pico / MB,
+            "inicio_mb": self._inicio / MB,
+            "fases_pico_mb": {f: p / MB for f, p in sorted(self.fases.items(), key=lambda kv: -kv[1])},
+            "modulos": {k: {"mb": m["bytes"] / MB, "bloques": m["bloques"], "pct": 100.0 * m["bytes"] / total}
+                        for k, m in sorted(modulos.items(), key=lambda kv: -kv[1]["bytes"])},
+            "top_sitios": [{"sitio": s["sitio"], "modulo": s["modulo"], "mb": s["bytes"] / MB, "bloques": s["bloques"]}
+                           for s in sorted(sitios.values(), key=lambda s: -s["bytes"])[:self.top]],
+        }
+
+
+__all__ = ["PerfilMemoria", "ALIAS_MODULOS"]
@@ -0,0 +1,218 @@
+# app/core/metrics.py
+"""
+Métricas operativas en proceso, expuestas en formato de texto de Prometheus
+(GET /metrics). Sin dependencias ni servicios externos.
+
+- Contador: sólo sube (inc).
+- Medidor: valor instantáneo (set/inc) o calculado al exponer (funcion ->
+  {etiquetas: valor}), p.ej. la profundidad de cola del planificador.
+- Histograma: cubetas acumuladas + suma + cantidad (observe).
+
+Cada métrica se registra una vez en un RegistroMetricas (REGISTRO es el del
+proceso); las etiquetas se pasan como kwargs en el orden declarado.
+"""
+import math
+import sys
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# cubetas por defecto (segundos), como las de los clientes de Prometheus
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _valor(v):
+    if isinstance(v, int):
+        return str(int(v))
+    v = float(v)
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if math.isnan(v):
+        return "NaN"
+    return repr(v)
+
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = list(zip(nombres, valores)) + list(extra)
+    if not pares:
+        return ""
+    escapar = lambda s: str(s).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in pares) + "}"
+
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _clave(self, etiquetas):
+        if set(etiquetas) != set(self.etiquetas):
+            raise ValueError(f"{self.nombre}: etiquetas {sorted(etiquetas)} (se esperaban {list(self.etiquetas)})")
+        return tuple(str(etiquetas[k]) for k in self.etiquetas)
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        lineas.extend(self._muestras())
+        return lineas
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor=1.0, **etiquetas):
+        if valor < 0:
+            raise ValueError("Un contador no puede bajar")
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0.0) + valor
+
+    def valor(self, **etiquetas):
+        return self._series.get(self._clave(etiquetas), 0.0)
+
+    def _muestras(self):
+        with self._lock:
+            series = sorted(self._series.items())
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {_valor(v)}" for k, v in series]
+
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), funcion=None):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.funcion = funcion
+
+    def set(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = float(valor)
+
+    def inc(self, valor=1.0, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0.0) + valor
+
+    def _muestras(self):
+        if self.funcion is not None:
+            valores = self.funcion()
+            # sin etiquetas la función puede devolver el número directamente
+            series = {(): valores} if not isinstance(valores, dict) else \
+                {tuple(str(x) for x in (k if isinstance(k, tuple) else (k,))): v for k, v in valores.items()}
+        else:
+            with self._lock:
+                series = dict(self._series)
+        return [f"{self.nombre}{_etiquetas(self.etiquetas, k)} {_valor(v)}" for k, v in sorted(series.items())]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(sorted(float(c) for c in cubetas))
+
+    def observe(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {"cuentas": [0] * len(self.cubetas), "suma": 0.0, "n": 0}
+            for i, limite in enumerate(self.cubetas):
+                if valor <= limite:
+                    serie["cuentas"][i] += 1
+                    break
+            serie["suma"] += valor
+            serie["n"] += 1
+
+    def _muestras(self):
+        with self._lock:
+            series = sorted((k, {"cuentas": list(s["cuentas"]), "suma": s["suma"], "n": s["n"]})
+                            for k, s in self._series.items())
+        lineas = []
+        for clave, s in series:
+            acumulado = 0
+            for limite, cuenta in zip(self.cubetas, s["cuentas"]):
+                acumulado += cuenta
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, [('le', _valor(limite))])} "
+                              f"{acumulado}")
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, clave, [('le', '+Inf')])} {s['n']}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_valor(s['suma'])}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {s['n']}")
+        return lineas
+
+
+class RegistroMetricas:
+    """Métricas por nombre; pedir dos veces la misma devuelve la ya registrada."""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _obtener(self, clase, nombre, ayuda, etiquetas=(), **kwargs):
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, ayuda, etiquetas, **kwargs)
+            elif not isinstance(metrica, clase) or metrica.etiquetas != tuple(etiquetas):
+                raise ValueError(f"La métrica {nombre!r} ya está registrada con otro tipo o etiquetas")
+            return metrica
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre, ayuda, etiquetas=(), funcion=None):
+        medidor = self._obtener(Medidor, nombre, ayuda, etiquetas)
+        if funcion is not None:
+            medidor.funcion = funcion
+        return medidor
+
+    def histograma(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+        return self._obtener(Histograma, nombre, ayuda, etiquetas, cubetas=cubetas)
+
+    def exponer(self):
+        """Todas las métricas en formato de texto de Prometheus."""
+        with self._lock:
+            metricas = [self._metricas[n] for n in sorted(self._metricas)]
+        lineas = []
+        for m in metricas:
+            lineas.extend(m.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = RegistroMetricas()
+
+
+def leer_rss_pico():
+    """Pico de RSS del proceso en bytes (VmHWM en Linux, ru_maxrss en otros) o None."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for linea in f:
+                if linea.startswith("VmHWM:"):
+                    return int(linea.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb if sys.platform == "darwin" else kb * 1024
+
+
+def reiniciar_rss_pico():
+    """Reinicia el pico de RSS del proceso (Linux >= 4.0); False si no se puede."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+__all__ = ["RegistroMetricas", "Contador", "Medidor", "Histograma", "REGISTRO", "CONTENT_TYPE",
+           "CUBETAS_SEGUNDOS", "leer_rss_pico", "reiniciar_rss_pico"]
@@ -1,6 +1,8 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import simulation_api
+from app.core.metrics import REGISTRO, CONTENT_TYPE
 
 app = FastAPI(title="SimuCD Backend", version="1.0.0")
 
@@ -13,9 +15,31 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+LATENCIA_HTTP = REGISTRO.histograma(
+    "simucd_http_request_duration_seconds", "Latencia de los pedidos HTTP por endpoint",
+    ("metodo", "ruta", "estado"))
+
+@app.middleware("http")
+async def medir_latencia(request: Request, call_next):
+    t0 = time.perf_counter()
+    estado = 500
+    try:
+        respuesta = await call_next(request)
+        estado = respuesta.status_code
+        return respuesta
+    finally:
+        # plantilla de la ruta (no la URL) para no abrir una serie por id
+        ruta = getattr(request.scope.get("route"), "path", "sin_ruta")
+        LATENCIA_HTTP.observe(time.perf_counter() - t0, metodo=request.method, ruta=ruta, estado=estado)
+
 # Incluir routers
 app.include_router(simulation_api.router, prefix="/api", tags=["simulation"])
 
 @app.get("/")
 def read_root():
-    return {"message": "SimuCD Backend API"}
\ No newline at end of file
+    return {"message": "SimuCD Backend API"}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas del proceso en formato de texto de Prometheus"""
+    return Response(content=REGISTRO.exponer(), headers={"Content-Type": CONTENT_TYPE})
@@ -0,0 +1,137 @@
+# app/services/cost_model.py
+"""
+Modelo de costo de una simulación de noche: tiempo de pared y memoria
+estimados a partir de las entradas, antes de correrla.
+
+Regresión log-log (ridge) sobre log(cajas facturadas), la fracción
+piqueada y log de cada dotación:
+
+    log(costo) = b0 + b1·log(cajas) + b2·fracción_pick + Σ bi·log(cap_i)
+
+La regularización tira hacia PRIOR (costo ~ lineal en cajas, dotación
+neutra), así que sin datos el modelo ya da un orden de magnitud y con pocas
+observaciones no se desborda. Se alimenta con los casos de noche del
+benchmark (benchmarks/bench_motores.py: wall_s, tracemalloc_pico_mb) y con el
+tiempo de pared de cada corrida guardada.
+
+estimar() devuelve la mediana y el percentil 90 (con el desvío de los
+residuos); decidir() compara el p90 con los PRESUPUESTOS: 'inline' si es
+barato, 'cola' si entra en el presupuesto pero no conviene hacer esperar
+la respuesta, 'rechazar' si lo excede.
+"""
+import json
+import threading
+
+import numpy as np
+
+from app.simulations.night.config import DEFAULT_CONFIG
+
+DOTACIONES = ("cap_picker", "cap_gruero", "cap_chequeador", "cap_parrillero")
+METRICAS = ("wall_s", "memoria_mb")
+
+# coeficientes a priori [b0, log cajas, fracción pick, log caps...] y desvío de log(costo)
+PRIOR = {
+    "wall_s": (np.array([np.log(4e-6), 1.0, 0.0] + [0.0] * len(DOTACIONES)), 0.7),
+    "memoria_mb": (np.array([-2.9, 0.38, 0.0] + [0.0] * len(DOTACIONES)), 0.7),
+}
+Z_P90 = 1.2816
+
+# segundos / MB; se pisan con SIMUCD_INLINE_MAX_S, SIMUCD_MAX_S y SIMUCD_MAX_MB
+PRESUPUESTOS_DEFECTO = {"inline_max_s": 2.0, "max_s": 600.0, "max_mb": 2048.0}
+
+
+def _vector(entradas):
+    cajas = max(float(entradas.get("total_cajas_facturadas") or 0), 1.0)
+    pick = float(entradas.get("cajas_para_pick", cajas) or 0)
+    caps = [np.log(max(float(entradas.get(k, DEFAULT_CONFIG.get(k, 1)) or 1), 1.0)) for k in DOTACIONES]
+    return np.array([1.0, np.log(cajas), min(pick / cajas, 1.0)] + caps)
+
+
+class ModeloCosto:
+    """
+    Estimador de costo por métrica (METRICAS).
+
+    - regularizacion: peso del PRIOR frente a las observaciones.
+    - max_observaciones: por métrica, se conservan las más recientes.
+    """
+    def __init__(self, regularizacion=2.0, max_observaciones=2000):
+        self.regularizacion = regularizacion
+        self.max_observaciones = max_observaciones
+        self._obs = {m: [] for m in METRICAS}      # métrica -> [(x, log valor)]
+        self._ajuste = {}                          # métrica -> (coeficientes, desvío)
+        self._lock = threading.Lock()
+
+    def n_observaciones(self, metrica="wall_s"):
+        return len(self._obs[metrica])
+
+    def agregar(self, entradas, wall_s=None, memoria_mb=None):
+        x = _vector(entradas)
+        with self._lock:
+            for metrica, valor in (("wall_s", wall_s), ("memoria_mb", memoria_mb)):
+                if valor is None or not valor > 0:
+                    continue
+                obs = self._obs[metrica]
+                obs.append((x, float(np.log(valor))))
+                if len(obs) > self.max_observaciones:
+                    del obs[0]
+                self._ajuste.pop(metrica, None)
+
+    def cargar_benchmark(self, ruta):
+        """Agrega los casos de noche de un resultados.json del benchmark; devuelve cuántos."""
+        with open(ruta, "r", encoding="utf-8") as f:
+            casos = json.load(f).get("casos", [])
+        n = 0
+        for c in casos:
+            if c.get("motor") != "noche":
+                continue
+            entradas = c.get("entradas") or {"total_cajas_facturadas": c["cajas"],
+                                              "cajas_para_pick": int(c["cajas"] * 0.9)}
+            self.agregar(entradas, wall_s=c.get("wall_s"), memoria_mb=c.get("tracemalloc_pico_mb"))
+            n += 1
+        return n
+
+    def _ajustar(self, metrica):
+        ajuste = self._ajuste.get(metrica)
+        if ajuste is not None:
+            return ajuste
+        b0, s0 = PRIOR[metrica]
+        obs = self._obs[metrica]
+        if not obs:
+            ajuste = (b0, s0)
+        else:
+            X = np.array([x for x, _ in obs])
+            y = np.array([v for _, v in obs])
+            lam = self.regularizacion * np.eye(len(b0))
+            beta = np.linalg.solve(X.T @ X + lam, X.T @ y + lam @ b0)
+            residuos = y - X @ beta
+            # con pocas observaciones el desvío a priori pesa más
+            desvio = np.sqrt((residuos @ residuos + s0 ** 2 * len(b0)) / (len(y) + len(b0)))
+            ajuste = (beta, float(desvio))
+        self._ajuste[metrica] = ajuste
+        return ajuste
+
+    def estimar(self, entradas):
+        """{"wall_s", "wall_s_p90", "memoria_mb", "memoria_mb_p90", "observaciones"} para 'entradas'."""
+        x = _vector(entradas)
+        out = {}
+        with self._lock:
+            for metrica in METRICAS:
+                beta, desvio = self._ajustar(metrica)
+                mu = float(x @ beta)
+                out[metrica] = float(np.exp(mu))
+                out[f"{metrica}_p90"] = float(np.exp(mu + Z_P90 * desvio))
+            out["observaciones"] = len(self._obs["wall_s"])
+        return out
+
+    @staticmethod
+    def decidir(estimacion, presupuestos=None):
+        """'inline', 'cola' o 'rechazar' según el p90 estimado y los presupuestos."""
+        p = dict(PRESUPUESTOS_DEFECTO, **(presupuestos or {}))
+        if estimacion["wall_s_p90"] > p["max_s"] or estimacion["memoria_mb_p90"] > p["max_mb"]:
+            return "rechazar"
+        if estimacion["wall_s_p90"] > p["inline_max_s"]:
+            return "cola"
+        return "inline"
+
+
+__all__ = ["ModeloCosto", "PRESUPUESTOS_DEFECTO"]
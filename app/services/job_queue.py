@@ -0,0 +1,80 @@
+# app/services/job_queue.py
+"""
+Cola de trabajos en proceso para simulaciones pesadas.
+
+enviar() encola una función en un pool de 'trabajadores' hilos y devuelve
+el trabajo; la respuesta HTTP sale enseguida (202) y el cliente consulta
+estado() hasta que el trabajo termina. A lo sumo 'max_pendientes' trabajos
+sin terminar (en cola o corriendo): con la cola llena enviar() lanza
+scheduler.Saturado. Se guardan los últimos 'max_terminados' trabajos
+terminados (con su resultado o error).
+"""
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.scheduler import Saturado
+
+
+class ColaTrabajos:
+
+    def __init__(self, trabajadores=1, max_pendientes=32, max_terminados=200):
+        self.trabajadores = max(1, int(trabajadores))
+        self._pool = ThreadPoolExecutor(max_workers=self.trabajadores, thread_name_prefix="simucd-trabajo")
+        self.max_pendientes = int(max_pendientes)
+        self.max_terminados = max_terminados
+        self._trabajos = OrderedDict()
+        self._n_pendientes = 0
+        self._lock = threading.Lock()
+
+    def enviar(self, funcion, *args, info=None, **kwargs):
+        """Encola funcion(*args, **kwargs); devuelve el estado inicial del trabajo. Saturado si la cola está llena."""
+        trabajo = {"id": uuid.uuid4().hex[:12], "estado": "en_cola", "creado": time.time(),
+                   "inicio": None, "fin": None, "info": info or {}, "resultado": None, "error": None}
+        with self._lock:
+            if self._n_pendientes >= self.max_pendientes:
+                raise Saturado("Demasiados trabajos encolados",
+                               max(1, math.ceil(self._n_pendientes / self.trabajadores)))
+            self._trabajos[trabajo["id"]] = trabajo
+            self._n_pendientes += 1
+        self._pool.submit(self._correr, trabajo, funcion, args, kwargs)
+        return self._vista(trabajo)
+
+    def _correr(self, trabajo, funcion, args, kwargs):
+        trabajo.update(estado="corriendo", inicio=time.time())
+        try:
+            trabajo["resultado"] = funcion(*args, **kwargs)
+            trabajo["estado"] = "terminado"
+        except Exception as e:
+            trabajo.update(estado="error", error=str(e))
+        trabajo["fin"] = time.time()
+        with self._lock:
+            self._n_pendientes -= 1
+            terminados = [k for k, t in self._trabajos.items() if t["fin"] is not None]
+            for k in terminados[:max(0, len(terminados) - self.max_terminados)]:
+                del self._trabajos[k]
+
+    def pendientes(self):
+        with self._lock:
+            return self._n_pendientes
+
+    def estado(self, id_trabajo):
+        """Estado del trabajo (con 'resultado' si terminó); KeyError si no existe."""
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+        if trabajo is None:
+            raise KeyError(f"Trabajo no encontrado: {id_trabajo}")
+        return self._vista(trabajo, con_resultado=True)
+
+    @staticmethod
+    def _vista(trabajo, con_resultado=False):
+        vista = {k: v for k, v in trabajo.items() if k != "resultado"}
+        if con_resultado and trabajo["estado"] == "terminado":
+            vista["resultado"] = trabajo["resultado"]
+        return vista
+
+
+__all__ = ["ColaTrabajos"]
@@ -0,0 +1,449 @@
+# app/services/run_store.py
+"""
+Almacén local de corridas (SQLite, sólo biblioteca estándar).
+
+Cada corrida guarda en la tabla 'corridas' las entradas del escenario (una
+columna indexada por parámetro), la huella de la configuración, la semilla,
+la fecha y los KPIs; el detalle va a disco en <directorio>/<id>/:
+
+- resultado.json.gz: el resultado serializable sin las colecciones grandes.
+- lod/: pirámide de niveles de detalle de la actividad de los recursos
+  (lod.py), si la corrida trajo series de monitoreo; lod() la consulta.
+
+Las colecciones de COLECCIONES (timeline, centro_eventos, grua_operaciones,
+cronograma_dia) van a la tabla 'registros', una fila por elemento con su
+tiempo, vuelta, camión y etiqueta extraídos e índices (corrida, colección,
+[filtro,] t, seq). pagina() recorre una colección con cursor (keyset sobre
+(t, seq)), filtros y orden por tiempo: cada página cuesta O(página) y no
+O(corrida).
+
+Usos: consultar corridas pasadas por parámetros/fechas (buscar), devolver
+una corrida ya hecha con la misma configuración, semilla y versión del
+motor (buscar_cache) y alimentar el metamodelo what-if con el historial
+(cargar_en_sustituto).
+
+Retención: con max_corridas y/o max_dias, cada guardar() poda (podar) las
+corridas más viejas, con su detalle en disco.
+
+Con escritura_en_fondo, guardar() sólo inserta la fila de 'corridas' (ya
+sirve para buscar y como caché) y deja el detalle, los registros (un
+executemany por colección en una sola transacción) y la poda a un hilo
+escritor; las lecturas del detalle de una corrida pendiente esperan a que
+termine de escribirse (esperar_escrituras() espera todo).
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.simulations.night.config import VERSION_MOTOR
+from app.simulations.lod import abrir_piramide, construir_piramide, consultar_piramide, guardar_piramide
+from app.simulations.sweep import kpis_noche
+
+# parámetros del escenario: columnas indexadas, filtrables en buscar()
+PARAMETROS = (
+    "total_cajas_facturadas", "cajas_para_pick",
+    "cap_picker", "cap_gruero", "cap_chequeador", "cap_parrillero",
+)
+
+
+def _meta(clave):
+    return lambda r: (r.get("metadata") or {}).get(clave)
+
+
+# colección -> (t, vuelta, camión, etiqueta): extractores de las columnas indexadas.
+# cronograma_dia sólo trae HH:MM: su 't' es la posición (ya viene ordenado por inicio).
+COLECCIONES = {
+    "timeline": (lambda r, i: r.get("tiempo_min"), _meta("vuelta"), _meta("camion_id"), lambda r: r.get("tipo")),
+    "centro_eventos": (lambda r, i: r.get("inicio_min"), lambda r: r.get("vuelta"),
+                       lambda r: r.get("camion_id"), lambda r: r.get("modo")),
+    "grua_operaciones": (lambda r, i: r.get("start"), lambda r: r.get("vuelta"),
+                         lambda r: r.get("camion"), lambda r: r.get("label")),
+    "cronograma_dia": (lambda r, i: i, lambda r: None, lambda r: r.get("camion"), lambda r: None),
+}
+SIN_TIEMPO = {"cronograma_dia"}
+FILTROS_REGISTROS = ("vuelta", "camion", "label")
+
+_ESQUEMA = f"""
+CREATE TABLE IF NOT EXISTS corridas (
+    id TEXT PRIMARY KEY,
+    creada REAL NOT NULL,
+    tipo TEXT NOT NULL,
+    {", ".join(f"{p} INTEGER" for p in PARAMETROS)},
+    seed INTEGER,
+    huella_cfg TEXT NOT NULL,
+    cfg_json TEXT NOT NULL,
+    kpis_json TEXT NOT NULL,
+    logs_json TEXT NOT NULL,
+    ruta_detalle TEXT NOT NULL,
+    wall_s REAL,
+    memoria_mb REAL
+);
+CREATE INDEX IF NOT EXISTS idx_corridas_escenario ON corridas (tipo, {", ".join(PARAMETROS)});
+CREATE INDEX IF NOT EXISTS idx_corridas_cache ON corridas (huella_cfg, seed);
+CREATE INDEX IF NOT EXISTS idx_corridas_creada ON corridas (creada);
+CREATE TABLE IF NOT EXISTS registros (
+    corrida_id TEXT NOT NULL,
+    coleccion TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    t REAL NOT NULL,
+    vuelta INTEGER,
+    camion TEXT,
+    label TEXT,
+    datos TEXT NOT NULL,
+    PRIMARY KEY (corrida_id, coleccion, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_registros_t ON registros (corrida_id, coleccion, t, seq);
+{"".join(f"CREATE INDEX IF NOT EXISTS idx_registros_{c} ON registros (corrida_id, coleccion, {c}, t, seq);"
+         for c in FILTROS_REGISTROS)}
+"""
+
+# columnas agregadas después de la primera versión del esquema: se suman a bases existentes
+_COLUMNAS_NUEVAS = {"wall_s": "REAL", "memoria_mb": "REAL"}
+
+
+def huella_cfg(cfg):
+    """sha1 de la configuración (claves ordenadas) y de la versión del motor."""
+    clave = {"version_motor": VERSION_MOTOR, "cfg": cfg}
+    return hashlib.sha1(json.dumps(clave, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _cursor(t, seq):
+    return base64.urlsafe_b64encode(json.dumps([t, seq]).encode()).decode().rstrip("=")
+
+
+def _leer_cursor(cursor):
+    try:
+        t, seq = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(t), int(seq)
+    except (ValueError, TypeError):
+        raise ValueError(f"Cursor inválido: {cursor!r}")
+
+
+def _fila(row):
+    return {"id": row["id"], "creada": row["creada"], "tipo": row["tipo"], "seed": row["seed"],
+            "huella_cfg": row["huella_cfg"], "entradas": {p: row[p] for p in PARAMETROS},
+            "kpis": json.loads(row["kpis_json"]), "logs": json.loads(row["logs_json"]),
+            "costo": {"wall_s": row["wall_s"], "memoria_mb": row["memoria_mb"]}}
+
+
+class AlmacenCorridas:
+    """
+    Corridas guardadas en 'ruta_db' (SQLite) + detalle comprimido en 'directorio_detalle'.
+    max_corridas / max_dias: retención (None: sin límite).
+    escritura_en_fondo: detalle, registros y poda en un hilo escritor.
+    """
+
+    def __init__(self, ruta_db, directorio_detalle=None, max_corridas=None, max_dias=None,
+                 escritura_en_fondo=False):
+        self.ruta_db = str(ruta_db)
+        self.max_corridas = max_corridas
+        self.max_dias = max_dias
+        self.escritura_en_fondo = escritura_en_fondo
+        self._escritor = None
+        self._pendientes = {}            # id -> Future de la escritura del detalle
+        self._pendientes_lock = threading.Lock()
+        self.directorio_detalle = directorio_detalle or os.path.join(os.path.dirname(self.ruta_db) or ".", "corridas")
+        os.makedirs(os.path.dirname(self.ruta_db) or ".", exist_ok=True)
+        os.makedirs(self.directorio_detalle, exist_ok=True)
+        with self._conectar() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_ESQUEMA)
+            existentes = {row["name"] for row in con.execute("PRAGMA table_info(corridas)")}
+            for columna, tipo_sql in _COLUMNAS_NUEVAS.items():
+                if columna not in existentes:
+                    con.execute(f"ALTER TABLE corridas ADD COLUMN {columna} {tipo_sql}")
+
+    @contextmanager
+    def _conectar(self):
+        # una conexión por operación: el servicio se usa desde varios hilos
+        con = sqlite3.connect(self.ruta_db, timeout=30)
+        con.row_factory = sqlite3.Row
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    # ---- Escritura ----------------------------------------------------------------
+    def guardar(self, entradas, cfg, resultado, seed=None, tipo="noche", kpis=None, series=None, costo=None):
+        """
+        Guarda una corrida ya serializable (tipos nativos); devuelve su id.
+        'kpis' por defecto: sweep.kpis_noche(resultado). 'series': {recurso: serie}
+        de monitoreo (lod.separar_series) para precalcular la pirámide LOD.
+        'costo': {"wall_s", "memoria_mb"} medidos, para el modelo de costo.
+        """
+        id_corrida = uuid.uuid4().hex[:12]
+        destino = os.path.join(self.directorio_detalle, id_corrida)
+        logs = {c: len(resultado[c]) for c in COLECCIONES if resultado.get(c)}
+        kpis = kpis_noche(resultado) if kpis is None else kpis
+        costo = costo or {}
+        columnas = ["id", "creada", "tipo", *PARAMETROS, "seed", "huella_cfg", "cfg_json",
+                    "kpis_json", "logs_json", "ruta_detalle", "wall_s", "memoria_mb"]
+        valores = [id_corrida, time.time(), tipo, *[entradas.get(p) for p in PARAMETROS], seed,
+                   huella_cfg(cfg), json.dumps(cfg, sort_keys=True, default=str),
+                   json.dumps(kpis), json.dumps(logs), destino, costo.get("wall_s"), costo.get("memoria_mb")]
+        with self._conectar() as con:
+            con.execute(f"INSERT INTO corridas ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+                        valores)
+
+        if not self.escritura_en_fondo:
+            self._escribir_detalle(id_corrida, destino, resultado, series)
+            self._podar_si_hay_retencion()
+            return id_corrida
+        # copia del primer nivel: quien llamó puede seguir agregando claves al resultado
+        resultado = dict(resultado)
+        with self._pendientes_lock:
+            if self._escritor is None:
+                self._escritor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simucd-almacen")
+            futuro = self._pendientes[id_corrida] = self._escritor.submit(
+                self._escribir_detalle, id_corrida, destino, resultado, series)
+            self._escritor.submit(self._podar_si_hay_retencion)
+        futuro.add_done_callback(lambda _: self._quitar_pendiente(id_corrida))
+        return id_corrida
+
+    def _escribir_detalle(self, id_corrida, destino, resultado, series):
+        """
+        resultado.json.gz, pirámide LOD y registros (una transacción) de una
+        corrida ya insertada; si falla, la corrida se borra (no queda a medias)
+        """
+        try:
+            self._escribir_archivos_y_registros(id_corrida, destino, resultado, series)
+        except BaseException:
+            with self._conectar() as con:
+                con.execute("DELETE FROM registros WHERE corrida_id = ?", (id_corrida,))
+                con.execute("DELETE FROM corridas WHERE id = ?", (id_corrida,))
+            shutil.rmtree(destino, ignore_errors=True)
+            raise
+
+    def _escribir_archivos_y_registros(self, id_corrida, destino, resultado, series):
+        os.makedirs(destino, exist_ok=True)
+        with gzip.open(os.path.join(destino, "resultado.json.gz"), "wt", encoding="utf-8") as f:
+            json.dump({k: v for k, v in resultado.items() if k not in COLECCIONES}, f,
+                      ensure_ascii=False, default=str)
+        piramide = construir_piramide(series) if series else None
+        if piramide is not None:
+            guardar_piramide(piramide, os.path.join(destino, "lod"))
+        with self._conectar() as con:
+            for coleccion in COLECCIONES:
+                if resultado.get(coleccion):
+                    con.executemany("INSERT INTO registros VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                    self._filas_registros(id_corrida, coleccion, resultado[coleccion]))
+
+    def _quitar_pendiente(self, id_corrida):
+        with self._pendientes_lock:
+            self._pendientes.pop(id_corrida, None)
+
+    def _esperar_detalle(self, id_corrida):
+        """Espera la escritura en fondo del detalle de la corrida, si está pendiente."""
+        with self._pendientes_lock:
+            futuro = self._pendientes.get(id_corrida)
+        if futuro is not None:
+            # si la escritura falló la corrida ya no existe: la lectura da KeyError
+            futuro.exception()
+
+    def esperar_escrituras(self):
+        """Espera todas las escrituras en fondo encoladas hasta ahora."""
+        with self._pendientes_lock:
+            futuros = list(self._pendientes.values())
+            if self._escritor is not None:
+                futuros.append(self._escritor.submit(lambda: None))
+        for futuro in futuros:
+            futuro.exception()
+
+    def _podar_si_hay_retencion(self):
+        if self.max_corridas is not None or self.max_dias is not None:
+            self.podar()
+
+    def podar(self, max_corridas=None, max_dias=None):
+        """
+        Borra las corridas que exceden la retención (por defecto la del almacén):
+        las de más de 'max_dias' días y, de las restantes, todas salvo las
+        'max_corridas' más recientes. Devuelve cuántas borró.
+        """
+        max_corridas = self.max_corridas if max_corridas is None else max_corridas
+        max_dias = self.max_dias if max_dias is None else max_dias
+        condiciones = []
+        if max_dias is not None:
+            condiciones.append(f"creada < {time.time() - float(max_dias) * 86400.0!r}")
+        if max_corridas is not None:
+            condiciones.append(f"id NOT IN (SELECT id FROM corridas ORDER BY creada DESC, id LIMIT {int(max_corridas)})")
+        if not condiciones:
+            return 0
+        with self._pendientes_lock:
+            pendientes = set(self._pendientes)
+        with self._conectar() as con:
+            filas = [row for row in con.execute(
+                f"SELECT id, ruta_detalle FROM corridas WHERE {' OR '.join(condiciones)}").fetchall()
+                if row["id"] not in pendientes]   # las de detalle sin escribir quedan para la próxima
+            ids = [(row["id"],) for row in filas]
+            con.executemany("DELETE FROM registros WHERE corrida_id = ?", ids)
+            con.executemany("DELETE FROM corridas WHERE id = ?", ids)
+        for row in filas:
+            shutil.rmtree(row["ruta_detalle"], ignore_errors=True)
+        return len(filas)
+
+    @staticmethod
+    def _filas_registros(id_corrida, coleccion, registros):
+        f_t, f_vuelta, f_camion, f_label = COLECCIONES[coleccion]
+        for i, r in enumerate(registros):
+            t = f_t(r, i)
+            camion, label = f_camion(r), f_label(r)
+            yield (id_corrida, coleccion, i, float(i if t is None else t), f_vuelta(r),
+                   None if camion is None else str(camion), None if label is None else str(label),
+                   json.dumps(r, ensure_ascii=False, default=str))
+
+    # ---- Consultas ------------------------------------------------------------------
+    def buscar(self, filtros=None, tipo=None, desde=None, hasta=None, limite=50, offset=0):
+        """
+        Corridas que cumplen 'filtros' ({parámetro: valor}, ver PARAMETROS) y,
+        opcionalmente, creadas en [desde, hasta] (epoch en segundos); más recientes primero.
+        """
+        condiciones, args = [], []
+        for clave, valor in (filtros or {}).items():
+            if clave not in PARAMETROS and clave != "seed":
+                raise ValueError(f"No se puede filtrar por {clave!r} (use {', '.join(PARAMETROS)} o seed)")
+            condiciones.append(f"{clave} = ?")
+            args.append(valor)
+        if tipo is not None:
+            condiciones.append("tipo = ?"); args.append(tipo)
+        if desde is not None:
+            condiciones.append("creada >= ?"); args.append(float(desde))
+        if hasta is not None:
+            condiciones.append("creada <= ?"); args.append(float(hasta))
+        where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        with self._conectar() as con:
+            total = con.execute(f"SELECT COUNT(*) FROM corridas {where}", args).fetchone()[0]
+            filas = con.execute(f"SELECT * FROM corridas {where} ORDER BY creada DESC, id LIMIT ? OFFSET ?",
+                                args + [int(limite), int(offset)]).fetchall()
+        return {"total": total, "corridas": [_fila(r) for r in filas]}
+
+    def obtener(self, id_corrida):
+        """Fila de la corrida (entradas, kpis, logs) o None."""
+        with self._conectar() as con:
+            row = con.execute("SELECT * FROM corridas WHERE id = ?", (id_corrida,)).fetchone()
+        return _fila(row) if row is not None else None
+
+    def _ruta(self, id_corrida):
+        """Directorio del detalle (ya escrito) de la corrida; KeyError si no existe."""
+        self._esperar_detalle(id_corrida)
+        with self._conectar() as con:
+            row = con.execute("SELECT ruta_detalle FROM corridas WHERE id = ?", (id_corrida,)).fetchone()
+        if row is None:
+            raise KeyError(f"Corrida no encontrada: {id_corrida}")
+        return row["ruta_detalle"]
+
+    def resultado(self, id_corrida):
+        """Resultado completo (resumen + colecciones) tal como se guardó."""
+        destino = self._ruta(id_corrida)
+        with gzip.open(os.path.join(destino, "resultado.json.gz"), "rt", encoding="utf-8") as f:
+            resultado = json.load(f)
+        with self._conectar() as con:
+            filas = con.execute("SELECT coleccion, datos FROM registros WHERE corrida_id = ? ORDER BY coleccion, seq",
+                                (id_corrida,)).fetchall()
+        for row in filas:
+            resultado.setdefault(row["coleccion"], []).append(json.loads(row["datos"]))
+        return resultado
+
+    def lod(self, id_corrida, ancho_min, t_desde=None, t_hasta=None, recursos=None):
+        """Actividad de los recursos en buckets de 'ancho_min' (ver lod.consultar_piramide)."""
+        directorio = os.path.join(self._ruta(id_corrida), "lod")
+        if not os.path.isdir(directorio):
+            raise ValueError(f"La corrida {id_corrida} no tiene series de recursos")
+        return consultar_piramide(abrir_piramide(directorio), ancho_min, t_desde, t_hasta, recursos)
+
+    def pagina(self, id_corrida, coleccion, cursor=None, limite=100, orden="asc",
+               vuelta=None, camion=None, label=None, t_desde=None, t_hasta=None):
+        """
+        Página de una colección ordenada por tiempo (y posición a igual tiempo).
+
+        'cursor' es el 'siguiente' de la página anterior (None: primera página);
+        filtros por igualdad (vuelta, camion, label) y ventana [t_desde, t_hasta]
+        en minutos del turno. Devuelve {"registros", "siguiente", "total"}, con
+        'siguiente' None en la última página y 'total' sin filtros.
+        """
+        if coleccion not in COLECCIONES:
+            raise ValueError(f"Colección desconocida: {coleccion!r} (use {', '.join(COLECCIONES)})")
+        if orden not in ("asc", "desc"):
+            raise ValueError("El orden debe ser 'asc' o 'desc'")
+        if coleccion in SIN_TIEMPO and (t_desde is not None or t_hasta is not None):
+            raise ValueError(f"{coleccion} no tiene minutos: no admite ventana de tiempo")
+        fila = self.obtener(id_corrida)
+        if fila is None:
+            raise KeyError(f"Corrida no encontrada: {id_corrida}")
+        self._esperar_detalle(id_corrida)
+
+        condiciones, args = ["corrida_id = ?", "coleccion = ?"], [id_corrida, coleccion]
+        for columna, valor in (("vuelta", vuelta), ("camion", camion), ("label", label)):
+            if valor is not None:
+                condiciones.append(f"{columna} = ?"); args.append(valor)
+        if t_desde is not None:
+            condiciones.append("t >= ?"); args.append(float(t_desde))
+        if t_hasta is not None:
+            condiciones.append("t <= ?"); args.append(float(t_hasta))
+        if cursor:
+            t_c, seq_c = _leer_cursor(cursor)
+            condiciones.append(f"(t, seq) {'>' if orden == 'asc' else '<'} (?, ?)"); args += [t_c, seq_c]
+        sentido = "ASC" if orden == "asc" else "DESC"
+        with self._conectar() as con:
+            filas = con.execute(f"SELECT t, seq, datos FROM registros WHERE {' AND '.join(condiciones)} "
+                                f"ORDER BY t {sentido}, seq {sentido} LIMIT ?", args + [int(limite) + 1]).fetchall()
+        mas = len(filas) > limite
+        filas = filas[:limite]
+        return {
+            "registros": [json.loads(r["datos"]) for r in filas],
+            "siguiente": _cursor(filas[-1]["t"], filas[-1]["seq"]) if mas else None,
+            "total": fila["logs"].get(coleccion, 0),
+        }
+
+    def buscar_cache(self, cfg, seed, tipo="noche", entradas=None):
+        """Id de una corrida con la misma configuración, entradas y semilla (None si no hay)."""
+        if seed is None:
+            return None
+        condiciones = ["huella_cfg = ?", "seed = ?", "tipo = ?"]
+        args = [huella_cfg(cfg), seed, tipo]
+        for p in PARAMETROS:
+            if entradas and p in entradas:
+                condiciones.append(f"{p} = ?"); args.append(entradas[p])
+        with self._conectar() as con:
+            row = con.execute(f"SELECT id FROM corridas WHERE {' AND '.join(condiciones)} "
+                              "ORDER BY creada DESC LIMIT 1", args).fetchone()
+        return row["id"] if row is not None else None
+
+    def cargar_en_sustituto(self, modelo, tipo="noche", limite=None):
+        """Agrega las corridas guardadas como observaciones del ModeloSustituto; devuelve cuántas."""
+        sql = "SELECT cfg_json, kpis_json, " + ", ".join(PARAMETROS) + " FROM corridas WHERE tipo = ? ORDER BY creada"
+        n = 0
+        with self._conectar() as con:
+            filas = con.execute(sql, (tipo,)).fetchall()
+        if limite is not None:
+            filas = filas[-int(limite):]
+        for row in filas:
+            entradas = dict(json.loads(row["cfg_json"]), **{p: row[p] for p in PARAMETROS if row[p] is not None})
+            modelo.agregar(entradas, json.loads(row["kpis_json"]))
+            n += 1
+        return n
+
+    def cargar_en_modelo_costo(self, modelo, tipo="noche", limite=None):
+        """Agrega el costo medido de las corridas guardadas al ModeloCosto; devuelve cuántas."""
+        sql = ("SELECT wall_s, memoria_mb, " + ", ".join(PARAMETROS) +
+               " FROM corridas WHERE tipo = ? AND wall_s IS NOT NULL ORDER BY creada")
+        with self._conectar() as con:
+            filas = con.execute(sql, (tipo,)).fetchall()
+        if limite is not None:
+            filas = filas[-int(limite):]
+        for row in filas:
+            modelo.agregar({p: row[p] for p in PARAMETROS if row[p] is not None},
+                           wall_s=row["wall_s"], memoria_mb=row["memoria_mb"])
+        return len(filas)
+
+
+__all__ = ["AlmacenCorridas", "PARAMETROS", "COLECCIONES", "huella_cfg", "VERSION_MOTOR"]
@@ -0,0 +1,241 @@
+# app/services/scheduler.py
+"""
+Planificador de simulaciones: control de admisión y reparto justo de los
+trabajadores.
+
+- capacidad: simulaciones corriendo a la vez (por defecto, núcleos).
+- max_cola: pedidos admitidos esperando turno; lleno -> Saturado (429 con
+  Retry-After en la API). max_por_cliente acota lo que un solo cliente
+  puede tener pendiente.
+- prioridades: 'interactiva' (respuestas inline) pasa antes que 'lote'
+  (trabajos encolados); el lote usa a lo sumo max_lote trabajadores para
+  dejar lugar a lo interactivo.
+- justicia: dentro de una prioridad, los clientes se atienden por turnos
+  (round-robin), así un cliente con muchos pedidos no tapa a los demás.
+
+Uso: reservar() admite o rechaza en el acto (sin bloquear); el hilo que va
+a simular entra con `with turno:` (espera trabajador) y al salir lo libera.
+Desde el event loop, `await turno.esperar()` espera el trabajador sin ocupar
+un hilo del threadpool; el `with turno:` posterior ya no espera.
+cerrar() descarta una reserva que no llegó a usarse (caché, error).
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app.core.metrics import REGISTRO
+
+PRIORIDADES = ("interactiva", "lote")
+
+ESPERA = REGISTRO.histograma(
+    "simucd_scheduler_wait_seconds", "Espera desde la admisión hasta obtener trabajador", ("prioridad",))
+RECHAZOS = REGISTRO.contador(
+    "simucd_scheduler_rejected_total", "Pedidos rechazados por saturación (429)", ("motivo",))
+
+
+def _resolver(futuro):
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+class Saturado(RuntimeError):
+    """Cola llena: reintentar en 'reintentar_s' segundos."""
+
+    def __init__(self, mensaje, reintentar_s):
+        super().__init__(mensaje)
+        self.reintentar_s = reintentar_s
+
+
+class Turno:
+    """Reserva de un pedido admitido; `with turno:` ocupa un trabajador."""
+
+    def __init__(self, planificador, cliente, prioridad):
+        self._planificador = planificador
+        self.cliente = cliente
+        self.prioridad = prioridad
+        self.admitido = time.monotonic()
+        self.esperando = False
+        self.asignado = None      # momento en que obtuvo trabajador
+        self.cerrado = False
+        self._futuros = []        # (loop, futuro) de quienes esperan con await
+
+    def __enter__(self):
+        self._planificador._esperar(self)
+        return self
+
+    async def esperar(self):
+        """Espera trabajador en el event loop; si se cancela (cliente que corta) libera la reserva."""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._planificador._esperar_async(self, loop, futuro)
+        try:
+            await futuro
+        except asyncio.CancelledError:
+            self.cerrar()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+    def cerrar(self):
+        self._planificador._cerrar(self)
+
+
+class PlanificadorSimulaciones:
+
+    def __init__(self, capacidad=None, max_cola=32, max_por_cliente=8, max_lote=None, muestras_espera=1000):
+        self.capacidad = max(1, int(capacidad or os.cpu_count() or 1))
+        self.max_cola = int(max_cola)
+        self.max_por_cliente = int(max_por_cliente)
+        self.max_lote = max(1, int(max_lote if max_lote is not None else self.capacidad - 1))
+        self._cond = threading.Condition()
+        # prioridad -> cliente -> deque[Turno] pendientes (orden de llegada)
+        self._pendientes = {p: OrderedDict() for p in PRIORIDADES}
+        self._ocupados = {p: 0 for p in PRIORIDADES}
+        self._por_cliente = {}
+        self._n_pendientes = 0
+        # métricas
+        self.admitidos = 0
+        self.rechazados = 0
+        self.atendidos = 0
+        self._espera_total = 0.0
+        self._esperas = deque(maxlen=muestras_espera)
+        self._servicio_medio = None
+
+    # ---- Admisión -------------------------------------------------------------
+    def reservar(self, cliente, prioridad="interactiva"):
+        """Turno admitido para 'cliente'; Saturado si la cola (o la cuota del cliente) está llena."""
+        if prioridad not in PRIORIDADES:
+            raise ValueError(f"Prioridad desconocida: {prioridad!r} (use {' o '.join(PRIORIDADES)})")
+        with self._cond:
+            if self._n_pendientes >= self.max_cola:
+                self.rechazados += 1
+                RECHAZOS.inc(motivo="cola_llena")
+                raise Saturado("Demasiadas simulaciones en espera", self._reintentar_s(self._n_pendientes))
+            if self._por_cliente.get(cliente, 0) >= self.max_por_cliente:
+                self.rechazados += 1
+                RECHAZOS.inc(motivo="cuota_cliente")
+                raise Saturado(f"El cliente {cliente} ya tiene {self.max_por_cliente} simulaciones pendientes",
+                               self._reintentar_s(self._por_cliente[cliente]))
+            turno = Turno(self, cliente, prioridad)
+            self._pendientes[prioridad].setdefault(cliente, deque()).append(turno)
+            self._por_cliente[cliente] = self._por_cliente.get(cliente, 0) + 1
+            self._n_pendientes += 1
+            self.admitidos += 1
+            return turno
+
+    def _reintentar_s(self, adelante):
+        servicio = self._servicio_medio or 1.0
+        return max(1, math.ceil(servicio * (adelante + 1) / self.capacidad))
+
+    # ---- Reparto ----------------------------------------------------------------
+    def _libres(self, prioridad):
+        libres = self.capacidad - sum(self._ocupados.values())
+        if prioridad == "lote":
+            libres = min(libres, self.max_lote - self._ocupados["lote"])
+        return libres
+
+    def _despachar(self):
+        """Asigna trabajadores libres a turnos que esperan: por prioridad y por turnos entre clientes."""
+        for prioridad in PRIORIDADES:
+            clientes = self._pendientes[prioridad]
+            avanzo = True
+            while avanzo and self._libres(prioridad) > 0:
+                avanzo = False
+                for cliente in list(clientes):
+                    turno = next((t for t in clientes[cliente] if t.esperando), None)
+                    if turno is None:
+                        continue
+                    self._quitar(turno)
+                    self._asignar(turno)
+                    # el cliente atendido pasa al final de la ronda
+                    if cliente in clientes:
+                        clientes.move_to_end(cliente)
+                    avanzo = True
+                    break
+        self._cond.notify_all()
+
+    def _quitar(self, turno):
+        cola = self._pendientes[turno.prioridad][turno.cliente]
+        cola.remove(turno)
+        if not cola:
+            del self._pendientes[turno.prioridad][turno.cliente]
+        self._n_pendientes -= 1
+        self._por_cliente[turno.cliente] -= 1
+        if not self._por_cliente[turno.cliente]:
+            del self._por_cliente[turno.cliente]
+
+    def _asignar(self, turno):
+        turno.asignado = time.monotonic()
+        self._ocupados[turno.prioridad] += 1
+        espera = turno.asignado - turno.admitido
+        self._espera_total += espera
+        self._esperas.append(espera)
+        ESPERA.observe(espera, prioridad=turno.prioridad)
+        for loop, futuro in turno._futuros:
+            loop.call_soon_threadsafe(_resolver, futuro)
+
+    def _esperar(self, turno):
+        with self._cond:
+            if turno.cerrado:
+                raise RuntimeError("Turno ya cerrado")
+            if turno.asignado is not None:
+                return
+            turno.esperando = True
+            self._despachar()
+            self._cond.wait_for(lambda: turno.asignado is not None)
+
+    def _esperar_async(self, turno, loop, futuro):
+        with self._cond:
+            if turno.cerrado:
+                raise RuntimeError("Turno ya cerrado")
+            if turno.asignado is not None:
+                futuro.set_result(None)
+                return
+            turno._futuros.append((loop, futuro))
+            turno.esperando = True
+            self._despachar()
+
+    def _cerrar(self, turno):
+        with self._cond:
+            if turno.cerrado:
+                return
+            turno.cerrado = True
+            if turno.asignado is None:
+                self._quitar(turno)
+            else:
+                self._ocupados[turno.prioridad] -= 1
+                self.atendidos += 1
+                servicio = time.monotonic() - turno.asignado
+                self._servicio_medio = servicio if self._servicio_medio is None else \
+                    0.9 * self._servicio_medio + 0.1 * servicio
+            self._despachar()
+
+    # ---- Métricas -----------------------------------------------------------------
+    def metricas(self):
+        with self._cond:
+            esperas = sorted(self._esperas)
+            n_esperas = len(esperas)
+            return {
+                "capacidad": self.capacidad,
+                "max_cola": self.max_cola,
+                "ocupados": dict(self._ocupados),
+                "en_cola": {p: sum(len(c) for c in self._pendientes[p].values()) for p in PRIORIDADES},
+                "en_cola_total": self._n_pendientes,
+                "clientes_en_cola": len(self._por_cliente),
+                "admitidos": self.admitidos,
+                "rechazados": self.rechazados,
+                "atendidos": self.atendidos,
+                "espera_total_s": self._espera_total,
+                "espera_media_s": (sum(esperas) / n_esperas) if n_esperas else 0.0,
+                "espera_p95_s": esperas[min(n_esperas - 1, int(0.95 * n_esperas))] if n_esperas else 0.0,
+                "servicio_medio_s": self._servicio_medio or 0.0,
+            }
+
+
+__all__ = ["PlanificadorSimulaciones", "Turno", "Saturado", "PRIORIDADES"]
@@ -1,9 +1,128 @@
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 import numpy as np
-from app.simulations.night.simulation import simular_turno_prioridad_rng
+from app.simulations.night.simulation import simular_turno_prioridad_rng, preview_turno_noche
 from app.simulations.night.config import DEFAULT_CONFIG
+from app.simulations.night.queueing import estimar_cargas_noche
+from app.simulations.surrogate import ModeloSustituto
+from app.simulations.lod import separar_series
+from app.services.run_store import AlmacenCorridas, huella_cfg
+from app.services.cost_model import ModeloCosto, PRESUPUESTOS_DEFECTO
+from app.services.job_queue import ColaTrabajos
+from app.services.scheduler import PlanificadorSimulaciones, Saturado
+from app.core.metrics import REGISTRO, leer_rss_pico, reiniciar_rss_pico
+from app.core.memory_profile import PerfilMemoria
+
+# resultados del benchmark (benchmarks/bench_motores.py) para el modelo de costo
+BENCHMARK_DEFECTO = os.path.join(os.path.dirname(__file__), "..", "..", "benchmarks", "resultados.json")
+
+# ---- Métricas (GET /metrics) --------------------------------------------------
+FASES_SIMULACION = REGISTRO.histograma(
+    "simucd_simulation_phase_seconds", "Tiempo de pared de cada simulación por fase", ("tipo", "fase"))
+EVENTOS_SIMPY = REGISTRO.contador("simucd_simpy_events_total", "Eventos SimPy procesados", ("tipo",))
+EVENTOS_POR_SEGUNDO = REGISTRO.histograma(
+    "simucd_simpy_events_per_second", "Eventos SimPy por segundo de env.run en cada simulación", ("tipo",),
+    cubetas=(1e3, 5e3, 1e4, 2.5e4, 5e4, 1e5, 2.5e5, 5e5, 1e6))
+CACHE_CORRIDAS = REGISTRO.contador(
+    "simucd_run_cache_requests_total", "Pedidos con semilla: hit (almacén), compartida (en curso) o miss", ("resultado",))
+RSS_PICO = REGISTRO.histograma(
+    "simucd_simulation_peak_rss_bytes", "Pico de RSS del proceso durante cada simulación", ("tipo",),
+    cubetas=tuple(m * 2 ** 20 for m in (64, 128, 256, 512, 1024, 2048, 4096, 8192)))
+
+
+def _fase(seccion):
+    """Fase de métricas de una sección del motor (instrumentation.seccion)."""
+    if seccion.startswith("planificar"):
+        return "planificacion"
+    if seccion == "simpy.run":
+        return "simpy_run"
+    return "metricas"
+
+
+class _Vuelo:
+    """Cálculo en curso compartido por pedidos idénticos (single-flight)."""
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
 
 class SimulationService:
+
+    def __init__(self, directorio_registros=None, almacen=None):
+        # Metamodelo para what-if; aprende de cada corrida ejecutada
+        self.sustituto = ModeloSustituto()
+        # Logs volcados a disco: id de corrida -> {"creado", "archivos": {archivo: ruta}} (más viejo primero).
+        # Se borran pasado registros_ttl_s o más allá de max_registros corridas (ver _podar_registros)
+        self.directorio_registros = directorio_registros or os.path.join(tempfile.gettempdir(), "simucd_registros")
+        self.registros_en_disco = OrderedDict()
+        self.registros_ttl_s = float(os.environ.get("SIMUCD_REGISTROS_TTL_S", 3600))
+        self.max_registros = int(os.environ.get("SIMUCD_MAX_REGISTROS", 50))
+        # Presupuesto por log de operaciones del motor (cfg["max_registros_log"], ver
+        # simulations/registros.py): un pedido enorme guarda muestra + agregados. 0 lo desactiva
+        self.max_registros_log = int(os.environ.get("SIMUCD_MAX_REGISTROS_LOG", 100000)) or None
+        self._registros_lock = threading.Lock()
+        # Corridas persistidas (SQLite): consultas, caché por semilla y datos para el metamodelo.
+        # Se abre en el primer uso (ver almacen), no al importar la API
+        self._almacen = almacen
+        self._almacen_cargado = False
+        self._almacen_lock = threading.Lock()
+        # Costo estimado (tiempo/memoria) para decidir inline / cola / rechazo
+        self.costo = ModeloCosto()
+        ruta_benchmark = os.environ.get("SIMUCD_BENCHMARK") or BENCHMARK_DEFECTO
+        if os.path.exists(ruta_benchmark):
+            self.costo.cargar_benchmark(ruta_benchmark)
+        self.presupuestos = {
+            "inline_max_s": float(os.environ.get("SIMUCD_INLINE_MAX_S", PRESUPUESTOS_DEFECTO["inline_max_s"])),
+            "max_s": float(os.environ.get("SIMUCD_MAX_S", PRESUPUESTOS_DEFECTO["max_s"])),
+            "max_mb": float(os.environ.get("SIMUCD_MAX_MB", PRESUPUESTOS_DEFECTO["max_mb"])),
+        }
+        # Admisión y reparto de trabajadores entre clientes (interactiva antes que lote)
+        self.planificador = PlanificadorSimulaciones(
+            capacidad=int(os.environ.get("SIMUCD_CAPACIDAD", 0)) or None,
+            max_cola=int(os.environ.get("SIMUCD_MAX_COLA", 32)),
+            max_por_cliente=int(os.environ.get("SIMUCD_MAX_POR_CLIENTE", 8)),
+        )
+        # los hilos de la cola sólo esperan turno: el planificador decide cuántos simulan
+        self.cola = ColaTrabajos(trabajadores=self.planificador.max_lote, max_pendientes=self.planificador.max_cola)
+        self._registrar_medidores()
+        # Escenarios en cálculo: huella -> _Vuelo (pedidos idénticos concurrentes esperan al primero)
+        self._en_vuelo = {}
+        self._en_vuelo_lock = threading.Lock()
     
+    @property
+    def almacen(self):
+        """
+        Almacén de corridas; en el primer uso se crea (SIMUCD_ALMACEN, retención
+        SIMUCD_MAX_CORRIDAS / SIMUCD_RETENCION_DIAS) y su historial alimenta el
+        metamodelo y el modelo de costo
+        """
+        if not self._almacen_cargado:
+            with self._almacen_lock:
+                if not self._almacen_cargado:
+                    if self._almacen is None:
+                        self._almacen = AlmacenCorridas(
+                            os.environ.get("SIMUCD_ALMACEN") or
+                            os.path.join(tempfile.gettempdir(), "simucd", "corridas.sqlite"),
+                            max_corridas=int(os.environ.get("SIMUCD_MAX_CORRIDAS", 1000)) or None,
+                            max_dias=float(os.environ.get("SIMUCD_RETENCION_DIAS", 30)) or None,
+                            # el detalle y los registros se escriben fuera del pedido
+                            escritura_en_fondo=True,
+                        )
+                    self._almacen.cargar_en_sustituto(self.sustituto, limite=self.sustituto.max_observaciones)
+                    self._almacen.cargar_en_modelo_costo(self.costo, limite=self.costo.max_observaciones)
+                    self._almacen_cargado = True
+        return self._almacen
+
     def _convert_numpy_types(self, obj):
         """
         Convierte recursivamente tipos de NumPy a tipos nativos de Python
@@ -40,35 +159,568 @@ class SimulationService:
         pickers: int,
         grueros: int,
         chequeadores: int,
-        parrilleros: int
+        parrilleros: int,
+        seed: int = None,
+        turno=None,
+        perfil_memoria: bool = False,
+        cliente: str = "anonimo"
+    ):
+        """
+        Ejecuta la simulación de noche con los parámetros especificados;
+        'turno' (reservar_turno) es la reserva del planificador con la que se simula
+        (sin turno, si hay que simular se reserva uno para 'cliente').
+        Con perfil_memoria corre siempre (sin caché) y agrega 'perfil_memoria' al resultado
+        """
+        try:
+            config, entradas = self._escenario_noche(
+                cajas_facturadas, cajas_piqueadas, pickers, grueros, chequeadores, parrilleros)
+
+            # Con semilla fija el resultado es determinista: pedidos idénticos en curso
+            # comparten una sola corrida (y los posteriores la toman del almacén)
+            if seed is None or perfil_memoria:
+                return self._simular_noche(cajas_facturadas, cajas_piqueadas, config, entradas, seed, turno,
+                                           perfil_memoria, cliente)
+            return self._una_vez(self._clave_vuelo(config, seed, entradas), lambda: self._simular_noche(
+                cajas_facturadas, cajas_piqueadas, config, entradas, seed, turno, cliente=cliente), turno)
+
+        except Saturado:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al ejecutar simulación: {str(e)}")
+        finally:
+            # sin uso (caché o pedido compartido) la reserva se descarta
+            if turno is not None:
+                turno.cerrar()
+
+    @staticmethod
+    def _clave_vuelo(config, seed, entradas):
+        return huella_cfg(config), seed, json.dumps(entradas, sort_keys=True)
+
+    def _config_motor(self, config):
+        """'config' con lo que el servicio fija en toda simulación (presupuesto de registros por log)."""
+        if self.max_registros_log:
+            config["max_registros_log"] = self.max_registros_log
+        return config
+
+    def _escenario_noche(self, cajas_facturadas, cajas_piqueadas, pickers, grueros, chequeadores, parrilleros):
+        """(config, entradas) de un pedido de simulación de noche"""
+        # Crear configuración personalizada basada en DEFAULT_CONFIG
+        config = DEFAULT_CONFIG.copy()
+
+        # Actualizar con los parámetros del usuario
+        config.update({
+            "cap_picker": pickers,
+            "cap_gruero": grueros,
+            "cap_chequeador": chequeadores,
+            "cap_parrillero": parrilleros,
+            # series por minuto de los recursos: base de la pirámide LOD de la corrida
+            "monitor_muestreo_min": 1,
+        })
+        self._config_motor(config)
+        entradas = {
+            "total_cajas_facturadas": cajas_facturadas,
+            "cajas_para_pick": cajas_piqueadas,
+            "cap_picker": pickers,
+            "cap_gruero": grueros,
+            "cap_chequeador": chequeadores,
+            "cap_parrillero": parrilleros,
+        }
+        return config, entradas
+
+    @contextmanager
+    def _trabajador(self, turno=None, cliente="anonimo"):
+        """
+        Trabajador del planificador para simular: el del turno admitido por la API
+        o, sin turno (llamada directa, caché o corrida compartida que ya no está),
+        uno reservado en este momento. Saturado si no hay lugar
+        """
+        if turno is None:
+            turno = self.planificador.reservar(cliente, "interactiva")
+        with turno:
+            yield turno
+
+    def _simular_noche(self, cajas_facturadas, cajas_piqueadas, config, entradas, seed, turno=None,
+                       perfil_memoria=False, cliente="anonimo"):
+        """Resultado guardado con la misma configuración y semilla, o una corrida nueva guardada."""
+        # Misma configuración y semilla ya corrida: se devuelve la guardada
+        if not perfil_memoria:
+            id_cache = self.almacen.buscar_cache(config, seed, entradas=entradas)
+            if id_cache is not None:
+                CACHE_CORRIDAS.inc(resultado="hit")
+                resultado_serializable = self.almacen.resultado(id_cache)
+                resultado_serializable.update(corrida_id=id_cache, desde_cache=True)
+                return resultado_serializable
+            if seed is not None:
+                CACHE_CORRIDAS.inc(resultado="miss")
+
+        # Ejecutar simulación
+        with self._trabajador(turno, cliente), \
+                PerfilMemoria() if perfil_memoria else nullcontext() as perfil:
+            # con corridas concurrentes el pico es el del proceso en ese lapso
+            reiniciar_rss_pico()
+            t0 = time.perf_counter()
+            resultado = simular_turno_prioridad_rng(
+                total_cajas_facturadas=cajas_facturadas,
+                cajas_para_pick=cajas_piqueadas,
+                cfg=config,
+                seed=seed,
+                perfil_memoria=perfil is not None
+            )
+            costo = {"wall_s": time.perf_counter() - t0}
+            rss = leer_rss_pico()
+            if perfil is not None:
+                # la serialización entra en el perfil; la captura ve el resultado crudo y el serializado
+                perfil.picos_motor(resultado)
+                with perfil.fase("serializacion"):
+                    resultado_serializable = self._convert_numpy_types(resultado)
+                perfil.captura()
+        if perfil is not None:
+            # bajo tracemalloc el tiempo no es representativo: sólo se registra la memoria
+            resumen_memoria = perfil.resumen()
+            costo = {"memoria_mb": resumen_memoria["pico_mb"]}
+        self.costo.agregar(entradas, **costo)
+        self._observar_corrida(resultado, rss)
+
+        self.sustituto.agregar_resultado(
+            dict(config, total_cajas_facturadas=cajas_facturadas, cajas_para_pick=cajas_piqueadas),
+            resultado,
+        )
+
+        if perfil is None:
+            # Convertir tipos de NumPy a tipos nativos de Python
+            t0 = time.perf_counter()
+            resultado_serializable = self._convert_numpy_types(resultado)
+            FASES_SIMULACION.observe(time.perf_counter() - t0, tipo="noche", fase="serializacion")
+        else:
+            resultado_serializable["perfil_memoria"] = resumen_memoria
+        # las series van sólo a la pirámide (GET /corridas/{id}/lod), no a la respuesta
+        series = separar_series(resultado_serializable)
+        resultado_serializable.update(
+            corrida_id=self._guardar_corrida(entradas, config, resultado_serializable, seed, series, costo),
+            desde_cache=False,
+        )
+
+        return resultado_serializable
+
+    def _una_vez(self, clave, calcular, turno=None):
+        """
+        Single-flight: el primer pedido con 'clave' ejecuta 'calcular'; los que
+        llegan mientras tanto esperan ese mismo resultado (o su error) sin
+        ocupar trabajador: su 'turno' se libera antes de esperar
+        """
+        with self._en_vuelo_lock:
+            vuelo = self._en_vuelo.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._en_vuelo[clave] = _Vuelo()
+        if not lider:
+            CACHE_CORRIDAS.inc(resultado="compartida")
+            if turno is not None:
+                turno.cerrar()
+            vuelo.listo.wait()
+            if vuelo.error is not None:
+                raise vuelo.error
+            return dict(vuelo.resultado, compartida=True)
+        try:
+            vuelo.resultado = calcular()
+            return vuelo.resultado
+        except Exception as e:
+            vuelo.error = e
+            raise
+        finally:
+            # se quita antes de avisar: un pedido posterior ya encuentra la corrida en el almacén
+            with self._en_vuelo_lock:
+                del self._en_vuelo[clave]
+            vuelo.listo.set()
+
+    @staticmethod
+    def _observar_corrida(resultado, rss=None, tipo="noche"):
+        """Fases, eventos y memoria de una corrida en las métricas del proceso."""
+        fases = {}
+        for seccion, segundos in (resultado.get("secciones_wall_s") or {}).items():
+            fases[_fase(seccion)] = fases.get(_fase(seccion), 0.0) + segundos
+        for fase, segundos in fases.items():
+            FASES_SIMULACION.observe(segundos, tipo=tipo, fase=fase)
+        eventos = resultado.get("eventos_procesados") or 0
+        EVENTOS_SIMPY.inc(eventos, tipo=tipo)
+        if fases.get("simpy_run"):
+            EVENTOS_POR_SEGUNDO.observe(eventos / fases["simpy_run"], tipo=tipo)
+        if rss is not None:
+            RSS_PICO.observe(rss, tipo=tipo)
+
+    def _registrar_medidores(self):
+        """Medidores calculados al exponer /metrics: caché, cola y ocupación de trabajadores."""
+        def _ratio_cache():
+            hits = CACHE_CORRIDAS.valor(resultado="hit") + CACHE_CORRIDAS.valor(resultado="compartida")
+            total = hits + CACHE_CORRIDAS.valor(resultado="miss")
+            return hits / total if total else 0.0
+
+        def _ocupacion():
+            m = self.planificador.metricas()
+            return sum(m["ocupados"].values()) / m["capacidad"]
+
+        REGISTRO.medidor("simucd_run_cache_hit_ratio",
+                         "Fracción de pedidos con semilla resueltos sin simular", funcion=_ratio_cache)
+        REGISTRO.medidor("simucd_scheduler_queue_depth", "Pedidos admitidos esperando trabajador", ("prioridad",),
+                         funcion=lambda: self.planificador.metricas()["en_cola"])
+        REGISTRO.medidor("simucd_scheduler_workers_busy", "Trabajadores simulando", ("prioridad",),
+                         funcion=lambda: self.planificador.metricas()["ocupados"])
+        REGISTRO.medidor("simucd_scheduler_workers", "Capacidad del planificador",
+                         funcion=lambda: self.planificador.capacidad)
+        REGISTRO.medidor("simucd_scheduler_utilization", "Trabajadores ocupados / capacidad", funcion=_ocupacion)
+        REGISTRO.medidor("simucd_jobs_pending", "Trabajos encolados sin terminar", funcion=self.cola.pendientes)
+
+    def _guardar_corrida(self, entradas, config, resultado, seed, series=None, costo=None):
+        """Persiste la corrida; si el almacén falla la simulación igual se devuelve (sin id)."""
+        try:
+            return self.almacen.guardar(entradas, config, resultado, seed=seed, series=series, costo=costo)
+        except (OSError, sqlite3.Error):
+            return None
+
+    def estimate_night_cost(
+        self,
+        cajas_facturadas: int,
+        cajas_piqueadas: int,
+        pickers: int,
+        grueros: int,
+        chequeadores: int,
+        parrilleros: int,
+        seed: int = None,
+        perfil_memoria: bool = False
+    ):
+        """
+        Tiempo de pared y memoria estimados (mediana y p90) y el modo de ejecución:
+        'inline', 'cola' o 'rechazar' según los presupuestos
+        """
+        config, entradas = self._escenario_noche(
+            cajas_facturadas, cajas_piqueadas, pickers, grueros, chequeadores, parrilleros)
+        # el primer uso del almacén carga en el modelo de costo lo medido en corridas anteriores
+        almacen = self.almacen
+        estimacion = self.costo.estimar(entradas)
+        # una corrida ya guardada (o en curso) se devuelve sin simular (salvo que se pida perfil de memoria):
+        # no necesita trabajador del planificador
+        if seed is not None and not perfil_memoria and (
+                self._clave_vuelo(config, seed, entradas) in self._en_vuelo or
+                almacen.buscar_cache(config, seed, entradas=entradas) is not None):
+            estimacion.update(modo="inline", desde_cache=True)
+        else:
+            estimacion.update(modo=self.costo.decidir(estimacion, self.presupuestos), desde_cache=False)
+        return estimacion
+
+    def reservar_turno(self, cliente: str, prioridad: str = "interactiva"):
+        """
+        Admite un pedido en el planificador; scheduler.Saturado si la cola está llena
+        """
+        return self.planificador.reservar(cliente, prioridad)
+
+    def get_run_memory_profile(self, id_corrida: str):
+        """
+        Perfil de memoria guardado con una corrida; KeyError si la corrida no existe o no lo tiene
+        """
+        perfil = self.almacen.resultado(id_corrida).get("perfil_memoria")
+        if perfil is None:
+            raise KeyError(f"La corrida {id_corrida} no tiene perfil de memoria")
+        return perfil
+
+    def submit_night_simulation(self, estimacion=None, cliente: str = "anonimo", **parametros):
+        """
+        Encola run_night_simulation(**parametros) con prioridad de lote; devuelve el
+        trabajo (consultar con get_job). scheduler.Saturado si no hay lugar
+        """
+        turno = self.planificador.reservar(cliente, "lote")
+        try:
+            return self.cola.enviar(self.run_night_simulation, turno=turno,
+                                    info={"entradas": parametros, "estimacion": estimacion, "cliente": cliente},
+                                    **parametros)
+        except Exception:
+            turno.cerrar()
+            raise
+
+    def scheduler_metrics(self):
+        """
+        Profundidad de cola, ocupación y tiempos de espera del planificador
+        """
+        return dict(self.planificador.metricas(), trabajos_pendientes=self.cola.pendientes())
+
+    def get_job(self, id_trabajo: str):
+        """
+        Estado de un trabajo encolado (con el resultado si terminó); KeyError si no existe
+        """
+        return self.cola.estado(id_trabajo)
+
+    def list_runs(self, filtros=None, desde=None, hasta=None, limite=50, offset=0):
+        """
+        Corridas guardadas que cumplen los filtros de parámetros y fechas
+        """
+        try:
+            return self._convert_numpy_types(
+                self.almacen.buscar(filtros, desde=desde, hasta=hasta, limite=limite, offset=offset))
+        except Exception as e:
+            raise Exception(f"Error al consultar corridas: {str(e)}")
+
+    def get_run(self, id_corrida: str):
+        """
+        Entradas, KPIs y logs disponibles de una corrida guardada; KeyError si no existe
+        """
+        corrida = self.almacen.obtener(id_corrida)
+        if corrida is None:
+            raise KeyError(f"Corrida no encontrada: {id_corrida}")
+        return corrida
+
+    def get_run_records(self, id_corrida: str, coleccion: str, cursor: str = None, limite: int = 100,
+                        orden: str = "asc", **filtros):
+        """
+        Página (con cursor) de una colección de una corrida guardada; filtros:
+        vuelta, camion, label, t_desde, t_hasta
+        """
+        return self.almacen.pagina(id_corrida, coleccion, cursor=cursor, limite=limite, orden=orden, **filtros)
+
+    def get_run_lod(self, id_corrida: str, ancho_min: float, t_desde: float = None, t_hasta: float = None,
+                    recursos=None):
+        """
+        Ocupación, usuarios y cola de los recursos de una corrida guardada, en
+        buckets de 'ancho_min' minutos dentro de [t_desde, t_hasta)
+        """
+        return self.almacen.lod(id_corrida, ancho_min, t_desde=t_desde, t_hasta=t_hasta, recursos=recursos)
+
+    def run_night_simulation_con_registros(
+        self,
+        cajas_facturadas: int,
+        cajas_piqueadas: int,
+        pickers: int,
+        grueros: int,
+        chequeadores: int,
+        parrilleros: int,
+        seed: int = None,
+        formato: str = "jsonl",
+        comprimir: bool = True,
+        turno=None,
+        cliente: str = "anonimo"
     ):
         """
-        Ejecuta la simulación de noche con los parámetros especificados
+        Simulación de noche con los logs de operaciones escritos a disco durante
+        la corrida (ver simulations/volcado.py); devuelve el resultado con los
+        links de descarga de cada log en 'registros_en_disco'. 'turno' como en
+        run_night_simulation.
         """
         try:
-            # Crear configuración personalizada basada en DEFAULT_CONFIG
+            self._podar_registros()
+            id_corrida = uuid.uuid4().hex[:12]
+            directorio = os.path.join(self.directorio_registros, id_corrida)
             config = DEFAULT_CONFIG.copy()
-            
-            # Actualizar con los parámetros del usuario
             config.update({
                 "cap_picker": pickers,
                 "cap_gruero": grueros,
                 "cap_chequeador": chequeadores,
                 "cap_parrillero": parrilleros,
+                "volcado_registros": {
+                    "directorio": directorio,
+                    "formato": formato,
+                    "comprimir": comprimir,
+                },
             })
-            
-            # Ejecutar simulación
-            resultado = simular_turno_prioridad_rng(
-                total_cajas_facturadas=cajas_facturadas,
-                cajas_para_pick=cajas_piqueadas,
-                cfg=config,
-                seed=None
+            self._config_motor(config)
+            try:
+                # el motor cierra los archivos aunque falle; lo escrito a medias se borra
+                with self._trabajador(turno, cliente):
+                    resultado = simular_turno_prioridad_rng(
+                        total_cajas_facturadas=cajas_facturadas,
+                        cajas_para_pick=cajas_piqueadas,
+                        cfg=config,
+                        seed=seed
+                    )
+            except BaseException:
+                shutil.rmtree(directorio, ignore_errors=True)
+                raise
+            self.sustituto.agregar_resultado(
+                dict(config, total_cajas_facturadas=cajas_facturadas, cajas_para_pick=cajas_piqueadas),
+                resultado,
             )
-            
-            # Convertir tipos de NumPy a tipos nativos de Python
-            resultado_serializable = self._convert_numpy_types(resultado)
-            
-            return resultado_serializable
-            
+
+            archivos = {}
+            rutas = {}
+            for log, info in resultado.get("registros_en_disco", {}).items():
+                archivo = os.path.basename(info["ruta"])
+                rutas[archivo] = info["ruta"]
+                archivos[log] = {
+                    "archivo": archivo,
+                    "formato": info["formato"],
+                    "comprimido": info["comprimido"],
+                    "registros": info["registros"],
+                    "bytes": info["bytes"],
+                    "url": f"/api/registros/{id_corrida}/{archivo}",
+                }
+            with self._registros_lock:
+                self.registros_en_disco[id_corrida] = {"creado": time.time(), "directorio": directorio,
+                                                       "archivos": rutas}
+            resultado["registros_en_disco"] = {"id": id_corrida, "archivos": archivos,
+                                               "expira_s": self.registros_ttl_s}
+
+            return self._convert_numpy_types(resultado)
+        except Saturado:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al ejecutar simulación con registros: {str(e)}")
+        finally:
+            if turno is not None:
+                turno.cerrar()
+
+    def _podar_registros(self):
+        """
+        Borra los logs volcados vencidos (más de registros_ttl_s) o que exceden
+        max_registros corridas, y los directorios huérfanos vencidos (p.ej. de un
+        proceso anterior)
+        """
+        limite = time.time() - self.registros_ttl_s
+        with self._registros_lock:
+            borrar = [k for k, v in self.registros_en_disco.items() if v["creado"] < limite]
+            sobrantes = len(self.registros_en_disco) - len(borrar) - max(0, self.max_registros - 1)
+            if sobrantes > 0:
+                borrar += [k for k in self.registros_en_disco if k not in borrar][:sobrantes]
+            directorios = [self.registros_en_disco.pop(k)["directorio"] for k in borrar]
+            conocidos = set(self.registros_en_disco)
+        try:
+            huerfanos = [os.path.join(self.directorio_registros, d) for d in os.listdir(self.directorio_registros)
+                         if d not in conocidos]
+        except OSError:
+            huerfanos = []
+        directorios += [d for d in huerfanos if os.path.isdir(d) and os.path.getmtime(d) < limite]
+        for directorio in directorios:
+            shutil.rmtree(directorio, ignore_errors=True)
+
+    def ruta_registro(self, id_corrida: str, archivo: str):
+        """
+        Ruta en disco de un log volcado; KeyError si la corrida o el archivo no existen (o vencieron)
+        """
+        with self._registros_lock:
+            entrada = self.registros_en_disco.get(id_corrida)
+        vigente = entrada is not None and entrada["creado"] >= time.time() - self.registros_ttl_s
+        ruta = entrada["archivos"].get(archivo) if vigente else None
+        if ruta is None or not os.path.exists(ruta):
+            raise KeyError(f"Registro no encontrado: {id_corrida}/{archivo}")
+        return ruta
+
+    def profile_night_simulation(
+        self,
+        cajas_facturadas: int,
+        cajas_piqueadas: int,
+        pickers: int,
+        grueros: int,
+        chequeadores: int,
+        parrilleros: int,
+        seed: int = None,
+        turno=None,
+        cliente: str = "anonimo"
+    ):
+        """
+        Corre la simulación de noche con perfil por tipo de proceso (debug);
+        'turno' como en run_night_simulation
+        """
+        try:
+            config = DEFAULT_CONFIG.copy()
+            config.update({
+                "cap_picker": pickers,
+                "cap_gruero": grueros,
+                "cap_chequeador": chequeadores,
+                "cap_parrillero": parrilleros,
+            })
+            self._config_motor(config)
+            with self._trabajador(turno, cliente):
+                resultado = simular_turno_prioridad_rng(
+                    total_cajas_facturadas=cajas_facturadas,
+                    cajas_para_pick=cajas_piqueadas,
+                    cfg=config,
+                    seed=seed,
+                    perfilar=True
+                )
+            return self._convert_numpy_types({
+                "turno_fin_real": resultado["turno_fin_real"],
+                "overrun_total_min": resultado["overrun_total_min"],
+                "eventos_procesados": resultado["eventos_procesados"],
+                "perfil": resultado["perfil"],
+            })
+        except Saturado:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al perfilar simulación: {str(e)}")
+        finally:
+            if turno is not None:
+                turno.cerrar()
+
+    def predict_what_if(
+        self,
+        cajas_facturadas: int,
+        cajas_piqueadas: int,
+        pickers: int,
+        grueros: int,
+        chequeadores: int,
+        parrilleros: int,
+        turno=None,
+        cliente: str = "anonimo",
+        solo_sustituto: bool = False
+    ):
+        """
+        Respuesta what-if: predicción del metamodelo o, si está fuera de
+        dominio o es incierta, una simulación real (con 'turno' como en
+        run_night_simulation). Con solo_sustituto devuelve None en vez de simular.
+        """
+        try:
+            entradas = {
+                "total_cajas_facturadas": cajas_facturadas,
+                "cajas_para_pick": cajas_piqueadas,
+                "cap_picker": pickers,
+                "cap_gruero": grueros,
+                "cap_chequeador": chequeadores,
+                "cap_parrillero": parrilleros,
+            }
+            # el primer uso del almacén carga el historial de corridas en el metamodelo
+            self.almacen
+            if solo_sustituto:
+                return self._convert_numpy_types(self.sustituto.responder(entradas))
+            # el trabajador se toma sólo si el metamodelo no alcanza y hay que simular
+            return self._convert_numpy_types(
+                self.sustituto.consultar(entradas, cfg=self._config_motor(DEFAULT_CONFIG.copy()),
+                                         trabajador=self._trabajador(turno, cliente)))
+        except Saturado:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al estimar escenario: {str(e)}")
+        finally:
+            if turno is not None:
+                turno.cerrar()
+
+    def preview_night_loads(
+        self,
+        cajas_facturadas: int,
+        cajas_piqueadas: int,
+        pickers: int,
+        grueros: int,
+        chequeadores: int,
+        parrilleros: int,
+        seed: int = None
+    ):
+        """
+        Pre-estimación analítica (M/G/c) de cargas y largo mínimo del turno noche
+        """
+        try:
+            config = DEFAULT_CONFIG.copy()
+            config.update({
+                "cap_picker": pickers,
+                "cap_gruero": grueros,
+                "cap_chequeador": chequeadores,
+                "cap_parrillero": parrilleros,
+            })
+            estimacion = estimar_cargas_noche(cajas_facturadas, cajas_piqueadas, config, seed=seed)
+            return self._convert_numpy_types(estimacion)
+        except Exception as e:
+            raise Exception(f"Error al estimar cargas: {str(e)}")
+
+    def preview_night_plan(self, cajas_facturadas: int, cajas_piqueadas: int, seed: int = None):
+        """
+        Plan de vueltas/camiones del turno noche sin simular (cacheado por seed)
+        """
+        try:
+            plan = preview_turno_noche(cajas_facturadas, cajas_piqueadas, DEFAULT_CONFIG, seed=seed)
+            return self._convert_numpy_types(plan)
         except Exception as e:
-            raise Exception(f"Error al ejecutar simulación: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error al planificar turno noche: {str(e)}")
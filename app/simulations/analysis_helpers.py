@@ -0,0 +1,243 @@
+# app/simulations/analysis_helpers.py
+"""
+Análisis sobre los resultados de los motores (noche, día o ciclo 24h).
+
+- resumen_kpis_noche / resumen_kpis_dia: KPIs escalares (los de sweep.py)
+  más la estadía de camiones y el cuello de botella principal.
+- ranking_cuellos_botella: recursos ordenados por su parte de la espera en
+  cola total y, a igualdad, por utilización (ambas ponderadas por tiempo,
+  de 'monitor_recursos').
+- descomposicion_estadia: por camión y vuelta, estadía = espera de grúa +
+  servicio de grúa + espera de chequeo + resto.
+- resumen_replicas: media / desvío / p5 / p95 de los KPIs de un lote de réplicas.
+
+Todo se calcula con pasadas vectorizadas (numpy) sobre los logs de
+operaciones del resultado; no se vuelve a recorrer la simulación. Donde se
+acepta un resultado del motor también se acepta un ResultadoColumnar
+(columnar.py): las columnas se leen directo de los memmap, sin armar dicts.
+"""
+import numpy as np
+
+from .sweep import kpis_noche, kpis_dia
+from .columnar import ResultadoColumnar, LOGS_COLUMNARES
+
+
+# ---------------------------------------------------------------------------
+# Utilidades
+# ---------------------------------------------------------------------------
+
+def _columna(registros, clave, defecto=0.0):
+    return np.fromiter(((r.get(clave) if r.get(clave) is not None else defecto) for r in registros),
+                       dtype=float, count=len(registros))
+
+
+def _serie(resultado, log, campo, defecto=0.0):
+    """Columna 'campo' del log (nombre de columnar.LOGS_COLUMNARES) como arreglo float."""
+    if isinstance(resultado, ResultadoColumnar):
+        x = resultado.tabla(log).get(campo)
+        if x is None:
+            return np.full(resultado.n(log), defecto)
+        return np.nan_to_num(x, nan=defecto) if x.dtype.kind == "f" else x
+    return _columna(resultado.get(LOGS_COLUMNARES[log][0]) or [], campo, defecto)
+
+
+def _percentil(x, q):
+    return float(np.percentile(x, q)) if len(x) else 0.0
+
+
+# ---------------------------------------------------------------------------
+# Cuellos de botella
+# ---------------------------------------------------------------------------
+
+def ranking_cuellos_botella(resultado):
+    """
+    [{recurso, utilizacion_pct, espera_cola_min, parte_espera_pct, cola_max, espera_media_min}, ...]
+    ordenado de mayor a menor cuello de botella.
+    """
+    monitor = resultado.get("monitor_recursos") or {}
+    nombres = [n for n in monitor if n != "patio_camiones"]
+    if not nombres:
+        return []
+    util = np.array([monitor[n].get("utilizacion_pct", 0.0) for n in nombres], dtype=float)
+    # área de cola = minutos-request esperando (Little)
+    espera = np.array([monitor[n].get("cola_media", 0.0) * monitor[n].get("horizonte_min", 0.0)
+                       for n in nombres], dtype=float)
+    total = espera.sum()
+    parte = 100.0 * espera / total if total > 0 else np.zeros_like(espera)
+    orden = np.lexsort((-util, -parte))
+    return [{
+        "recurso": nombres[i],
+        "utilizacion_pct": round(float(util[i]), 2),
+        "espera_cola_min": round(float(espera[i]), 2),
+        "parte_espera_pct": round(float(parte[i]), 2),
+        "cola_max": int(monitor[nombres[i]].get("cola_max", 0)),
+        "espera_media_min": round(float(monitor[nombres[i]].get("espera_media_min", 0.0)), 3),
+    } for i in orden]
+
+
+def diagnostico_bottleneck(resultado):
+    """Texto corto con el cuello de botella principal (y el segundo, si pesa)."""
+    ranking = ranking_cuellos_botella(resultado)
+    if not ranking:
+        return "sin datos de recursos"
+    p = ranking[0]
+    if p["espera_cola_min"] <= 0:
+        return (f"sin colas relevantes; recurso más cargado: {p['recurso']} "
+                f"({p['utilizacion_pct']:.1f}% de utilización)")
+    texto = (f"{p['recurso']}: {p['parte_espera_pct']:.0f}% de la espera en cola "
+             f"({p['espera_cola_min']:.0f} min, cola máx {p['cola_max']}), "
+             f"utilización {p['utilizacion_pct']:.1f}%")
+    if len(ranking) > 1 and ranking[1]["parte_espera_pct"] >= 20.0:
+        s = ranking[1]
+        texto += f"; luego {s['recurso']} ({s['parte_espera_pct']:.0f}% de la espera)"
+    return texto
+
+
+# ---------------------------------------------------------------------------
+# Estadía de camiones
+# ---------------------------------------------------------------------------
+
+def _cruce_estadia(resultado):
+    """
+    Columnas de eventos (con vuelta) y de grúa, con el camión como código int64
+    común a ambos logs: (camion, vuelta, inicio, fin, espera_chequeo), (camion, vuelta, wait, hold), nombres.
+    """
+    if isinstance(resultado, ResultadoColumnar):
+        ev = resultado.tabla("eventos")
+        if not ev:
+            return None
+        ok = np.asarray(ev["vuelta"]) != -1
+        ops = resultado.tabla("grua_ops")
+        op_cam = np.asarray(ops["camion"], dtype=np.int64) if ops else np.empty(0, np.int64)
+        op_v = np.asarray(ops["vuelta"], dtype=np.int64) if ops else np.empty(0, np.int64)
+        return ((np.asarray(ev["camion_id"], dtype=np.int64)[ok], np.asarray(ev["vuelta"], dtype=np.int64)[ok],
+                 _serie(resultado, "eventos", "inicio_min")[ok], _serie(resultado, "eventos", "fin_min")[ok],
+                 _serie(resultado, "eventos", "tiempo_espera_chequeo_min")[ok]),
+                (op_cam, op_v, _serie(resultado, "grua_ops", "wait"), _serie(resultado, "grua_ops", "hold")),
+                resultado.categorias.get("camion", []))
+
+    eventos = [e for e in (resultado.get("centro_eventos") or []) if e.get("vuelta") is not None]
+    if not eventos:
+        return None
+    codigos = {}
+    for e in eventos:
+        codigos.setdefault(e["camion_id"], len(codigos))
+    ops = resultado.get("grua_operaciones") or []
+    op_cam = np.fromiter((codigos.get(o.get("camion"), -1) for o in ops), dtype=np.int64, count=len(ops))
+    op_v = np.fromiter((-1 if o.get("vuelta") is None else o["vuelta"] for o in ops), dtype=np.int64, count=len(ops))
+    return ((np.fromiter((codigos[e["camion_id"]] for e in eventos), dtype=np.int64, count=len(eventos)),
+             np.fromiter((e["vuelta"] for e in eventos), dtype=np.int64, count=len(eventos)),
+             _columna(eventos, "inicio_min"), _columna(eventos, "fin_min"),
+             _columna(eventos, "tiempo_espera_chequeo_min")),
+            (op_cam, op_v, _columna(ops, "wait"), _columna(ops, "hold")),
+            list(codigos))
+
+
+def descomposicion_estadia(resultado):
+    """
+    Por (camión, vuelta) de centro_eventos: estadia_min, espera_grua_min,
+    servicio_grua_min, espera_chequeo_min y resto_min (estadía no explicada
+    por los anteriores: picking, parrilla, movilización, etc.).
+    """
+    cruce = _cruce_estadia(resultado)
+    if cruce is None:
+        return []
+    (ev_cam, ev_v, inicio, fin, espera_chk), (op_cam, op_v, wait, hold), camiones = cruce
+    n = len(ev_cam)
+    estadia = fin - inicio
+
+    # cruce por clave (camión, vuelta) con búsqueda binaria; ante claves repetidas gana el último evento
+    base = int(max(ev_v.max(initial=0), op_v.max(initial=0))) + 2
+    k_ev = ev_cam * base + (ev_v + 1)
+    orden = np.argsort(k_ev, kind="stable")
+    k_ord = k_ev[orden]
+    k_op = op_cam * base + (op_v + 1)
+    j = np.searchsorted(k_ord, k_op, side="right") - 1
+    ok = (op_cam >= 0) & (j >= 0)
+    ok[ok] &= k_ord[j[ok]] == k_op[ok]
+    pos = orden[j[ok]]
+    espera_grua = np.bincount(pos, weights=wait[ok], minlength=n)
+    servicio_grua = np.bincount(pos, weights=hold[ok], minlength=n)
+    # las operaciones de grúa de un camión pueden solaparse con otras fases; el resto no baja de 0
+    resto = np.maximum(estadia - espera_grua - servicio_grua - espera_chk, 0.0)
+
+    return [{
+        "camion_id": camiones[c], "vuelta": v,
+        "estadia_min": float(estadia[i]),
+        "espera_grua_min": float(espera_grua[i]),
+        "servicio_grua_min": float(servicio_grua[i]),
+        "espera_chequeo_min": float(espera_chk[i]),
+        "resto_min": float(resto[i]),
+    } for i, (c, v) in enumerate(zip(ev_cam.tolist(), ev_v.tolist()))]
+
+
+def _kpis_estadia(resultado):
+    filas = descomposicion_estadia(resultado)
+    estadia = _columna(filas, "estadia_min")
+    total = estadia.sum()
+    def _parte(clave):
+        return round(100.0 * float(_columna(filas, clave).sum()) / total, 2) if total > 0 else 0.0
+    return {
+        "camiones": len({f["camion_id"] for f in filas}),
+        "estadia_media_min": float(estadia.mean()) if len(estadia) else 0.0,
+        "estadia_p90_min": _percentil(estadia, 90),
+        "parte_espera_grua_pct": _parte("espera_grua_min"),
+        "parte_espera_chequeo_pct": _parte("espera_chequeo_min"),
+    }
+
+
+# ---------------------------------------------------------------------------
+# KPIs
+# ---------------------------------------------------------------------------
+
+def _cuello(resultado):
+    ranking = ranking_cuellos_botella(resultado)
+    return ranking[0]["recurso"] if ranking else None
+
+
+def _kpis_turno(resultado, kpis):
+    # un ResultadoColumnar trae los KPIs escalares calculados al guardarse
+    return dict(resultado.get("kpis") or {}) if isinstance(resultado, ResultadoColumnar) else kpis(resultado)
+
+
+def resumen_kpis_noche(noche):
+    out = {
+        "turno_fin_real": noche.get("turno_fin_real"),
+        **_kpis_turno(noche, kpis_noche),
+        **_kpis_estadia(noche),
+    }
+    out["cuello_botella"] = _cuello(noche)
+    return out
+
+
+def resumen_kpis_dia(dia):
+    t1_dur = _serie(dia, "t1_eventos", "tiempo_min")
+    out = {
+        "turno_fin_real": dia.get("turno_fin_real"),
+        **_kpis_turno(dia, kpis_dia),
+        **_kpis_estadia(dia),
+        "t1_estadia_media_min": float(t1_dur.mean()) if len(t1_dur) else 0.0,
+    }
+    out["cuello_botella"] = _cuello(dia)
+    return out
+
+
+def resumen_replicas(resultados, resumen=resumen_kpis_noche):
+    """{kpi: {media, desvio, p5, p95, n}} sobre los KPIs numéricos de varias réplicas."""
+    filas = [resumen(r) for r in resultados]
+    if not filas:
+        return {}
+    claves = [k for k, v in filas[0].items() if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    m = np.array([[float(f.get(k, np.nan)) for k in claves] for f in filas], dtype=float)
+    media = np.nanmean(m, axis=0)
+    desvio = np.nanstd(m, axis=0, ddof=1) if len(filas) > 1 else np.zeros(len(claves))
+    p5, p95 = np.nanpercentile(m, [5, 95], axis=0)
+    return {k: {"media": float(media[j]), "desvio": float(desvio[j]),
+                "p5": float(p5[j]), "p95": float(p95[j]), "n": len(filas)}
+            for j, k in enumerate(claves)}
+
+
+__all__ = [
+    "resumen_kpis_noche", "resumen_kpis_dia", "diagnostico_bottleneck",
+    "ranking_cuellos_botella", "descomposicion_estadia", "resumen_replicas",
+]
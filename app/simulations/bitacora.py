@@ -0,0 +1,195 @@
+# app/simulations/bitacora.py
+"""
+Bitácora estructurada de los motores (reemplaza los print()).
+
+- Niveles como los de logging (DEBUG=10, INFO=20, ...) más TRAZA=5.
+- Formateo diferido: se guarda la plantilla y sus argumentos; el texto se
+  arma sólo si una salida lo necesita. Los llamadores de alto volumen
+  consultan bitacora.habilitado(nivel) antes de preparar nada.
+- Muestreo determinista (fracción de registros bajo WARNING que se
+  conservan), sin tocar el RNG de la simulación.
+- Salidas enchufables: SalidaNula, SalidaMemoria (ring buffer acotado),
+  SalidaArchivo (JSONL) y SalidaLogging.
+"""
+import json
+import logging
+from collections import deque
+
+TRAZA = 5
+DEBUG = logging.DEBUG
+INFO = logging.INFO
+WARNING = logging.WARNING
+ERROR = logging.ERROR
+
+_NOMBRES = {TRAZA: "TRAZA", DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+
+class Registro:
+    __slots__ = ("nivel", "t", "mensaje", "args", "campos")
+
+    def __init__(self, nivel, t, mensaje, args, campos):
+        self.nivel, self.t, self.mensaje, self.args, self.campos = nivel, t, mensaje, args, campos
+
+    def texto(self):
+        msg = self.mensaje() if callable(self.mensaje) else self.mensaje
+        if self.args:
+            msg = msg % self.args
+        if self.t is not None:
+            msg = f"[{self.t:7.2f} min] {msg}"
+        if self.campos:
+            msg += " | " + " ".join(f"{k}={v}" for k, v in self.campos.items())
+        return msg
+
+    def como_dict(self):
+        return {"nivel": _NOMBRES.get(self.nivel, self.nivel), "t_min": self.t,
+                "mensaje": self.texto() if (self.args or callable(self.mensaje)) else self.mensaje,
+                "campos": self.campos or {}}
+
+
+# ---------------------------------------------------------------------------
+# Salidas
+# ---------------------------------------------------------------------------
+
+class SalidaNula:
+    def escribir(self, registro):
+        pass
+
+    def cerrar(self):
+        pass
+
+
+class SalidaMemoria:
+    """Ring buffer con los últimos 'capacidad' registros (sin formatear)."""
+
+    def __init__(self, capacidad=10_000):
+        self.registros = deque(maxlen=capacidad)
+        self.descartados = 0
+
+    def escribir(self, registro):
+        if len(self.registros) == self.registros.maxlen:
+            self.descartados += 1
+        self.registros.append(registro)
+
+    def volcar(self):
+        return [r.como_dict() for r in self.registros]
+
+    def cerrar(self):
+        pass
+
+
+class SalidaArchivo:
+    """Un registro JSON por línea."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._f = open(ruta, "a", encoding="utf-8")
+
+    def escribir(self, registro):
+        self._f.write(json.dumps(registro.como_dict(), ensure_ascii=False, default=str) + "\n")
+
+    def cerrar(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+
+class SalidaLogging:
+    """Delegado a logging (el formateo lo hace logging sólo si el handler emite)."""
+
+    def __init__(self, logger="app.simulations"):
+        self.logger = logging.getLogger(logger) if isinstance(logger, str) else logger
+
+    def escribir(self, registro):
+        nivel = max(registro.nivel, DEBUG)
+        if self.logger.isEnabledFor(nivel):
+            self.logger.log(nivel, "%s", _Diferido(registro))
+
+    def cerrar(self):
+        pass
+
+
+class _Diferido:
+    __slots__ = ("registro",)
+
+    def __init__(self, registro):
+        self.registro = registro
+
+    def __str__(self):
+        return self.registro.texto()
+
+
+# ---------------------------------------------------------------------------
+# Bitácora
+# ---------------------------------------------------------------------------
+
+class Bitacora:
+    """
+    bitacora.debug("Sale camión %s", cid, t=env.now, retorno=hhmm)
+    Registros con nivel < 'nivel' se descartan sin formatear.
+    """
+
+    def __init__(self, nivel=INFO, salidas=None, muestreo=1.0):
+        self.nivel = nivel
+        self.salidas = list(salidas) if salidas is not None else [SalidaMemoria()]
+        self.muestreo = float(muestreo)
+        self._vistos = 0
+        self._emitidos = 0
+
+    def habilitado(self, nivel):
+        return nivel >= self.nivel
+
+    def emitir(self, nivel, mensaje, *args, t=None, **campos):
+        if nivel < self.nivel:
+            return
+        if nivel < WARNING and self.muestreo < 1.0:
+            # muestreo determinista: conserva floor(n·fracción) de n registros
+            self._vistos += 1
+            if int(self._vistos * self.muestreo) <= self._emitidos:
+                return
+            self._emitidos += 1
+        registro = Registro(nivel, t, mensaje, args, campos)
+        for s in self.salidas:
+            s.escribir(registro)
+
+    def traza(self, mensaje, *args, **kw):
+        self.emitir(TRAZA, mensaje, *args, **kw)
+
+    def debug(self, mensaje, *args, **kw):
+        self.emitir(DEBUG, mensaje, *args, **kw)
+
+    def info(self, mensaje, *args, **kw):
+        self.emitir(INFO, mensaje, *args, **kw)
+
+    def warning(self, mensaje, *args, **kw):
+        self.emitir(WARNING, mensaje, *args, **kw)
+
+    def cerrar(self):
+        for s in self.salidas:
+            s.cerrar()
+
+
+class _BitacoraNula(Bitacora):
+    def __init__(self):
+        super().__init__(nivel=float("inf"), salidas=[])
+
+    def emitir(self, nivel, mensaje, *args, t=None, **campos):
+        pass
+
+
+BITACORA_NULA = _BitacoraNula()
+
+
+def bitacora_desde_cfg(cfg, bitacora=None):
+    """La bitácora explícita gana; si no, cfg['debug'] => DEBUG a logging; si no, nula."""
+    if bitacora is not None:
+        return bitacora
+    if cfg.get("debug", False):
+        return Bitacora(nivel=DEBUG, salidas=[SalidaLogging()])
+    return BITACORA_NULA
+
+
+__all__ = [
+    "Bitacora", "BITACORA_NULA", "bitacora_desde_cfg",
+    "SalidaNula", "SalidaMemoria", "SalidaArchivo", "SalidaLogging",
+    "TRAZA", "DEBUG", "INFO", "WARNING", "ERROR",
+]
@@ -0,0 +1,172 @@
+# app/simulations/columnar.py
+"""
+Resultados en formato columnar, para analizar muchas corridas sin cargar JSON.
+
+guardar_columnas(resultado, directorio, turno) escribe, por cada log de
+LOGS_COLUMNARES, un .npy por campo (<log>.<campo>.npy) y al final un
+manifest.json chico con la cantidad de filas, los dtypes, las categorías de
+los campos de texto y los escalares que usan los análisis (KPIs del turno,
+monitor_recursos, turno_fin_real). Un directorio sin manifest.json es una
+escritura interrumpida y se ignora.
+
+- Números: float64 (None -> NaN). Vueltas: int32 (None -> -1).
+- Textos (camión, etiqueta de grúa): códigos int32 sobre una lista de
+  categorías por dominio; 'camion' es el mismo dominio en todos los logs,
+  así que eventos y grúa se cruzan comparando códigos.
+
+ResultadoColumnar(directorio) abre las columnas con np.load(mmap_mode="r"):
+no se copia nada a memoria hasta que un cálculo lee las páginas. Los
+análisis de analysis_helpers aceptan un ResultadoColumnar donde aceptan un
+resultado del motor.
+"""
+import json
+import os
+
+import numpy as np
+
+from .sweep import kpis_noche, kpis_dia
+
+VERSION = 1
+MANIFIESTO = "manifest.json"
+
+# log -> (clave en el resultado del motor, {campo: tipo}); tipo: "f8", "i4" o "cat:<dominio>"
+LOGS_COLUMNARES = {
+    "eventos": ("centro_eventos", {
+        "camion_id": "cat:camion", "vuelta": "i4", "inicio_min": "f8", "fin_min": "f8",
+        "tiempo_espera_chequeo_min": "f8",
+    }),
+    "grua_ops": ("grua_operaciones", {
+        "camion": "cat:camion", "vuelta": "i4", "label": "cat:label",
+        "start": "f8", "end": "f8", "wait": "f8", "hold": "f8",
+    }),
+    "t1_eventos": ("t1_eventos", {"inicio_min": "f8", "fin_min": "f8", "tiempo_min": "f8"}),
+}
+
+_KPIS = {"noche": kpis_noche, "dia": kpis_dia}
+
+
+def _codificar(valores, categorias):
+    codigos = np.empty(len(valores), dtype=np.int32)
+    for i, v in enumerate(valores):
+        if v is None:
+            codigos[i] = -1
+            continue
+        c = categorias.get(v)
+        if c is None:
+            c = categorias[v] = len(categorias)
+        codigos[i] = c
+    return codigos
+
+
+def _columna(registros, campo, tipo, categorias):
+    valores = [r.get(campo) for r in registros]
+    if tipo.startswith("cat:"):
+        return _codificar(valores, categorias.setdefault(tipo[4:], {}))
+    if tipo == "i4":
+        return np.array([-1 if v is None else v for v in valores], dtype=np.int32)
+    return np.array([np.nan if v is None else v for v in valores], dtype=np.float64)
+
+
+def guardar_columnas(resultado, directorio, turno="noche"):
+    """Escribe el resultado de un turno ('noche' o 'dia') en 'directorio'; devuelve el manifiesto."""
+    if turno not in _KPIS:
+        raise ValueError(f"Turno desconocido: {turno!r} (use 'noche' o 'dia')")
+    os.makedirs(directorio, exist_ok=True)
+    ruta_manifiesto = os.path.join(directorio, MANIFIESTO)
+    if os.path.exists(ruta_manifiesto):
+        os.remove(ruta_manifiesto)
+
+    categorias, logs = {}, {}
+    for log, (clave, campos) in LOGS_COLUMNARES.items():
+        registros = resultado.get(clave)
+        if registros is None:
+            continue
+        columnas = {}
+        for campo, tipo in campos.items():
+            arr = _columna(registros, campo, tipo, categorias)
+            archivo = f"{log}.{campo}.npy"
+            np.save(os.path.join(directorio, archivo), arr)
+            columnas[campo] = {"archivo": archivo, "dtype": arr.dtype.str}
+            if tipo.startswith("cat:"):
+                columnas[campo]["dominio"] = tipo[4:]
+        logs[log] = {"n": len(registros), "columnas": columnas}
+        # un RegistroAcotado truncado guarda sólo su muestra
+        if getattr(registros, "truncado", False):
+            logs[log].update(truncado=True, n_total=registros.n)
+
+    manifiesto = {
+        "formato": "columnar",
+        "version": VERSION,
+        "turno": turno,
+        "logs": logs,
+        "categorias": {dom: list(cats) for dom, cats in categorias.items()},
+        "resumen": {
+            "turno_fin_real": resultado.get("turno_fin_real"),
+            "monitor_recursos": resultado.get("monitor_recursos") or {},
+            "kpis": _KPIS[turno](resultado),
+        },
+    }
+    # el manifiesto va último: marca la corrida como completa
+    with open(ruta_manifiesto, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, ensure_ascii=False, default=float)
+    return manifiesto
+
+
+class ResultadoColumnar:
+    """Columnas de una corrida guardada con guardar_columnas (memmap de sólo lectura)."""
+
+    def __init__(self, directorio, mmap=True):
+        self.directorio = str(directorio)
+        with open(os.path.join(self.directorio, MANIFIESTO), "r", encoding="utf-8") as f:
+            self.manifiesto = json.load(f)
+        if self.manifiesto.get("formato") != "columnar":
+            raise ValueError(f"{self.directorio!r} no es un resultado columnar")
+        self.turno = self.manifiesto["turno"]
+        self.categorias = self.manifiesto.get("categorias", {})
+        self._mmap = "r" if mmap else None
+        self._tablas = {}
+
+    def n(self, log):
+        return self.manifiesto["logs"].get(log, {}).get("n", 0)
+
+    def tabla(self, log):
+        """{campo: array} del log ({} si no se guardó)."""
+        tabla = self._tablas.get(log)
+        if tabla is None:
+            info = self.manifiesto["logs"].get(log, {})
+            # np.load no puede mapear un arreglo vacío
+            modo = self._mmap if info.get("n") else None
+            tabla = self._tablas[log] = {
+                campo: np.load(os.path.join(self.directorio, c["archivo"]), mmap_mode=modo)
+                for campo, c in info.get("columnas", {}).items()
+            }
+        return tabla
+
+    def decodificar(self, log, campo, codigos=None):
+        """Textos de una columna categórica (None para -1)."""
+        dominio = self.manifiesto["logs"][log]["columnas"][campo]["dominio"]
+        cats = self.categorias.get(dominio, [])
+        codigos = self.tabla(log)[campo] if codigos is None else codigos
+        return [cats[c] if c >= 0 else None for c in np.asarray(codigos).tolist()]
+
+    def get(self, clave, defecto=None):
+        """Escalares del resumen (monitor_recursos, turno_fin_real, kpis)."""
+        return self.manifiesto["resumen"].get(clave, defecto)
+
+
+def abrir_corridas(directorio, turno=None):
+    """ResultadoColumnar de cada subdirectorio completo (con manifiesto), en orden de ruta."""
+    corridas = []
+    for raiz, _, archivos in sorted(os.walk(directorio)):
+        if MANIFIESTO not in archivos:
+            continue
+        try:
+            r = ResultadoColumnar(raiz)
+        except ValueError:
+            continue   # otro manifiesto (p.ej. el checkpoint de un barrido)
+        if turno is None or r.turno == turno:
+            corridas.append(r)
+    return corridas
+
+
+__all__ = ["LOGS_COLUMNARES", "guardar_columnas", "ResultadoColumnar", "abrir_corridas"]
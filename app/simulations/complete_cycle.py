@@ -1,13 +1,28 @@
+import os
+
 from .night.config import DEFAULT_CONFIG as DEFAULT_NIGHT_CFG
 from .night.simulation import simular_turno_prioridad_rng
 from .day.simulation import simular_turno_dia
 from .day.config import get_day_config
+from .trace_export import EscritorTraza
 
 def simular_ciclo_completo_24h(total_cajas_facturadas, cajas_para_pick, seed=None,
-                               cfg_noche=None):
+                               cfg_noche=None, cfg_dia=None, traza=None, dia=0, bitacora=None):
     """
     Ejecuta: Turno NOCHE -> genera estado -> Turno DÍA (2ª vuelta), y retorna ambos resultados.
+
+    'traza': ruta (o EscritorTraza abierto) donde escribir ambos turnos como
+    Chrome trace-event JSON, con los spans del motor como segundo proceso.
+    'bitacora': Bitacora compartida por ambos turnos (ver bitacora.py).
     """
+    if isinstance(traza, (str, os.PathLike)):
+        with EscritorTraza(traza, incluir_motor=True) as escritor:
+            res = simular_ciclo_completo_24h(total_cajas_facturadas, cajas_para_pick, seed=seed,
+                                             cfg_noche=cfg_noche, cfg_dia=cfg_dia, traza=escritor, dia=dia,
+                                             bitacora=bitacora)
+        res["traza"] = traza
+        return res
+
     # --- Turno Noche
     night_cfg = dict(DEFAULT_NIGHT_CFG)
     if cfg_noche:
@@ -18,14 +33,19 @@ def simular_ciclo_completo_24h(total_cajas_facturadas, cajas_para_pick, seed=Non
         cajas_para_pick=cajas_para_pick,
         cfg=night_cfg,
         seed=seed,
+        traza=traza,
+        dia=dia,
+        bitacora=bitacora,
     )
 
     # --- Turno Día (a partir del estado de noche)
     estado_inicial = turno_noche.get("estado_inicial_dia", {})  # generado por reporting del turno noche
     day_cfg = get_day_config()
-   
+    if cfg_dia:
+        day_cfg.update(cfg_dia)
 
-    turno_dia = simular_turno_dia(estado_inicial, seed=seed)
+    turno_dia = simular_turno_dia(estado_inicial, seed=seed, cfg=day_cfg, traza=traza, dia=dia,
+                                  bitacora=bitacora)
 
     return {
         "turno_noche": turno_noche,
@@ -9,8 +9,14 @@ from .dists import (
     sample_lognormal_retorno_camion,
     sample_delta_hito0_1, sample_delta_hito1_2, sample_delta_hito2_3,
 )
-from .metrics import calcular_ocupacion_recursos
+from .metrics import calcular_ocupacion_recursos, curvas_ocupacion
 from .utils import formatear_cronograma_dia, sample_num_camiones_t1_dia
+from ..instrumentation import seccion
+from ..bitacora import bitacora_desde_cfg, DEBUG, INFO
+from ..presentacion import formatear_horas_centro, formatear_registros
+from ..registros import crear_registro, agregar, estado_registros, RegistroAcotado
+from ..volcado import volcado_desde_cfg
+from ..recursos import RecursoMonitoreado, RecursoProgramado, RecursoPrioridadProgramado, resumen_monitores
 
 def _fmt(mins):
     try: mins = float(mins)
@@ -20,35 +26,57 @@ def _fmt(mins):
     if m > 0: return f"{m}m {s:02d}s"
     return f"{mins:.2f} min"
 
+LOGS_ACOTADOS = ("grua_ops", "cheq_pallet_ops", "patio_eq_trace", "linea_tiempo")
+# completos aunque haya presupuesto (se informan en registros_truncados con el motivo)
+LOGS_COMPLETOS = {"eventos": "un registro por camión y vuelta (crece con el plan, no con las operaciones); "
+                             "lo usan completo el cronograma del día y el resumen por camión"}
+
+
 class CentroDia:
     """Chequeo + carga de pallets para vueltas >=2 y flujo T1 por hitos."""
-    def __init__(self, env, cfg):
+    def __init__(self, env, cfg, bitacora=None):
         self.env, self.cfg = env, cfg
+        self.bitacora = bitacora_desde_cfg(cfg, bitacora)
+        self._debug = self.bitacora.habilitado(DEBUG)
 
         # Recursos
-        self.grua  = simpy.PriorityResource(env, capacity=cfg.get("cap_gruero", 4))
-        self.cheq  = simpy.Resource(env, capacity=cfg.get("cap_chequeador", 2))
-        self.parr  = simpy.Resource(env, capacity=cfg.get("cap_parrillero", 1))
-        self.movi  = simpy.Resource(env, capacity=cfg.get("cap_movilizador", 1))
-        self.patio_camiones = simpy.Resource(env, capacity=cfg.get("cap_patio", 10))
-        self.porteria = simpy.Resource(env, capacity=cfg.get("cap_porteria", 1))
+        muestreo = cfg.get("monitor_muestreo_min")
+        self.grua  = RecursoPrioridadProgramado(env, capacity=cfg.get("cap_gruero", 4), nombre="grueros", muestreo_min=muestreo)
+        self.cheq  = RecursoProgramado(env, capacity=cfg.get("cap_chequeador", 2), nombre="chequeadores", muestreo_min=muestreo)
+        self.parr  = RecursoProgramado(env, capacity=cfg.get("cap_parrillero", 1), nombre="parrilleros", muestreo_min=muestreo)
+        self.movi  = RecursoProgramado(env, capacity=cfg.get("cap_movilizador", 1), nombre="movilizadores", muestreo_min=muestreo)
+        self.patio_camiones = RecursoMonitoreado(env, capacity=cfg.get("cap_patio", 10), nombre="patio_camiones", muestreo_min=muestreo)
+        self.porteria = RecursoProgramado(env, capacity=cfg.get("cap_porteria", 1), nombre="porteros", muestreo_min=muestreo)
+        self.recursos_monitoreados = {
+            "grueros": self.grua, "chequeadores": self.cheq, "parrilleros": self.parr,
+            "movilizadores": self.movi, "patio_camiones": self.patio_camiones, "porteros": self.porteria,
+        }
 
         # --- Patio equivalente (T2=1, T1=2) ---
         self.patio_eq_cap = cfg.get("patio_eq_cap", 4)
         self.patio_equivalentes = simpy.Container(self.env, init=self.patio_eq_cap, capacity=self.patio_eq_cap)
-        self.patio_eq_trace = []  # (op, t, k, quien, level_restante)
+        # con cfg["volcado_registros"] los logs se escriben a disco a medida que se generan
+        self.volcado = volcado_desde_cfg(cfg, "dia")
+        self.registros_en_disco = None
+        # (op, t, k, quien, level_restante)
+        self.patio_eq_trace = crear_registro(cfg, "patio_eq_trace", campos=(2,), agrupar_por=(0,),
+                                             volcado=self.volcado)
 
         # Chequeo global
         self.queue_chequeo = simpy.Store(env)
 
         # Logs/Métricas
-        self.eventos = []
-        self.grua_ops = []
+        # eventos (uno por camión y vuelta) no se acota: ver LOGS_COMPLETOS
+        self.eventos = crear_registro(cfg, "eventos", volcado=self.volcado, acotar=False)
+        self.grua_ops = crear_registro(cfg, "grua_ops", campos=("wait", "hold"), agrupar_por=("vuelta", "label"),
+                                       volcado=self.volcado)
         self.cheq_ops = []
         self.parr_ops = []
         self.movi_ops = []
         self.port_ops = []
         self.pick_ops = []
+        # chequeo global de pallets (no entra en cheq_ops/ocupación)
+        self.cheq_pallet_ops = crear_registro(cfg, "cheq_pallet_ops", campos=("hold",), volcado=self.volcado)
 
         self.t1_eventos = []
         self.t1_contador = 0
@@ -65,7 +93,7 @@ class CentroDia:
             "movilizadores": {"tiempo_activo": 0, "operaciones": 0},
             "porteros": {"tiempo_activo": 0, "operaciones": 0},
         }
-        self.linea_tiempo = []
+        self.linea_tiempo = crear_registro(cfg, "linea_tiempo", campos=("tiempo_min",), volcado=self.volcado)
 
     def _abs_min(self, hhmm_or_int):
         """Convierte 'HH:MM' o int a minutos absolutos [0..1440)."""
@@ -76,19 +104,21 @@ class CentroDia:
 
     def _aplicar_capacidades(self, caps: dict):
         """Actualiza la dotación (capacity) de recursos según 'caps'."""
-        if "grua" in caps:        self.grua._capacity = int(caps["grua"])
-        if "chequeador" in caps:  self.cheq._capacity = int(caps["chequeador"])
-        if "parrillero" in caps:  self.parr._capacity = int(caps["parrillero"])
-        if "movilizador" in caps: self.movi._capacity = int(caps["movilizador"])
-        if "porteria" in caps:    self.porteria._capacity = int(caps["porteria"])
+        # fijar_capacidad: al subir atiende la cola en el acto; al bajar drena sin expulsar
+        if "grua" in caps:        self.grua.fijar_capacidad(caps["grua"])
+        if "chequeador" in caps:  self.cheq.fijar_capacidad(caps["chequeador"])
+        if "parrillero" in caps:  self.parr.fijar_capacidad(caps["parrillero"])
+        if "movilizador" in caps: self.movi.fijar_capacidad(caps["movilizador"])
+        if "porteria" in caps:    self.porteria.fijar_capacidad(caps["porteria"])
 
         # Debug del cambio
-        self._dbg("🔁 Cambio de turno aplicado",
-                grua=self.grua._capacity,
-                chequeador=self.cheq._capacity,
-                parrillero=self.parr._capacity,
-                movilizador=self.movi._capacity,
-                porteria=self.porteria._capacity)
+        if self._debug:
+            self._dbg("🔁 Cambio de turno aplicado",
+                    grua=self.grua.capacity,
+                    chequeador=self.cheq.capacity,
+                    parrillero=self.parr.capacity,
+                    movilizador=self.movi.capacity,
+                    porteria=self.porteria.capacity)
 
 
     # ---- Helpers patio equivalente (con DEBUG) ----
@@ -101,7 +131,8 @@ class CentroDia:
         """
         cap = self.patio_eq_cap
         libres_antes = self.patio_equivalentes.level
-        self._dbg("⏳ Solicita patio", quien=quien, solicitados=k, libres=f"{libres_antes}/{cap}")
+        if self._debug:
+            self._dbg("⏳ Solicita patio", quien=quien, solicitados=k, libres=f"{libres_antes}/{cap}")
 
         t0 = self.env.now
         # Bloquea hasta tener cupos suficientes
@@ -113,10 +144,11 @@ class CentroDia:
 
         # Traza + debug
         self.patio_eq_trace.append(("GET", self.env.now, k, quien, libres_despues))
-        self._dbg("🚪 ENTRA a patio", quien=quien, equivalentes=k,
-                espera_min=round(wait, 2),
-                libres=f"{libres_despues}/{cap}",
-                ocupacion_eq=ocupacion)
+        if self._debug:
+            self._dbg("🚪 ENTRA a patio", quien=quien, equivalentes=k,
+                    espera_min=round(wait, 2),
+                    libres=f"{libres_despues}/{cap}",
+                    ocupacion_eq=ocupacion)
 
     def _gestor_turnos(self):
         """
@@ -163,13 +195,18 @@ class CentroDia:
 
         # Traza + debug
         self.patio_eq_trace.append(("PUT", self.env.now, k, quien, libres))
-        self._dbg("🏁 SALE de patio", quien=quien, equivalentes=k,
-                libres=f"{libres}/{self.patio_eq_cap}",
-                ocupacion_eq=ocupacion)
+        if self._debug:
+            self._dbg("🏁 SALE de patio", quien=quien, equivalentes=k,
+                    libres=f"{libres}/{self.patio_eq_cap}",
+                    ocupacion_eq=ocupacion)
 
     def resumen_patio_equivalentes(self):
         if not self.patio_eq_trace:
             return {"timeline": [], "violaciones": []}
+        if isinstance(self.patio_eq_trace, RegistroAcotado) and self.patio_eq_trace.truncado:
+            # con una muestra no se puede reconstruir el nivel del patio
+            return {"timeline": [], "violaciones": [], "truncado": True,
+                    "operaciones": {op: g["n"] for op, g in agregar(self.patio_eq_trace, (2,), por=0).items()}}
         ev = []
         for op, t, k, quien, level in self.patio_eq_trace:
             delta = +k if op == "GET" else -k
@@ -194,7 +231,10 @@ class CentroDia:
                 yield c
                 t_espera = self.env.now - t_request
                 t_chk = sample_tiempo_chequeo_unitario(rng=self.rng)
+                t_chk_start = self.env.now
                 yield self.env.timeout(t_chk)
+                self.cheq_pallet_ops.append({"vuelta": vuelta, "camion": camion_id, "pallet_id": pallet.get("id"),
+                                             "start": t_chk_start, "end": self.env.now, "hold": t_chk})
                 self.metricas_chequeadores["operaciones_totales"] += 1
                 self.metricas_chequeadores["tiempo_total_activo"] += t_chk
                 self.metricas_chequeadores["tiempo_total_espera"] += t_espera
@@ -219,19 +259,17 @@ class CentroDia:
 
     # ------------------------------- Depuración --------------------------------
     def _dbg(self, msg, **meta):
-        if not self.cfg.get("debug", False):
+        """Registro DEBUG; los llamadores lo guardan con 'if self._debug' para no armar los argumentos."""
+        if not self._debug:
             return
         t = self.env.now
-        hhmm = hhmm_dias(self.cfg.get("shift_start_min", 0) + t)
-        base = f"[{t:7.2f} min | {hhmm}] {msg}"
-        extras = " | " + " ".join(f"{k}={v}" for k, v in meta.items()) if meta else ""
-        print(base + extras)
+        self.bitacora.debug(msg, t=t, hhmm=hhmm_dias(self.cfg.get("shift_start_min", 0) + t), **meta)
 
     # ----------------------- Utilidades internas de registro -------------------
     def _registrar(self, descripcion, tipo="general", meta=None):
         t = self.env.now
         self.linea_tiempo.append({
-            "tiempo_min": t, "hora": hhmm_dias(self.cfg.get("shift_start_min", 0) + t),
+            "tiempo_min": t,
             "descripcion": descripcion, "tipo": tipo, "metadata": meta or {},
         })
         #self._dbg(f"📝 {tipo.upper()}: {descripcion}", **(meta or {}))
@@ -294,8 +332,6 @@ class CentroDia:
                         "total_cajas_completas": sum(p.get("cajas", 0) for p in pallets if not p.get("mixto", False)),
                     },
                     "inicio_min": t0, "fin_min": t1,
-                    "inicio_hhmm": hhmm_dias(cfg.get("shift_start_min", 0) + t0),
-                    "fin_hhmm": hhmm_dias(cfg.get("shift_start_min", 0) + t1),
                     "tiempo_min": t1 - t0,
                     "modo": "carga_dia",
                 })
@@ -358,8 +394,6 @@ class CentroDia:
         dur = t_fin - t_inicia
         self.t1_eventos.append({
             "camion_id": camion_id, "inicio_min": t_inicia, "fin_min": t_fin,
-            "inicio_hhmm": hhmm_dias(cfg.get("shift_start_min", 0) + t_inicia),
-            "fin_hhmm": hhmm_dias(cfg.get("shift_start_min", 0) + t_fin),
             "modo": "T1", "hitos": [0, 1, 2, 3], "tiempo_min": dur,
             "pre_asignados": 0, "post_cargados": 0, "num_pallets": 0,
             "fusionados": 0, "corregidos": 0, "cajas_pre": 0, "cajas_pick_mixto": 0,
@@ -371,8 +405,6 @@ class CentroDia:
         self.eventos.append({
             "camion_id": camion_id, "vuelta": None,
             "inicio_min": t_inicia, "fin_min": t_fin,
-            "inicio_hhmm": hhmm_dias(cfg.get("shift_start_min", 0) + t_inicia),
-            "fin_hhmm": hhmm_dias(cfg.get("shift_start_min", 0) + t_fin),
             "modo": "T1", "tiempo_min": dur,
             "pre_asignados": 0, "post_cargados": 0, "num_pallets": 0,
             "fusionados": 0, "corregidos": 0, "cajas_pre": 0, "cajas_pick_mixto": 0,
@@ -396,8 +428,7 @@ class CentroDia:
         params = self.cfg.get("t1_cantidad_dia_weibull") or self.cfg.get("t1_llegadas_weibull", {})
         max_por_dia = self.cfg.get("t1_max_por_dia")
         N = sample_num_camiones_t1_dia(self.rng, params, max_camiones=max_por_dia)
-        if self.cfg.get("debug", False):
-            print(f"=== 🚚 T1: cantidad del día (Weibull→entero) = {N}  (máx={max_por_dia}) ===")
+        self.bitacora.info("🚚 T1: cantidad del día (Weibull→entero) = %s (máx=%s)", N, max_por_dia)
         if N <= 0 or duracion_turno <= 0:
             return
 
@@ -430,13 +461,12 @@ class CentroDia:
                     if cid:
                         pendientes_v1.add(cid)
 
-        if self.cfg.get("debug", False):
-            print("\n=== 📦 ASIGNACIONES DÍA (entrada) ===")
+        if self._debug:
             for a in asignaciones:
-                cajas = sum(p.get("cajas", 0) for p in a["pallets"])
-                print(f" - Camión {a['camion_id']}: pallets={len(a['pallets'])} cajas={cajas} vuelta={a.get('vuelta', 2)}")
-            if pendientes_v1:
-                print(f"=== 🚚 V1 pendientes de salida (día): {sorted(pendientes_v1)} ===")
+                self.bitacora.debug("📦 Asignación día: camión %s", a["camion_id"], pallets=len(a["pallets"]),
+                                    cajas=sum(p.get("cajas", 0) for p in a["pallets"]), vuelta=a.get("vuelta", 2))
+        if pendientes_v1:
+            self.bitacora.info("🚚 V1 pendientes de salida (día): %s", sorted(pendientes_v1))
 
         # 1) Inicializar chequeo global
         for a in asignaciones:
@@ -484,7 +514,7 @@ class CentroDia:
                     self.movi_ops.append({"start": t_movi_start, "end": t_movi_end, "hold": t_m})
                     self.metricas_recursos["movilizadores"]["operaciones"] += 1
             ts = self.env.now
-            salidas_v1_pendientes.append({"camion_id": cid, "vuelta": 1, "hora_salida": hhmm_dias(self.cfg.get("shift_start_min", 0) + ts)})
+            salidas_v1_pendientes.append({"camion_id": cid, "vuelta": 1, "salida_min": ts})
             ev = evt_salio_v1.get(cid)
             if ev and not ev.triggered: ev.succeed()
 
@@ -499,23 +529,20 @@ class CentroDia:
                 arrive_min = base_travel_min
             else:
                 arrive_min = base_travel_min
-            arrive_hhmm = hhmm_dias(self.cfg.get("shift_start_min", 0) + self.env.now + arrive_min)
-            #self._dbg(f"🛣️ EN RUTA V{lotes[0]['vuelta']}: ETA llegada",
-                      #camion=camion_id, eta_min=f"{arrive_min:.2f}", eta_hhmm=arrive_hhmm)
+            if self._debug:
+                self._dbg(f"🛣️ EN RUTA V{lotes[0]['vuelta']}: ETA llegada", camion=camion_id, eta_min=round(arrive_min, 2))
             yield self.env.timeout(max(0.0, arrive_min))
             #self._dbg(f"⬅️  LLEGA camión V{lotes[0]['vuelta']}", camion=camion_id)
 
             for i, lote in enumerate(lotes):
                 v = lote["vuelta"]; pallets = lote["pallets"]
                 t_fin = (yield self.env.process(self.procesar_vuelta(camion_id, pallets, vuelta=v)))
-                salidas.append({"camion_id": camion_id, "vuelta": v, "hora_salida": hhmm_dias(self.cfg.get("shift_start_min", 0) + t_fin)})
+                salidas.append({"camion_id": camion_id, "vuelta": v, "salida_min": t_fin})
 
                 ret_min = sample_lognormal_retorno_camion(self.rng)
-                ret_eta_hhmm = hhmm_dias(self.cfg.get("shift_start_min", 0) + self.env.now + ret_min)
-                #self._dbg("🛣️  RETORNA: ETA retorno", camion=camion_id, vuelta=v, eta_min=f"{ret_min:.2f}", eta_hhmm=ret_eta_hhmm)
                 yield self.env.timeout(max(0.0, ret_min))
                 self._registrar(f"camion {camion_id} retorna tras vuelta {v}", "retorno_camion", {"camion": camion_id, "vuelta": v})
-                retornos.append({"camion_id": camion_id, "vuelta": v, "hora_retorno": hhmm_dias(self.cfg.get("shift_start_min", 0) + self.env.now)})
+                retornos.append({"camion_id": camion_id, "vuelta": v, "retorno_min": self.env.now})
                 if i + 1 < len(lotes):
                     next_v = lotes[i + 1]["vuelta"]
                     #self._dbg(f"⬅️  LLEGA camión V{next_v}", camion=camion_id)
@@ -527,33 +554,56 @@ class CentroDia:
         turno_ini = self.cfg.get("shift_start_min", 0)
         turno_fin_abs = self.cfg.get("shift_end_min", 1440)
         duracion_turno = max(0, turno_fin_abs - turno_ini)
-        self.env.run(until=duracion_turno)
-
-        total_linea = max((e["tiempo_min"] for e in self.linea_tiempo), default=0)
+        try:
+            with seccion(self.env, "simpy.run"):
+                self.env.run(until=duracion_turno)
+        finally:
+            if self.volcado is not None:
+                # se cierra antes de formatear (los archivos llevan sólo minutos) y también si la corrida falla
+                self.registros_en_disco = self.volcado.cerrar()
+
+        # Los registros del motor sólo tienen minutos; HH:MM se arma acá, en lote
+        with seccion(self.env, "presentacion.formatear_horas"):
+            formatear_horas_centro(self, turno_ini)
+            formatear_registros(salidas, {"hora_salida": "salida_min"}, turno_ini)
+            formatear_registros(retornos, {"hora_retorno": "retorno_min"}, turno_ini)
+
+        linea = agregar(self.linea_tiempo, ("tiempo_min",)).get(None)
+        total_linea = linea["tiempo_min"]["max"] if linea else 0
         total_fin = max(max((e.get("fin_min", 0) for e in self.eventos), default=0), total_linea)
 
-        ocupacion = calcular_ocupacion_recursos(self, self.cfg, tiempo_total_turno=max(total_fin, duracion_turno))
+        with seccion(self.env, "metricas.calcular_ocupacion_recursos"):
+            ocupacion = calcular_ocupacion_recursos(self, self.cfg, tiempo_total_turno=max(total_fin, duracion_turno))
+        with seccion(self.env, "metricas.curvas_ocupacion"):
+            ocupacion_horaria = curvas_ocupacion(self, self.cfg, bin_min=self.cfg.get("bin_ocupacion_min", 60))
 
-        if self.cfg.get("debug", False):
-            print("\n=== 📊 RESUMEN DÍA ===")
-            print(f"Camiones procesados (eventos en patio): {len(self.eventos)}")
-            print(f"Camiones T1 generados: {self.t1_contador}")
-            print(f"Ocupación recursos:")
+        if self.bitacora.habilitado(INFO):
+            self.bitacora.info("📊 Resumen día", camiones_procesados=len(self.eventos), t1_generados=self.t1_contador)
             for k, v in ocupacion.items():
-                pct = v.get("porcentaje_ocupacion", 0); t_act = v.get("tiempo_activo", 0); ops  = v.get("operaciones", 0)
-                print(f" - {k:14s} -> {pct:5.1f}%  activo={_fmt(t_act)}  ops={ops}")
-            print("=====================================\n")
+                if k == "resumen":
+                    continue
+                self.bitacora.info("Ocupación %-14s -> %5.1f%%", k, v.get("porcentaje_ocupacion", 0),
+                                   activo=_fmt(v.get("tiempo_activo", 0)), ops=v.get("operaciones", 0))
+
+        with seccion(self.env, "reporting.formatear_cronograma_dia"):
+            cronograma = formatear_cronograma_dia(self.eventos)
 
         return {
             "centro_eventos": self.eventos,
             "t1_eventos": self.t1_eventos,
             "grua_operaciones": self.grua_ops,
             "ocupacion_recursos": ocupacion,
+            "monitor_recursos": resumen_monitores(self.recursos_monitoreados),
+            "ocupacion_horaria": ocupacion_horaria,
             "timeline": self.linea_tiempo,
             "turno_fin_real": hhmm_dias(self.cfg.get("shift_start_min", 0) + total_fin),
-            "cronograma_dia": formatear_cronograma_dia(self.eventos),
+            "cronograma_dia": cronograma,
             "t1_generados": self.t1_contador,
             "nueva_salida_camiones": salidas,
             "retornos_camiones": retornos,
             "num_vueltas": sum(1 for e in self.eventos if e.get("modo") == "carga_dia"),
+            # logs que superaron cfg["max_registros_log"] (quedan como muestra + agregados exactos)
+            "registros_truncados": estado_registros(
+                self, LOGS_ACOTADOS, LOGS_COMPLETOS if self.cfg.get("max_registros_log") else None),
+            **({"registros_en_disco": self.registros_en_disco} if self.volcado is not None else {}),
         }
@@ -51,7 +51,7 @@ DAY_CONFIG = {
     "t1_prefijo_id": "T1",
 
     # --- Otros
-    "debug": True,
+    "debug": False,           # True => bitácora DEBUG hacia logging ("app.simulations")
 }
 
 def get_day_config():
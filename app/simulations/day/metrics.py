@@ -1,7 +1,11 @@
 from typing import Dict, List, Tuple, Any
 from ..night.metrics import calcular_ocupacion_recursos as _calc  # cálculo nocturno (se usa como base)
+from ..night.metrics import campos_monitor
+from ..presentacion import hhmm_lote
 import math
 
+import numpy as np
+
 # ----------------------------
 # Mapeos de nombres de recurso
 # ----------------------------
@@ -161,20 +165,109 @@ def _ops_from_centro(centro: Any) -> Dict[str, List[Tuple[float, float]]]:
         out[rep_name] = buf
     return out
 
-def _sum_active_in_window(op_intervals: List[Tuple[float, float]],
-                          window: Tuple[float, float]) -> float:
+# ----------------------------------------------------------------
+# Sweep-line: integrales acumuladas de operaciones activas y capacidad
+# ----------------------------------------------------------------
+
+def _integral_activos(inicios: np.ndarray, fines: np.ndarray, t: np.ndarray) -> np.ndarray:
     """
-    Suma la intersección de los intervalos de operación con la ventana [ws, we).
+    A(t) = ∫ n(u) du desde -∞ hasta t, con n(u) = operaciones activas en u.
+    Barrido único sobre inicios/fines ordenados (+1/-1) y prefijos; se evalúa
+    en todos los t con searchsorted. A(we) - A(ws) = minutos activos en [ws, we).
     """
-    ws, we = window
-    if we <= ws or not op_intervals:
-        return 0.0
-    total = 0.0
-    for s, e in op_intervals:
-        if e <= ws or s >= we:
-            continue
-        total += max(0.0, min(e, we) - max(s, ws))
-    return total
+    t = np.asarray(t, dtype=float)
+    if len(inicios) == 0:
+        return np.zeros_like(t)
+    tiempos = np.concatenate([inicios, fines])
+    delta = np.concatenate([np.ones(len(inicios)), -np.ones(len(fines))])
+    orden = np.argsort(tiempos, kind="stable")
+    tiempos, n = tiempos[orden], np.cumsum(delta[orden])
+    area = np.concatenate([[0.0], np.cumsum(n[:-1] * np.diff(tiempos))])
+    idx = np.searchsorted(tiempos, t, side="right") - 1
+    ok = idx >= 0
+    idx = np.clip(idx, 0, None)
+    return np.where(ok, area[idx] + n[idx] * (t - tiempos[idx]), 0.0)
+
+def _escalon_capacidad(segments: List[Tuple[int, int, Dict[str, int]]], recursos: List[str], centro: Any = None):
+    """
+    Función escalón de capacidades: (bordes[n+1], caps[n, R]).
+
+    Parte de _capacity_timeline (cfg) y, para los recursos del centro que
+    registran su escalón real (RecursoProgramado.escalon_capacidad), usa los
+    cambios efectivamente aplicados en la simulación.
+    """
+    if not segments:
+        return np.array([0.0, 0.0]), np.zeros((1, len(recursos)))
+    bordes = np.array([s for s, _, _ in segments] + [segments[-1][1]], dtype=float)
+    caps = np.array([[int(c.get(r, 0) or 0) for r in recursos] for _, _, c in segments], dtype=float)
+
+    monitoreados = getattr(centro, "recursos_monitoreados", None) or {}
+    escalones = {j: getattr(monitoreados.get(r), "escalon_capacidad", None) for j, r in enumerate(recursos)}
+    escalones = {j: e for j, e in escalones.items() if e}
+    if not escalones:
+        return bordes, caps
+
+    cambios = np.array([t for e in escalones.values() for t, _ in e], dtype=float)
+    cambios = cambios[(cambios > bordes[0]) & (cambios < bordes[-1])]
+    nuevos = np.unique(np.concatenate([bordes, cambios]))
+    # capacidad de cfg en cada nuevo tramo
+    idx = np.clip(np.searchsorted(bordes, nuevos[:-1], side="right") - 1, 0, len(caps) - 1)
+    caps = caps[idx]
+    for j, e in escalones.items():
+        t_e = np.array([t for t, _ in e], dtype=float)
+        v_e = np.array([v for _, v in e], dtype=float)
+        k = np.searchsorted(t_e, nuevos[:-1], side="right") - 1
+        caps[:, j] = np.where(k >= 0, v_e[np.clip(k, 0, None)], caps[:, j])
+    return nuevos, caps
+
+def _integral_escalon(bordes: np.ndarray, valores: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """C(t) = ∫ cap(u) du desde bordes[0] hasta t (recortado al rango), para cada columna."""
+    t = np.clip(np.asarray(t, dtype=float), bordes[0], bordes[-1])
+    acum = np.vstack([np.zeros((1, valores.shape[1])), np.cumsum(valores * np.diff(bordes)[:, None], axis=0)])
+    idx = np.clip(np.searchsorted(bordes, t, side="right") - 1, 0, len(valores) - 1)
+    return acum[idx] + valores[idx] * (t - bordes[idx])[:, None]
+
+def _intervalos_np(op_intervals: List[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    if not op_intervals:
+        return np.empty(0), np.empty(0)
+    arr = np.asarray(op_intervals, dtype=float)
+    return arr[:, 0], arr[:, 1]
+
+def curvas_ocupacion(centro: Any, cfg: Dict[str, Any], bin_min: float = 5.0,
+                     horizonte: float = None) -> Dict[str, Any]:
+    """
+    Curvas de ocupación vs capacidad por recurso en bins de 'bin_min' minutos
+    (p.ej. 5 para detalle, 60 para el mapa de calor por hora), todas con las
+    mismas integrales acumuladas: costo O((ops + bins)·log ops) por recurso.
+    """
+    segments = _capacity_timeline(cfg)
+    if horizonte is None:
+        horizonte = segments[-1][1] if segments else 0.0
+    bordes_bin = np.arange(0.0, float(horizonte) + bin_min, bin_min)
+    bordes_bin[-1] = min(bordes_bin[-1], float(horizonte))
+    if len(bordes_bin) < 2:
+        bordes_bin = np.array([0.0, float(horizonte)])
+
+    recursos = list(RES_NAME_TO_CFG)
+    bordes_cap, caps = _escalon_capacidad(segments, recursos, centro)
+    cap_bins = np.diff(_integral_escalon(bordes_cap, caps, bordes_bin), axis=0)
+    ops_by_res = _ops_from_centro(centro)
+
+    base_abs = int(cfg.get("shift_start_min", 0))
+    out = {"bin_min": bin_min, "inicio_min": bordes_bin[:-1].tolist(),
+           "inicio_hhmm": hhmm_lote(bordes_bin[:-1].tolist(), base_abs),
+           "recursos": {}}
+    for j, rep in enumerate(recursos):
+        ini, fin = _intervalos_np(ops_by_res.get(rep, []))
+        activo = np.diff(_integral_activos(ini, fin, bordes_bin))
+        cap = cap_bins[:, j]
+        pct = np.divide(100.0 * activo, cap, out=np.zeros_like(activo), where=cap > 0)
+        out["recursos"][rep] = {
+            "activo_min": activo.tolist(),
+            "capacidad_x_tiempo": cap.tolist(),
+            "ocupacion_pct": np.minimum(pct, 100.0).tolist(),
+        }
+    return out
 
 # ----------------------------------------------------------------
 # Cálculo final de ocupación del día con detalle por 2 turnos de día
@@ -199,6 +292,13 @@ def calcular_ocupacion_recursos(centro, cfg: Dict[str, Any], tiempo_total_turno:
     two = windows[:2] if len(windows) >= 2 else (windows or [(0, tiempo_total_turno, {})])
     ops_by_res = _ops_from_centro(centro)
 
+    recursos = list(RES_NAME_TO_CFG)
+    bordes_cap, caps = _escalon_capacidad(segments, recursos, centro)
+    # bordes de las ventanas de turno + día completo, evaluados de una vez
+    dur = segments[-1][1] if segments else 0
+    puntos = np.array([0.0, float(dur)] + [float(x) for (ws, we, _r) in two for x in (ws, we)])
+    cap_acum = _integral_escalon(bordes_cap, caps, puntos)
+
     # Inyecta métricas del día y recalcula % con integración de capacidad
     mr = getattr(centro, "metricas_recursos", {}) or {}
     for rep_name, v in mr.items():
@@ -210,32 +310,25 @@ def calcular_ocupacion_recursos(centro, cfg: Dict[str, Any], tiempo_total_turno:
             if op_intervals else
             float(v.get("tiempo_activo", 0) or 0.0)
         )
+        j = recursos.index(rep_name) if rep_name in recursos else None
+        col = cap_acum[:, j] if j is not None else np.zeros(len(puntos))
+        act_acum = _integral_activos(*_intervalos_np(op_intervals), puntos) if op_intervals else None
+
         # Denominador (día completo): ∫ cap(t) dt
-        denom_total = 0.0
-        for s, e, caps in segments:
-            cap = int(caps.get(rep_name, 0) or 0)
-            if cap > 0 and e > s:
-                denom_total += cap * (e - s)
+        denom_total = float(col[1] - col[0])
 
         # Desglose por los 2 turnos de día
         por_turno = []
-        for (ws, we, _raw) in two:
-            if op_intervals:
-                activo_w = _sum_active_in_window(op_intervals, (ws, we))
+        for k, (ws, we, _raw) in enumerate(two):
+            i0, i1 = 2 + 2 * k, 3 + 2 * k
+            if act_acum is not None:
+                activo_w = float(act_acum[i1] - act_acum[i0])
             else:
                 # prorrateo si no hay trazas (fallback)
                 frac = (we - ws) / float(max(1.0, tiempo_total_turno))
                 activo_w = activo_total * frac
 
-            denom_w = 0.0
-            for s, e, caps in segments:
-                if e <= ws or s >= we:
-                    continue
-                cap = int(caps.get(rep_name, 0) or 0)
-                if cap <= 0:
-                    continue
-                overlap = max(0.0, min(e, we) - max(s, ws))
-                denom_w += cap * overlap
+            denom_w = float(col[i1] - col[i0])
 
             pct_w = 100.0 * min(1.0, activo_w / denom_w) if denom_w > 0 else 0.0
             por_turno.append({
@@ -252,6 +345,7 @@ def calcular_ocupacion_recursos(centro, cfg: Dict[str, Any], tiempo_total_turno:
         b["cap_x_tiempo"]  = denom_total
         b["porcentaje_ocupacion"] = 100.0 * min(1.0, (activo_total / denom_total)) if denom_total > 0 else 0.0
         b["por_turno_dia"] = por_turno
+        b.update(campos_monitor(centro, rep_name))
 
     # Asegura sección 'resumen' presente
     base.setdefault("resumen", base.get("resumen", {}))
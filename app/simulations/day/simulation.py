@@ -1,41 +1,56 @@
 # app/simulations/day/simulation.py
-import simpy
 from .config import get_day_config
+from ..instrumentation import crear_entorno, seccion
+from ..trace_export import escribir_traza_turno
+from ..bitacora import bitacora_desde_cfg, INFO
 from .centro import CentroDia
 from .planning import construir_asignaciones_desde_estado, _resumen_pre_turno
 from .reporting import imprimir_resumen_pre_turno
 from .utils import hhmm_dias
 
-def preview_turno_dia(estado_inicial_dia, seed=None):
-    cfg = get_day_config()
+def _cfg_dia(cfg=None):
+    base = get_day_config()
+    if cfg:
+        base.update(cfg)
+    return base
+
+def preview_turno_dia(estado_inicial_dia, seed=None, cfg=None):
+    cfg = _cfg_dia(cfg)
     asignaciones = construir_asignaciones_desde_estado(estado_inicial_dia)
     resumen = _resumen_pre_turno(asignaciones)
     return {"cfg_dia": cfg, "asignaciones": asignaciones, "pre_turno": resumen}
 
-def simular_turno_dia(estado_inicial_dia, seed=None):
-    cfg = get_day_config()
-    env = simpy.Environment()
-    centro = CentroDia(env, cfg)
-
-    asignaciones = construir_asignaciones_desde_estado(estado_inicial_dia)
+def simular_turno_dia(estado_inicial_dia, seed=None, cfg=None, perfilar=False, traza=None, dia=0,
+                      bitacora=None):
+    cfg = _cfg_dia(cfg)
+    env = crear_entorno(perfilar)
+    bitacora = bitacora_desde_cfg(cfg, bitacora)
+    centro = CentroDia(env, cfg, bitacora=bitacora)
 
-    if cfg.get("debug", False):
-        print("\n=== 🌙→☀️ ESTADO INICIAL DÍA (desde NOCHE) ===")
-        print(f"Camiones en ruta (fin noche): {len(estado_inicial_dia.get('camiones_en_ruta', []))}")
-        print(f"Lotes listos para carga: {len(estado_inicial_dia.get('pallets_listos_para_carga', []))}")
-        print(f"Asignaciones construidas: {len(asignaciones)}")
-        print("=============================================\n")
+    with seccion(env, "construir_asignaciones_desde_estado"):
+        asignaciones = construir_asignaciones_desde_estado(estado_inicial_dia)
 
-    resumen_pre = _resumen_pre_turno(asignaciones)
-    imprimir_resumen_pre_turno(resumen_pre)
+    if bitacora.habilitado(INFO):
+        bitacora.info("🌙→☀️ Estado inicial día (desde noche)",
+                      camiones_en_ruta=len(estado_inicial_dia.get("camiones_en_ruta", [])),
+                      lotes_listos=len(estado_inicial_dia.get("pallets_listos_para_carga", [])),
+                      asignaciones=len(asignaciones))
+        imprimir_resumen_pre_turno(_resumen_pre_turno(asignaciones), escribir=bitacora.info)
 
     resultado = centro.run(asignaciones, seed=seed, estado_inicial_dia=estado_inicial_dia)
 
     turno_ini = cfg.get("shift_start_min", 0)
     turno_fin_abs = cfg.get("shift_end_min", 0)
-    return {
+    salida = {
         **resultado,
         "asignaciones_entrada": asignaciones,
         "turno_inicio": hhmm_dias(turno_ini),
         "turno_fin_nominal": hhmm_dias(turno_fin_abs),
+        "eventos_procesados": env.eventos_procesados,
     }
+    if traza is not None:
+        salida["traza"] = escribir_traza_turno(
+            traza, centro, env, offset_min=turno_ini + 1440 * dia, turno=f"dia d{dia}")
+    if perfilar:
+        salida["perfil"] = env.resumen_perfil()
+    return salida
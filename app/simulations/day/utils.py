@@ -1,6 +1,7 @@
 # app/simulations/day/utils.py
 import math
 from ..night.utils import hhmm_dias
+from ..presentacion import hhmm_lote
 from ..night.rng import U_rng
 from typing import Optional
 
@@ -79,8 +80,6 @@ def formatear_cronograma_dia(eventos):
         except Exception:
             end_min = None
 
-        hora_inicio = hhmm_dias(480 + start_min) if start_min is not None else ""
-        hora_fin = hhmm_dias(480 + end_min) if end_min is not None else ""
         dur = (end_min - start_min) if (start_min is not None and end_min is not None) else None
 
         camion = _buscar(("camion", "camion_id", "truck"), ev) or _buscar(("camion", "camion_id", "truck"), meta) or ""
@@ -113,8 +112,8 @@ def formatear_cronograma_dia(eventos):
             cajas = 0
 
         salida.append({
-            "hora_inicio": hora_inicio,
-            "hora_fin": hora_fin,
+            "hora_inicio": start_min,     # minutos; se formatean en lote al final
+            "hora_fin": end_min,
             "camion": camion,
             "pallets": pallets_count,
             "cajas": cajas,
@@ -123,6 +122,9 @@ def formatear_cronograma_dia(eventos):
         })
 
     salida = sorted(salida, key=lambda x: x["_start_min"])
+    for campo in ("hora_inicio", "hora_fin"):
+        for r, txt in zip(salida, hhmm_lote([r[campo] for r in salida], 480)):
+            r[campo] = txt if txt is not None else ""
     for r in salida:
         r.pop("_start_min", None)
     return salida
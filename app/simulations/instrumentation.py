@@ -0,0 +1,162 @@
+# app/simulations/instrumentation.py
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+import simpy
+from simpy.events import Process
+
+
+class EntornoSim(simpy.Environment):
+    """simpy.Environment que cuenta los eventos procesados (para benchmarks/métricas)."""
+
+    def __init__(self, initial_time=0):
+        super().__init__(initial_time)
+        self.eventos_procesados = 0
+        self.perfil = None
+        self.spans_motor = []   # (nombre, t_ini, t_fin) en perf_counter, ver seccion()
+        # sección -> pico de memoria trazada (bytes); sólo si esta corrida es dueña del perfil de
+        # memoria (tracemalloc es del proceso: las demás no tocan su pico)
+        self.perfil_memoria = False
+        self.picos_memoria = {}
+
+    def step(self):
+        self.eventos_procesados += 1
+        return simpy.Environment.step(self)
+
+
+def _fase(gen):
+    """Nombre del generador más interno de una cadena 'yield from' (con etiqueta de grúa)."""
+    while True:
+        sub = getattr(gen, "gi_yieldfrom", None)
+        if sub is None or getattr(sub, "gi_code", None) is None:
+            break
+        gen = sub
+    nombre = gen.gi_code.co_name
+    if nombre == "_usar_grua" and gen.gi_frame is not None:
+        label = gen.gi_frame.f_locals.get("label")
+        if label:
+            return f"{nombre}[{label}]"
+    return nombre
+
+
+class EntornoPerfilado(EntornoSim):
+    """
+    EntornoSim que además atribuye tiempo de pared, eventos y tiempo simulado
+    a cada tipo de proceso (generador raíz) y a cada fase (generador más
+    interno de la cadena 'yield from'; _usar_grua se separa por etiqueta).
+
+    El tiempo simulado de una fase es el que un proceso pasa suspendido en
+    ella (esperando recurso, timeout o gate). Sólo se usa si se pide perfil:
+    el camino normal (EntornoSim) no paga este costo.
+    """
+
+    def __init__(self, initial_time=0):
+        super().__init__(initial_time)
+        self.perfil = {"procesos": {}, "fases": {}, "secciones": {}, "kernel": _acum()}
+        self._suspendidos = {}   # Process -> (t_sim, fase)
+
+    def step(self):
+        self.eventos_procesados += 1
+        try:
+            evento = self._queue[0][3]
+        except IndexError:
+            return simpy.Environment.step(self)
+
+        procesos = [cb.__self__ for cb in (evento.callbacks or ())
+                    if isinstance(getattr(cb, "__self__", None), Process)]
+        t_ini = time.perf_counter()
+        simpy.Environment.step(self)
+        dt = time.perf_counter() - t_ini
+
+        if not procesos:
+            k = self.perfil["kernel"]
+            k["eventos"] += 1
+            k["wall_s"] += dt
+            return
+
+        dt /= len(procesos)
+        ahora = self._now
+        for proc in procesos:
+            raiz = proc._generator.gi_code.co_name
+            suspendido = self._suspendidos.pop(proc, None)
+            fase = suspendido[1] if suspendido else raiz
+            for tabla, clave in ((self.perfil["procesos"], raiz), (self.perfil["fases"], fase)):
+                a = tabla.get(clave)
+                if a is None:
+                    a = tabla[clave] = _acum()
+                a["eventos"] += 1
+                a["wall_s"] += dt
+                if suspendido:
+                    a["sim_min"] += ahora - suspendido[0]
+            if proc.is_alive:
+                self._suspendidos[proc] = (ahora, _fase(proc._generator))
+
+    def resumen_perfil(self):
+        """Tablas ordenadas por tiempo de pared (desc.) con su porcentaje."""
+        def _tabla(d):
+            total = sum(a["wall_s"] for a in d.values()) or 1.0
+            return {k: dict(a, wall_pct=100.0 * a["wall_s"] / total)
+                    for k, a in sorted(d.items(), key=lambda kv: -kv[1]["wall_s"])}
+        p = self.perfil
+        return {
+            "eventos_procesados": self.eventos_procesados,
+            "kernel": dict(p["kernel"]),
+            "procesos": _tabla(p["procesos"]),
+            "fases": _tabla(p["fases"]),
+            "secciones": _tabla(p["secciones"]),
+        }
+
+
+def _acum():
+    return {"eventos": 0, "wall_s": 0.0, "sim_min": 0.0}
+
+
+def crear_entorno(perfilar=False, perfil_memoria=False):
+    """perfil_memoria: la corrida es la que se perfila con tracemalloc (ver core/memory_profile)."""
+    env = EntornoPerfilado() if perfilar else EntornoSim()
+    env.perfil_memoria = perfil_memoria
+    return env
+
+
+@contextmanager
+def _medir_seccion(env, nombre):
+    trazando = env.perfil_memoria and tracemalloc.is_tracing()
+    if trazando:
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        t1 = time.perf_counter()
+        env.spans_motor.append((nombre, t0, t1))
+        if trazando:
+            pico = tracemalloc.get_traced_memory()[1]
+            env.picos_memoria[nombre] = max(env.picos_memoria.get(nombre, 0), pico)
+        if env.perfil is not None:
+            a = env.perfil["secciones"].get(nombre)
+            if a is None:
+                a = env.perfil["secciones"][nombre] = _acum()
+            a["eventos"] += 1
+            a["wall_s"] += t1 - t0
+
+
+def seccion(env, nombre):
+    """
+    Mide una sección del motor (planificación, env.run, métricas, reportes):
+    queda como span de pared en env.spans_motor y, si env perfila, se acumula
+    en el perfil. Si la corrida es la del perfil de memoria (env.perfil_memoria,
+    con tracemalloc activo) guarda además el pico de la sección en env.picos_memoria.
+    """
+    return _medir_seccion(env, nombre) if isinstance(env, EntornoSim) else nullcontext()
+
+
+def tiempos_secciones(env):
+    """{sección: segundos de pared} sumando los spans de env.spans_motor."""
+    tiempos = {}
+    for nombre, t0, t1 in getattr(env, "spans_motor", ()):
+        tiempos[nombre] = tiempos.get(nombre, 0.0) + (t1 - t0)
+    return tiempos
+
+
+__all__ = ["EntornoSim", "EntornoPerfilado", "crear_entorno", "seccion", "tiempos_secciones"]
@@ -0,0 +1,168 @@
+# app/simulations/lod.py
+"""
+Pirámide de niveles de detalle (LOD) de la actividad de los recursos, para
+gráficos de un turno o un día entero sin mandar cada operación.
+
+La base son las series de los recursos monitoreados (monitor_muestreo_min,
+ver recursos.py): por ventana, minutos-usuario, minutos-cola y
+minutos-capacidad, más el máximo de usuarios. Cada nivel agrupa ventanas de
+ancho NIVELES (múltiplos de la base) sumando áreas y tomando el máximo, así
+que cualquier nivel se arma desde el anterior y una consulta con ancho W:
+
+- usa el nivel más grueso cuyo ancho divide a W y al inicio pedido;
+- lee sólo el tramo [t_desde, t_hasta) de ese nivel (np.load con mmap);
+- junta W / ancho_nivel ventanas por bucket.
+
+El tramo pedido se recorta a lo simulado y se rechaza (ValueError) si pide
+más de MAX_BUCKETS buckets: la respuesta queda acotada por el largo de la
+corrida, no por lo que pida el cliente.
+
+Ocupación de un bucket = minutos-usuario / minutos-capacidad; para
+patio_camiones, usuarios_medio es la cantidad media de camiones en el patio.
+"""
+import json
+import os
+
+import numpy as np
+
+# anchos de los niveles, en ventanas de la base
+NIVELES = (1, 5, 15, 60, 240)
+ESTADISTICAS = ("area_usuarios", "area_cola", "area_capacidad", "usuarios_max")
+META = "lod.json"
+# buckets por consulta, como máximo (un día entero a 1 min son 1440)
+MAX_BUCKETS = 5000
+
+
+def separar_series(resultado):
+    """Quita la 'serie' de cada recurso de resultado["monitor_recursos"] y la devuelve ({recurso: serie})."""
+    series = {}
+    for nombre, est in (resultado.get("monitor_recursos") or {}).items():
+        serie = est.pop("serie", None) if isinstance(est, dict) else None
+        if serie:
+            series[nombre] = serie
+    return series
+
+
+def construir_piramide(series):
+    """
+    series: {recurso: [{"inicio_min", "usuarios_medio", "cola_media", "capacidad_media", "usuarios_max"}]}
+    con ventanas de ancho fijo. Devuelve {"meta": {...}, "niveles": {ancho_min: array (n, recursos, 4)}}.
+    """
+    recursos = sorted(r for r, s in series.items() if s)
+    if not recursos:
+        return None
+    inicios = np.array([p["inicio_min"] for p in series[recursos[0]]], dtype=float)
+    base = float(inicios[1] - inicios[0]) if len(inicios) > 1 else 1.0
+    t0 = float(inicios[0])
+    n = max(len(series[r]) for r in recursos)
+    datos = np.zeros((n, len(recursos), len(ESTADISTICAS)), dtype=np.float64)
+    for j, r in enumerate(recursos):
+        s = series[r]
+        datos[:len(s), j, 0] = [p["usuarios_medio"] * base for p in s]
+        datos[:len(s), j, 1] = [p["cola_media"] * base for p in s]
+        datos[:len(s), j, 2] = [p["capacidad_media"] * base for p in s]
+        datos[:len(s), j, 3] = [p.get("usuarios_max", 0) for p in s]
+
+    niveles = {}
+    previo, ancho_previo = datos, 1
+    for ancho in NIVELES:
+        k = ancho // ancho_previo
+        m = -(-len(previo) // k)
+        relleno = np.zeros((m * k - len(previo),) + previo.shape[1:])
+        bloques = np.concatenate([previo, relleno]).reshape(m, k, *previo.shape[1:])
+        nivel = np.concatenate([bloques[..., :3].sum(axis=1), bloques[..., 3:].max(axis=1)], axis=-1)
+        niveles[ancho * base] = nivel
+        previo, ancho_previo = nivel, ancho
+    return {
+        "meta": {"t0_min": t0, "base_min": base, "n_base": n, "recursos": recursos,
+                 "estadisticas": list(ESTADISTICAS), "niveles_min": [a * base for a in NIVELES]},
+        "niveles": niveles,
+    }
+
+
+def _archivo(ancho_min):
+    return f"nivel_{ancho_min:g}.npy"
+
+
+def guardar_piramide(piramide, directorio):
+    os.makedirs(directorio, exist_ok=True)
+    for ancho, arr in piramide["niveles"].items():
+        np.save(os.path.join(directorio, _archivo(ancho)), arr)
+    with open(os.path.join(directorio, META), "w", encoding="utf-8") as f:
+        json.dump(piramide["meta"], f)
+
+
+def abrir_piramide(directorio):
+    """Pirámide guardada, con los niveles como memmap de sólo lectura."""
+    with open(os.path.join(directorio, META), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return {"meta": meta, "niveles": {a: np.load(os.path.join(directorio, _archivo(a)), mmap_mode="r")
+                                      for a in meta["niveles_min"]}}
+
+
+def consultar_piramide(piramide, ancho_min, t_desde=None, t_hasta=None, recursos=None):
+    """
+    Buckets de 'ancho_min' en [t_desde, t_hasta) (minutos del turno; por defecto
+    todo lo simulado): {"inicio_min": [...], "nivel_min", "recursos": {recurso:
+    {"ocupacion", "usuarios_medio", "usuarios_max", "cola_media", "capacidad_media"}}}.
+    """
+    meta = piramide["meta"]
+    base, t0 = meta["base_min"], meta["t0_min"]
+    fin = t0 + meta["n_base"] * base
+    if ancho_min <= 0 or abs(ancho_min / base - round(ancho_min / base)) > 1e-9:
+        raise ValueError(f"El ancho debe ser múltiplo de {base:g} min")
+    if t_desde is not None and t_hasta is not None and float(t_hasta) <= float(t_desde):
+        raise ValueError("t_hasta debe ser mayor que t_desde")
+    # sólo se consulta lo simulado
+    t_desde = t0 if t_desde is None else max(float(t_desde), t0)
+    t_hasta = fin if t_hasta is None else min(float(t_hasta), fin)
+    if t_hasta <= t_desde:
+        raise ValueError(f"El tramo pedido está fuera de lo simulado ({t0:g} a {fin:g} min)")
+    n_buckets = int(np.ceil((t_hasta - t_desde) / ancho_min))
+    if n_buckets > MAX_BUCKETS:
+        raise ValueError(f"La consulta pide {n_buckets} buckets (máximo {MAX_BUCKETS}): "
+                         f"use un ancho mayor o un tramo más corto")
+    nombres = meta["recursos"]
+    recursos = nombres if recursos is None else list(recursos)
+    desconocidos = [r for r in recursos if r not in nombres]
+    if desconocidos:
+        raise ValueError(f"Recursos sin serie: {', '.join(desconocidos)}")
+
+    # nivel más grueso alineado con el ancho y el inicio
+    desde_base = int(np.floor((t_desde - t0) / base))
+    ancho_base = int(round(ancho_min / base))
+    nivel = max(a for a in meta["niveles_min"]
+                if ancho_base % round(a / base) == 0 and desde_base % round(a / base) == 0)
+    por_nivel = int(round(nivel / base))
+    k = ancho_base // por_nivel
+    i0 = desde_base // por_nivel
+    arr = piramide["niveles"][nivel]
+    cols = [nombres.index(r) for r in recursos]
+
+    # se acumulan sólo las ventanas guardadas: los buckets sin datos quedan en 0
+    areas = np.zeros((n_buckets, len(cols), 3))
+    maximos = np.zeros((n_buckets, len(cols)))
+    lo, hi = i0, min(i0 + n_buckets * k, len(arr))
+    if hi > lo:
+        tramo = arr[lo:hi][:, cols]
+        bucket = (np.arange(lo, hi) - i0) // k
+        np.add.at(areas, bucket, tramo[..., :3])
+        np.maximum.at(maximos, bucket, tramo[..., 3])
+    ocupacion = np.divide(areas[..., 0], areas[..., 2], out=np.zeros_like(areas[..., 0]), where=areas[..., 2] > 0)
+
+    return {
+        "ancho_min": float(ancho_min),
+        "nivel_min": float(nivel),
+        "inicio_min": (t0 + (i0 * por_nivel + np.arange(n_buckets) * ancho_base) * base).tolist(),
+        "recursos": {r: {
+            "ocupacion": ocupacion[:, j].tolist(),
+            "usuarios_medio": (areas[:, j, 0] / ancho_min).tolist(),
+            "usuarios_max": maximos[:, j].tolist(),
+            "cola_media": (areas[:, j, 1] / ancho_min).tolist(),
+            "capacidad_media": (areas[:, j, 2] / ancho_min).tolist(),
+        } for j, r in enumerate(recursos)},
+    }
+
+
+__all__ = ["NIVELES", "MAX_BUCKETS", "separar_series", "construir_piramide", "guardar_piramide", "abrir_piramide",
+           "consultar_piramide"]
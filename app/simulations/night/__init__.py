@@ -1,6 +1,6 @@
 # app/simulations/night_shift/__init__.py
-from .simulation import simular_turno_prioridad_rng
+from .simulation import simular_turno_prioridad_rng, preview_turno_noche
 from .config import DEFAULT_CONFIG
 
-__all__ = ['simular_turno_prioridad_rng', 'DEFAULT_CONFIG']
+__all__ = ['simular_turno_prioridad_rng', 'preview_turno_noche', 'DEFAULT_CONFIG']
 
@@ -0,0 +1,181 @@
+# app/simulations/night/camino_critico.py
+"""
+Camino crítico del fin de turno noche.
+
+Reconstruye, hacia atrás desde el camión que define turno_fin_real, la
+cadena de operaciones que lo determinó:
+
+  fin del camión <- movilizador <- parrillero <- cargas de grúa <- correcciones
+  (grúa + re-chequeo) <- rama de pallet más tardía (despacho/acomodo + chequeo)
+  <- slot de patio <- PICK del camión <- gate de PICK de la vuelta anterior
+  <- PICK del último camión que cerró ese gate <- ...
+
+En el motor cada operación pide su recurso exactamente cuando termina la
+anterior de la cadena, así que desde una operación (inicio - espera = pedido)
+la predecesora es la del mismo camión/vuelta que termina en ese instante.
+Por eso basta ordenar cada log por fin (O(n log n)) y recorrer sólo los
+camiones de la cadena. Un hueco sin operación que lo cubra queda como
+'sin_registro'.
+
+Cada tramo aporta 'espera_<recurso>' y 'servicio_<recurso>'; el atraso
+(overrun) se reparte entre las esperas del camino en proporción a su peso.
+"""
+from collections import defaultdict
+
+import numpy as np
+
+EPS = 1e-7
+
+# recurso -> (atributo del Centro, inicio, fin, espera, etiqueta)
+FUENTES = {
+    "pickers": ("tiempos_prep_mixto", "start", "end", "tiempo_espera_min", lambda o: "pick"),
+    "grueros": ("grua_ops", "start", "end", "wait", lambda o: o.get("label", "grua")),
+    "chequeadores": ("tiempos_chequeo_detallados", "tiempo_inicio", "tiempo_fin", "tiempo_espera_min",
+                     lambda o: "chequeo"),
+    "parrilleros": ("parr_ops", "start", "end", "wait", lambda o: "ajuste_capacidad"),
+    "movilizadores": ("movi_ops", "start", "end", "wait", lambda o: "mover_camion"),
+    # el slot de patio se toma y se retiene hasta el final: sólo interesa su espera
+    "patio_camiones": ("patio_ops", "start", "start", "wait", lambda o: "slot_patio"),
+}
+
+
+def logs_operaciones(centro):
+    """{recurso: [op, ...]} con los logs del Centro que usa el camino crítico."""
+    return {recurso: list(getattr(centro, attr, None) or []) for recurso, (attr, *_) in FUENTES.items()}
+
+
+def _indexar(logs):
+    """(camion, vuelta) -> lista de operaciones normalizadas, ordenadas por fin."""
+    por_camion = defaultdict(list)
+    for recurso, ops in logs.items():
+        if recurso not in FUENTES or not ops:
+            continue
+        _, k_ini, k_fin, k_esp, etiqueta = FUENTES[recurso]
+        for o in ops:
+            s, e = o.get(k_ini), o.get(k_fin)
+            if s is None or e is None:
+                continue
+            w = o.get(k_esp) or 0.0
+            por_camion[(o.get("camion"), o.get("vuelta"))].append(
+                (float(e), float(s), float(w), recurso, etiqueta(o)))
+    for ops in por_camion.values():
+        ops.sort(key=lambda x: (x[0], x[1]))
+    return por_camion
+
+
+def _recorrer(ops, t, t_ini, camion, vuelta, tramos):
+    """Camina hacia atrás por 'ops' (ordenadas por fin) desde t hasta t_ini."""
+    fines = np.fromiter((o[0] for o in ops), dtype=float, count=len(ops))
+    j = int(np.searchsorted(fines, t + EPS, side="right")) - 1
+    while t > t_ini + EPS:
+        if j < 0:
+            tramos.append(_tramo(camion, vuelta, "sin_registro", "", t_ini, t_ini, t, 0.0))
+            return t_ini
+        e, s, w, recurso, etiqueta = ops[j]
+        if e < t - EPS:
+            tramos.append(_tramo(camion, vuelta, "sin_registro", "", e, e, t, 0.0))
+        pedido = s - w
+        if pedido < t_ini - EPS:
+            # la operación empezó antes del tramo buscado (no es de esta cadena)
+            tramos.append(_tramo(camion, vuelta, "sin_registro", "", t_ini, t_ini, e, 0.0))
+            return t_ini
+        tramos.append(_tramo(camion, vuelta, recurso, etiqueta, pedido, s, e, w))
+        t = pedido
+        j -= 1
+        while j >= 0 and ops[j][0] > t + EPS:
+            j -= 1
+    return t
+
+
+def _tramo(camion, vuelta, recurso, etiqueta, pedido, inicio, fin, espera):
+    return {"camion": camion, "vuelta": vuelta, "recurso": recurso, "etiqueta": etiqueta,
+            "pedido_min": pedido, "inicio_min": inicio, "fin_min": fin,
+            "espera_min": espera, "servicio_min": fin - inicio}
+
+
+def camino_critico_noche(eventos, logs, pick_gates, overrun_min=0.0):
+    """
+    eventos: centro.eventos (inicio_min/fin_min por camión y vuelta).
+    logs: {recurso: ops} (ver logs_operaciones).
+    pick_gates: {vuelta: {"done_time": ...}} del motor.
+    """
+    eventos = [e for e in (eventos or []) if e.get("fin_min") is not None]
+    if not eventos:
+        return {"fin_min": 0.0, "camion_critico": None, "tramos": [], "atribucion_min": {},
+                "atribucion_pct": {}, "espera_total_min": 0.0, "atribucion_overrun_min": {}}
+    inicio = {(e["camion_id"], e["vuelta"]): float(e["inicio_min"]) for e in eventos}
+    critico = max(eventos, key=lambda e: e["fin_min"])
+    por_camion = _indexar(logs)
+    gates = {int(k): v for k, v in (pick_gates or {}).items()}
+
+    fin = float(critico["fin_min"])
+    camion, vuelta = critico["camion_id"], critico["vuelta"]
+    t, tramos = fin, []
+    while True:
+        t_ini = inicio.get((camion, vuelta), 0.0) if camion is not None else t
+        t = _recorrer(por_camion.get((camion, vuelta), []), t, t_ini, camion, vuelta, tramos)
+        if vuelta is None or vuelta <= 1 or t <= EPS:
+            break
+        # el camión arrancó cuando cerró el gate de PICK de la vuelta anterior
+        anterior = vuelta - 1
+        done = (gates.get(anterior) or {}).get("done_time")
+        if done is None:
+            break
+        tramos.append(_tramo(None, anterior, "pick_gate", f"gate_v{anterior}", done, done, done, 0.0))
+        ultimo = [(o[0], cam) for (cam, v), ops in por_camion.items() if v == anterior
+                  for o in ops if o[3] == "pickers" and abs(o[0] - done) <= EPS]
+        camion = ultimo[0][1] if ultimo else None
+        vuelta, t = anterior, float(done)
+    tramos.reverse()
+
+    atrib = defaultdict(float)
+    for tr in tramos:
+        if tr["recurso"] == "pick_gate":
+            continue
+        if tr["recurso"] == "sin_registro":
+            atrib["sin_registro"] += tr["fin_min"] - tr["pedido_min"]
+            continue
+        atrib["espera_" + tr["recurso"]] += tr["espera_min"]
+        atrib["servicio_" + tr["recurso"]] += tr["servicio_min"]
+    atrib = {k: v for k, v in atrib.items() if v > EPS}
+    total = sum(atrib.values())
+    esperas = {k[len("espera_"):]: v for k, v in atrib.items() if k.startswith("espera_") and v > 0}
+    espera_total = sum(esperas.values())
+    # sin esperas el camino habría sido 'espera_total' más corto: el overrun se reparte entre ellas
+    cubierto = min(float(overrun_min or 0.0), espera_total)
+    return {
+        "fin_min": fin,
+        "camion_critico": critico["camion_id"],
+        "vuelta_critica": critico["vuelta"],
+        "tramos": tramos,
+        "atribucion_min": dict(sorted(atrib.items(), key=lambda kv: -kv[1])),
+        "atribucion_pct": {k: (100.0 * v / total if total > 0 else 0.0)
+                           for k, v in sorted(atrib.items(), key=lambda kv: -kv[1])},
+        "espera_total_min": espera_total,
+        "atribucion_overrun_min": {r: cubierto * v / espera_total for r, v in esperas.items()} if espera_total > 0 else {},
+    }
+
+
+def resumen_caminos_criticos(caminos):
+    """Promedio por réplica de la atribución (min y %) y frecuencia de cada recurso como mayor espera."""
+    caminos = [c for c in caminos if c and c.get("atribucion_min")]
+    if not caminos:
+        return {}
+    claves = sorted({k for c in caminos for k in c["atribucion_min"]})
+    m = np.array([[c["atribucion_min"].get(k, 0.0) for k in claves] for c in caminos], dtype=float)
+    mayor = defaultdict(int)
+    for c in caminos:
+        esperas = {k: v for k, v in c["atribucion_min"].items() if k.startswith("espera_")}
+        if esperas:
+            mayor[max(esperas, key=esperas.get)] += 1
+    totales = m.sum(axis=1, keepdims=True)
+    pct = np.divide(100.0 * m, totales, out=np.zeros_like(m), where=totales > 0)
+    return {
+        "replicas": len(caminos),
+        "atribucion_media_min": dict(zip(claves, m.mean(axis=0).tolist())),
+        "atribucion_media_pct": dict(zip(claves, pct.mean(axis=0).tolist())),
+        "mayor_espera_frecuencia": dict(mayor),
+    }
+
+
+__all__ = ["camino_critico_noche", "logs_operaciones", "resumen_caminos_criticos"]
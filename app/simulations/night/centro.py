@@ -11,20 +11,31 @@ from .dists import (
     sample_tiempo_chequeo_unitario, sample_lognormal_retorno_camion
 )
 from .config import PRIO_R1, PRIO_R2PLUS, WEIBULL_CAJAS_PARAMS, CHISQUARED_PREP_MIXTO
+from ..recursos import RecursoMonitoreado, RecursoPrioridadMonitoreado
+from ..bitacora import bitacora_desde_cfg, DEBUG
+from ..registros import crear_registro
+from ..volcado import volcado_desde_cfg
 
 class Centro:
     """Motor de procesos de la simulación (Recursos y operaciones)."""
     def __init__(self, env, cfg, pick_gate, rng,
-                 total_cajas_facturadas=None, num_camiones_estimado=None):
+                 total_cajas_facturadas=None, num_camiones_estimado=None, bitacora=None):
         self.env, self.cfg, self.pick_gate, self.rng = env, cfg, pick_gate, rng
+        self.bitacora = bitacora_desde_cfg(cfg, bitacora)
+        self._debug = self.bitacora.habilitado(DEBUG)
 
         # Recursos
-        self.pick  = simpy.Resource(env, capacity=cfg["cap_picker"])
-        self.grua  = simpy.PriorityResource(env, capacity=cfg["cap_gruero"])
-        self.cheq  = simpy.Resource(env, capacity=cfg["cap_chequeador"])
-        self.parr  = simpy.Resource(env, capacity=cfg["cap_parrillero"])
-        self.movi  = simpy.Resource(env, capacity=cfg["cap_movilizador"])
-        self.patio_camiones = simpy.Resource(env, capacity=cfg["cap_patio"])
+        muestreo = cfg.get("monitor_muestreo_min")
+        self.pick  = RecursoMonitoreado(env, capacity=cfg["cap_picker"], nombre="pickers", muestreo_min=muestreo)
+        self.grua  = RecursoPrioridadMonitoreado(env, capacity=cfg["cap_gruero"], nombre="grueros", muestreo_min=muestreo)
+        self.cheq  = RecursoMonitoreado(env, capacity=cfg["cap_chequeador"], nombre="chequeadores", muestreo_min=muestreo)
+        self.parr  = RecursoMonitoreado(env, capacity=cfg["cap_parrillero"], nombre="parrilleros", muestreo_min=muestreo)
+        self.movi  = RecursoMonitoreado(env, capacity=cfg["cap_movilizador"], nombre="movilizadores", muestreo_min=muestreo)
+        self.patio_camiones = RecursoMonitoreado(env, capacity=cfg["cap_patio"], nombre="patio_camiones", muestreo_min=muestreo)
+        self.recursos_monitoreados = {
+            "pickers": self.pick, "grueros": self.grua, "chequeadores": self.cheq,
+            "parrilleros": self.parr, "movilizadores": self.movi, "patio_camiones": self.patio_camiones,
+        }
 
         # Prioridad de acomodo en V1 (cambia cuando termina PICK V1)
         self.prio_acomodo_v1 = PRIO_R1
@@ -37,10 +48,21 @@ class Centro:
         env.process(self._manejar_salto_almuerzo())
 
         # Logs y métricas
-        self.eventos = []
-        self.grua_ops = []
-        self.tiempos_prep_mixto = []
-        self.tiempos_chequeo_detallados = []
+        # con cfg["volcado_registros"] los logs se escriben a disco a medida que se generan
+        self.volcado = volcado_desde_cfg(cfg, "noche")
+        # eventos (uno por camión y vuelta) no se acota: lo necesitan completo los reportes y el estado del día
+        self.eventos = crear_registro(cfg, "eventos", volcado=self.volcado, acotar=False)
+        self.grua_ops = crear_registro(cfg, "grua_ops", campos=("wait", "hold"), agrupar_por=("vuelta", "label"),
+                                       volcado=self.volcado)
+        self.parr_ops = []
+        self.movi_ops = []
+        self.patio_ops = []
+        self.tiempos_prep_mixto = crear_registro(cfg, "tiempos_prep_mixto",
+                                                 campos=("tiempo_prep_min", "tiempo_espera_min"),
+                                                 volcado=self.volcado)
+        self.tiempos_chequeo_detallados = crear_registro(cfg, "tiempos_chequeo_detallados",
+                                                         campos=("tiempo_espera_min", "tiempo_chequeo_min"),
+                                                         agrupar_por=("vuelta",), volcado=self.volcado)
         self.metricas_chequeadores = {
             "operaciones_totales": 0,
             "tiempo_total_activo": 0,
@@ -60,7 +82,7 @@ class Centro:
             "movilizadores": {"tiempo_activo": 0, "operaciones": 0},
         }
 
-        self.linea_tiempo = []
+        self.linea_tiempo = crear_registro(cfg, "linea_tiempo", campos=("tiempo_min",), volcado=self.volcado)
 
          # Control de tracking de vueltas
         self.vuelta_inicio_picking = {}
@@ -107,7 +129,6 @@ class Centro:
         tiempo_actual = self.env.now
         hito = {
             "tiempo_min": tiempo_actual,
-            "hora": hhmm_dias(self.cfg["shift_start_min"] + tiempo_actual),
             "descripcion": descripcion,
             "tipo": tipo,
             "metadata": metadata or {}
@@ -154,12 +175,13 @@ class Centro:
             "camion_id": camion_id,
             "vuelta_origen": vuelta,
             "salida_min": float(t_salida),
-            "salida_hhmm": hhmm_dias(self.cfg["shift_start_min"] + t_salida),
             "retorno_est_min": float(t_retorno),
-            "retorno_est_hhmm": hhmm_dias(self.cfg["shift_start_min"] + t_retorno),
             "duracion_ruta_est_min": float(dur_ruta),
         }
-        print("Salida camión:", data["camion_id"], data["salida_hhmm"], "Retorno estimado:", data["retorno_est_hhmm"])
+        if self._debug:
+            inicio = self.cfg["shift_start_min"]
+            self.bitacora.debug("Salida camión %s %s, retorno estimado %s", camion_id,
+                                hhmm_dias(inicio + t_salida), hhmm_dias(inicio + t_retorno), t=t_salida)
         self.salidas_camiones.append(data)
         self.salidas_por_camion[camion_id] = data
 
@@ -186,7 +208,7 @@ class Centro:
                 "es_mixto": pallet.get("mixto", False), "cajas": pallet.get("cajas", 0),
                 "tiempo_espera_min": t_espera, "tiempo_chequeo_min": t_chk,
                 "tiempo_inicio": t_inicio, "tiempo_fin": t_fin,
-                "tiene_defecto": tiene_defecto, "timestamp": hhmm_dias(t_inicio),
+                "tiene_defecto": tiene_defecto,
             })
             self.metricas_chequeadores["operaciones_totales"] += 1
             self.metricas_chequeadores["tiempo_total_activo"] += t_chk
@@ -251,7 +273,8 @@ class Centro:
                     self.tiempos_prep_mixto.append({
                         "vuelta": vuelta, "camion": camion_id,
                         "pallet_idx": idx + 1, "tiempo_prep_min": tprep,
-                        "tiempo_espera_min": t_wait
+                        "tiempo_espera_min": t_wait,
+                        "start": self.env.now, "end": self.env.now + tprep,
                     })
                     yield self.env.timeout(tprep)
 
@@ -298,8 +321,6 @@ class Centro:
                 "total_cajas_completas": sum(p["cajas"] for p in pre_asignados if not p["mixto"]),
             },
             "inicio_min": t0, "fin_min": t1,
-            "inicio_hhmm": hhmm_dias(cfg["shift_start_min"] + t0),
-            "fin_hhmm": hhmm_dias(cfg["shift_start_min"] + t1),
             "tiempo_min": t1 - t0,
             "modo": ("carga" if vuelta == 1 else "staging"),
         }
@@ -345,8 +366,11 @@ class Centro:
         cfg = self.cfg
         corregidos = 0
 
+        t_req_patio = self.env.now
         with self.patio_camiones.request() as slot:
             yield slot
+            self.patio_ops.append({"vuelta": vuelta, "camion": camion_id,
+                                   "start": self.env.now, "wait": self.env.now - t_req_patio})
 
             # Fase 1: despacho/acomodo + chequeo en paralelo por pallet
             t0 = self.env.now
@@ -412,19 +436,27 @@ class Centro:
                 yield from self._usar_grua(PRIO_R1, dur, "carga", vuelta, camion_id)
 
             # cierre: parrillero + movilizador
+            t_req = self.env.now
             with self.parr.request() as p:
                 yield p
                 t_parr = U_rng(self.rng, cfg["t_ajuste_capacidad"][0], cfg["t_ajuste_capacidad"][1])
+                t_parr_start = self.env.now
                 yield self.env.timeout(t_parr)
+                self.parr_ops.append({"vuelta": vuelta, "camion": camion_id, "wait": t_parr_start - t_req,
+                                      "start": t_parr_start, "end": self.env.now, "hold": t_parr})
                 
                 # Registrar tiempo activo de parrilleros
                 self.metricas_recursos["parrilleros"]["tiempo_activo"] += t_parr
                 self.metricas_recursos["parrilleros"]["operaciones"] += 1
             
+            t_req = self.env.now
             with self.movi.request() as m:
                 yield m
                 t_movi = U_rng(self.rng, cfg["t_mover_camion"][0], cfg["t_mover_camion"][1])
+                t_movi_start = self.env.now
                 yield self.env.timeout(t_movi)
+                self.movi_ops.append({"vuelta": vuelta, "camion": camion_id, "wait": t_movi_start - t_req,
+                                      "start": t_movi_start, "end": self.env.now, "hold": t_movi})
                 
                 # Registrar tiempo activo de movilizadores
                 self.metricas_recursos["movilizadores"]["tiempo_activo"] += t_movi
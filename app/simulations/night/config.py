@@ -1,5 +1,10 @@
 # app/simulations/night_shift/config.py
 
+# Versión del motor: subirla cuando un cambio en los simuladores cambie los
+# resultados. Es parte de la clave de caché de las corridas guardadas
+# (run_store.huella_cfg), así que invalida lo simulado con la versión anterior.
+VERSION_MOTOR = 1
+
 # Configuración exacta de tu simulación
 DEFAULT_CONFIG = {
     "camiones": 20,
@@ -1,6 +1,21 @@
 # app/simulations/night_shift/metrics.py
-from collections import defaultdict
 from .utils import hhmm_dias
+from ..registros import agregar
+
+def campos_monitor(centro, nombre):
+    """Ocupación y colas ponderadas por tiempo del recurso monitoreado 'nombre' (si existe)."""
+    monitor = (getattr(centro, "recursos_monitoreados", None) or {}).get(nombre)
+    if monitor is None:
+        return {}
+    m = monitor.estadisticas()
+    return {
+        "porcentaje_ocupacion_monitor": round(m["utilizacion_pct"], 2),
+        "horizonte_monitor_min": m["horizonte_min"],
+        "en_servicio_medio": m["usuarios_medio"],
+        "cola_media": m["cola_media"],
+        "cola_max": m["cola_max"],
+        "espera_media_cola_min": m["espera_media_min"],
+    }
 
 def calcular_ocupacion_recursos(centro, cfg, tiempo_total_turno):
     """
@@ -27,8 +42,8 @@ def calcular_ocupacion_recursos(centro, cfg, tiempo_total_turno):
         },
         "grueros": {
             "capacidad": cfg.get("cap_gruero", 0),
-            "tiempo_activo": sum(op["hold"] for op in centro.grua_ops),
-            "operaciones": len(centro.grua_ops),
+            "tiempo_activo": _total_grua(centro)["hold"]["suma"],
+            "operaciones": _total_grua(centro)["n"],
         },
         "parrilleros": {
             "capacidad": cfg.get("cap_parrillero", 0),
@@ -42,6 +57,9 @@ def calcular_ocupacion_recursos(centro, cfg, tiempo_total_turno):
         },
     }
     
+    inicio = int(cfg.get("shift_start_min", 0))
+    duracion_turno = int(cfg.get("shift_end_min", inicio + 8 * 60)) - inicio
+
     ocupacion = {}
     for nombre, datos in recursos.items():
         capacidad = datos["capacidad"]
@@ -49,7 +67,7 @@ def calcular_ocupacion_recursos(centro, cfg, tiempo_total_turno):
         operaciones = datos["operaciones"]
         
         # Tiempo total disponible = capacidad * duración del turno
-        tiempo_total_disponible = capacidad * 480
+        tiempo_total_disponible = capacidad * duracion_turno
         
         # Porcentaje de ocupación
         porcentaje_ocupacion = (tiempo_activo / tiempo_total_disponible * 100) if tiempo_total_disponible > 0 else 0
@@ -67,6 +85,8 @@ def calcular_ocupacion_recursos(centro, cfg, tiempo_total_turno):
             "tiempo_promedio_por_operacion_min": round(tiempo_promedio_operacion, 2),
             "operaciones_por_recurso": round(operaciones / capacidad, 2) if capacidad > 0 else 0,
         }
+
+        ocupacion[nombre].update(campos_monitor(centro, nombre))
     
     # Resumen general
     ocupacion["resumen"] = {
@@ -88,46 +108,47 @@ def calcular_ocupacion_recursos(centro, cfg, tiempo_total_turno):
     return ocupacion
 
 
+def _total_grua(centro):
+    # agregados exactos aunque grua_ops sea un RegistroAcotado truncado
+    return agregar(centro.grua_ops, ("wait", "hold")).get(None) or {
+        "n": 0, "wait": {"suma": 0, "max": 0}, "hold": {"suma": 0, "max": 0}}
+
 def _resumir_grua(centro, cfg, total_fin):
     ops = centro.grua_ops
-    by_vuelta = defaultdict(list)
-    by_label = defaultdict(list)
-    for o in ops:
-        by_vuelta[o["vuelta"]].append(o)
-        by_label[o["label"]].append(o)
-
-    def pack(lst):
-        if not lst:
+
+    def pack(g):
+        n = g["n"]
+        if not n:
             return {"ops": 0, "total_wait_min": 0, "mean_wait_min": 0, "max_wait_min": 0,
                     "total_hold_min": 0, "mean_hold_min": 0}
-        waits = [x["wait"] for x in lst]
-        holds = [x["hold"] for x in lst]
         return {
-            "ops": len(lst),
-            "total_wait_min": sum(waits),
-            "mean_wait_min": (sum(waits)/len(waits) if waits else 0),
-            "max_wait_min": (max(waits) if waits else 0),
-            "total_hold_min": sum(holds),
-            "mean_hold_min": (sum(holds)/len(holds) if holds else 0),
+            "ops": n,
+            "total_wait_min": g["wait"]["suma"],
+            "mean_wait_min": g["wait"]["suma"] / n,
+            "max_wait_min": g["wait"]["max"],
+            "total_hold_min": g["hold"]["suma"],
+            "mean_hold_min": g["hold"]["suma"] / n,
         }
 
+    by_vuelta = agregar(ops, ("wait", "hold"), por="vuelta")
     por_vuelta = []
     for v in sorted(by_vuelta):
         rec = pack(by_vuelta[v]); rec["vuelta"] = v
         por_vuelta.append(rec)
 
-    por_label = {lbl: pack(lst) for lbl, lst in by_label.items()}
+    por_label = {lbl: pack(g) for lbl, g in agregar(ops, ("wait", "hold"), por="label").items()}
 
-    total_hold = sum(o["hold"] for o in ops)
+    total = _total_grua(centro)
+    total_hold = total["hold"]["suma"]
     horizon = max(total_fin, 1e-9)
     cap_total = cfg.get("cap_gruero", 4)
     util = total_hold / (cap_total * horizon)
 
     overall = {
-        "ops": len(ops),
+        "ops": total["n"],
         "total_hold_min": total_hold,
-        "total_wait_min": sum(o["wait"] for o in ops),
-        "mean_wait_min": (sum(o["wait"] for o in ops)/len(ops) if ops else 0),
+        "total_wait_min": total["wait"]["suma"],
+        "mean_wait_min": (total["wait"]["suma"] / total["n"] if total["n"] else 0),
         "utilizacion_prom": util
     }
     return {"overall": overall, "por_vuelta": por_vuelta, "por_label": por_label}
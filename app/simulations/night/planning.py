@@ -1,4 +1,8 @@
 # app/simulations/night_shift/planning.py
+import copy
+import threading
+from collections import OrderedDict
+
 from .config import WEIBULL_CAJAS_PARAMS, DEFAULT_CONFIG
 from .rng import RI_rng
 from .dists import sample_weibull_cajas
@@ -165,4 +169,51 @@ def construir_plan_desde_pallets(pallets, cfg, rng):
             break
 
     return asignar_ids_camiones(plan)
-    
\ No newline at end of file
+
+# ---- Caché de planificación (pallets + plan) por semilla y entradas ----------
+# Claves de cfg que usa la planificación; el resto no altera el plan.
+CLAVES_CFG_PLAN = ("camiones", "cajas_por_pallet_mixto", "cajas_por_pallet_completo")
+_PLAN_CACHE_MAX = 64
+_plan_cache = OrderedDict()
+_plan_cache_lock = threading.Lock()
+
+def _clave_plan(total_cajas_facturadas, cajas_para_pick, cfg, seed):
+    return (int(seed), int(total_cajas_facturadas), int(cajas_para_pick),
+            tuple(repr(cfg.get(k)) for k in CLAVES_CFG_PLAN))
+
+def planificar_noche(total_cajas_facturadas, cajas_para_pick, cfg, rng, seed=None):
+    """
+    generar_pallets_desde_cajas_dobles + construir_plan_desde_pallets con caché.
+
+    Con seed fija, el resultado (y el estado del rng al terminar de planificar)
+    se guarda; una llamada posterior con las mismas entradas reutiliza el plan
+    y deja el rng en el mismo estado, así la simulación es idéntica.
+    Con seed=None no se cachea (cada corrida es distinta).
+    Devuelve (pallets, resumen_pallets, plan, desde_cache).
+    """
+    if seed is None:
+        pallets, resumen = generar_pallets_desde_cajas_dobles(total_cajas_facturadas, cajas_para_pick, cfg, rng)
+        return pallets, resumen, construir_plan_desde_pallets(pallets, cfg, rng), False
+
+    clave = _clave_plan(total_cajas_facturadas, cajas_para_pick, cfg, seed)
+    with _plan_cache_lock:
+        hit = _plan_cache.get(clave)
+        if hit is not None:
+            _plan_cache.move_to_end(clave)
+    if hit is not None:
+        pallets, resumen, plan, estado_rng = copy.deepcopy(hit)
+        rng.bit_generator.state = estado_rng
+        return pallets, resumen, plan, True
+
+    pallets, resumen = generar_pallets_desde_cajas_dobles(total_cajas_facturadas, cajas_para_pick, cfg, rng)
+    plan = construir_plan_desde_pallets(pallets, cfg, rng)
+    entrada = copy.deepcopy((pallets, resumen, plan, rng.bit_generator.state))
+    with _plan_cache_lock:
+        _plan_cache[clave] = entrada
+        while len(_plan_cache) > _PLAN_CACHE_MAX:
+            _plan_cache.popitem(last=False)
+    return pallets, resumen, plan, False
+
+def limpiar_cache_planes():
+    with _plan_cache_lock:
+        _plan_cache.clear()
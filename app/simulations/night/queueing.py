@@ -0,0 +1,213 @@
+# app/simulations/night/queueing.py
+"""
+Pre-estimación analítica (sin SimPy) de cargas de recursos del turno noche.
+
+A partir de los pallets de generar_pallets_desde_cajas_dobles y del plan de
+vueltas, calcula la carga de trabajo de cada recurso con las medias de los
+muestreadores de dists.py y aproxima colas M/G/c (Erlang-C con la corrección
+de Allen–Cunneen). También entrega una cota inferior del largo del turno.
+Sirve para previsualizar en milisegundos y para descartar escenarios
+claramente infactibles antes de simular.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+from scipy import stats
+
+from .config import (
+    CHISQUARED_PREP_MIXTO, LOGNORMAL_CARGA_PALLET, LOGNORMAL_DESPACHO_COMPLETO,
+)
+from .rng import make_rng
+from .planning import planificar_noche
+
+# ---------------------------------------------------------------------------
+# Momentos de los tiempos de servicio (mismos recortes que dists.py)
+# ---------------------------------------------------------------------------
+
+def _momentos_recortados(dist, desplazamiento, lo, hi):
+    """(media, SCV) de clip(X + desplazamiento, lo, hi)."""
+    f = lambda x: min(max(x + desplazamiento, lo), hi)
+    m1 = dist.expect(f)
+    m2 = dist.expect(lambda x: f(x) ** 2)
+    var = max(0.0, m2 - m1 * m1)
+    return m1, (var / (m1 * m1) if m1 > 0 else 0.0)
+
+def _momentos_uniforme(rango):
+    a, b = float(rango[0]), float(rango[1])
+    m = (a + b) / 2.0
+    var = (b - a) ** 2 / 12.0
+    return m, (var / (m * m) if m > 0 else 0.0)
+
+@lru_cache(maxsize=None)
+def momentos_servicio():
+    """Medias y SCV de los muestreadores no configurables (se calculan una vez)."""
+    prep = _momentos_recortados(
+        stats.chi2(CHISQUARED_PREP_MIXTO["df"]), CHISQUARED_PREP_MIXTO["scale"], 0.2, 20.0)
+    carga = _momentos_recortados(
+        stats.lognorm(s=LOGNORMAL_CARGA_PALLET["sigma"], scale=math.exp(LOGNORMAL_CARGA_PALLET["mu"])),
+        LOGNORMAL_CARGA_PALLET["gamma"], 0.1, 2.5)
+    despacho = _momentos_recortados(
+        stats.lognorm(s=LOGNORMAL_DESPACHO_COMPLETO["sigma"], scale=math.exp(LOGNORMAL_DESPACHO_COMPLETO["mu"])),
+        LOGNORMAL_DESPACHO_COMPLETO.get("gamma", 0.0), 0.2, 2.5)
+    # sample_tiempo_chequeo_unitario: lognormal media 1.0, CV 0.30 truncada a [0.4, 2.0]
+    sigma = math.sqrt(math.log(1.0 + 0.30 ** 2))
+    chk_dist = stats.lognorm(s=sigma, scale=math.exp(math.log(1.0) - 0.5 * sigma * sigma))
+    z = chk_dist.cdf(2.0) - chk_dist.cdf(0.4)
+    m1 = chk_dist.expect(lambda x: x, lb=0.4, ub=2.0) / z
+    m2 = chk_dist.expect(lambda x: x * x, lb=0.4, ub=2.0) / z
+    chequeo = (m1, max(0.0, m2 - m1 * m1) / (m1 * m1))
+    return {"prep_mixto": prep, "carga_pallet": carga, "despacho_completo": despacho, "chequeo": chequeo}
+
+# ---------------------------------------------------------------------------
+# Erlang-C / M/G/c
+# ---------------------------------------------------------------------------
+
+def erlang_c(c, a):
+    """Probabilidad de espera en M/M/c con carga ofrecida a = λ/μ (Erlang)."""
+    c = int(c)
+    if c <= 0:
+        return 1.0
+    if a <= 0:
+        return 0.0
+    if a >= c:
+        return 1.0
+    b = 1.0
+    for k in range(1, c + 1):
+        b = a * b / (k + a * b)   # Erlang-B recursivo (estable)
+    rho = a / c
+    return b / (1.0 - rho * (1.0 - b))
+
+def cola_mgc(llegadas_por_min, media_servicio, scv_servicio, c):
+    """
+    Aproximación M/G/c (Allen–Cunneen): Wq ≈ Wq(M/M/c)·(1 + SCV)/2.
+    Devuelve rho, prob. de espera, espera media y largo medio de cola.
+    """
+    c = int(c)
+    if c <= 0 or media_servicio <= 0:
+        return {"rho": float("inf") if llegadas_por_min > 0 else 0.0,
+                "p_espera": 1.0, "espera_media_min": float("inf"), "cola_media": float("inf")}
+    a = llegadas_por_min * media_servicio
+    rho = a / c
+    if rho >= 1.0 - 1e-9:   # saturado: la cola no tiene régimen estacionario
+        return {"rho": rho, "p_espera": 1.0, "espera_media_min": float("inf"), "cola_media": float("inf")}
+    pw = erlang_c(c, a)
+    wq = pw * media_servicio / (c - a) * (1.0 + scv_servicio) / 2.0
+    return {"rho": rho, "p_espera": pw, "espera_media_min": wq, "cola_media": llegadas_por_min * wq}
+
+# ---------------------------------------------------------------------------
+# Estimador
+# ---------------------------------------------------------------------------
+
+def _mezcla(partes):
+    """Media y SCV de una mezcla [(n_ops, media, scv), ...] de tiempos de servicio."""
+    n = sum(p[0] for p in partes)
+    if n <= 0:
+        return 0, 0.0, 0.0
+    m1 = sum(k * m for k, m, _ in partes) / n
+    m2 = sum(k * (m * m * (1.0 + scv)) for k, m, scv in partes) / n
+    return n, m1, (max(0.0, m2 - m1 * m1) / (m1 * m1) if m1 > 0 else 0.0)
+
+def estimar_cargas_noche(total_cajas_facturadas, cajas_para_pick, cfg, seed=None, plan=None, pallets=None):
+    """
+    Estima carga, utilización y colas por recurso sin crear un entorno SimPy.
+
+    Si no se entregan 'pallets'/'plan' se generan con la misma planificación
+    que usa la simulación (mismo seed => mismo plan).
+    """
+    if pallets is None or plan is None:
+        pallets, _, plan, _ = planificar_noche(total_cajas_facturadas, cajas_para_pick, cfg, make_rng(seed), seed=seed)
+
+    mom = momentos_servicio()
+    acomodo1 = _momentos_uniforme(cfg["t_acomodo_primera"])
+    acomodo = _momentos_uniforme(cfg["t_acomodo_otra"])
+    correccion = _momentos_uniforme(cfg["t_correccion"])
+    parr = _momentos_uniforme(cfg["t_ajuste_capacidad"])
+    movi = _momentos_uniforme(cfg["t_mover_camion"])
+    p_def = float(cfg.get("p_defecto", 0.0))
+
+    v1 = next((asign for (v, asign) in plan if v == 1), [])
+    v2 = [a for (v, asign) in plan if v > 1 for a in asign]
+    pal_v1 = [p for a in v1 for p in a["pallets"]]
+    pal_v2 = [p for a in v2 for p in a["pallets"]]
+    camiones_v1 = len(v1)
+    mixtos_v1 = sum(1 for p in pal_v1 if p["mixto"])
+    mixtos_total = sum(1 for p in pallets if p["mixto"])
+    completos_v1 = len(pal_v1) - mixtos_v1
+    mixtos_v2 = sum(1 for p in pal_v2 if p["mixto"])
+    completos_v2 = len(pal_v2) - mixtos_v2
+    defectos = len(pal_v1) * p_def
+
+    # (ops, media, scv) por tipo de operación; la carga V1 usa los pallets asignados
+    # (ignora las fusiones por capacidad real del camión, que son pocas)
+    grua = _mezcla([
+        (completos_v1, *mom["despacho_completo"]),
+        (camiones_v1, *acomodo1),
+        (max(0, len(pal_v1) - camiones_v1), *acomodo),
+        (defectos, *correccion),
+        (len(pal_v1), *mom["carga_pallet"]),
+        (mixtos_v2, *acomodo),
+        (completos_v2, *mom["despacho_completo"]),
+    ])
+    recursos = {
+        "pickers": ("cap_picker", _mezcla([(mixtos_total, *mom["prep_mixto"])])),
+        "grueros": ("cap_gruero", grua),
+        "chequeadores": ("cap_chequeador", _mezcla([(len(pal_v1) + defectos, *mom["chequeo"])])),
+        "parrilleros": ("cap_parrillero", _mezcla([(camiones_v1, *parr)])),
+        "movilizadores": ("cap_movilizador", _mezcla([(camiones_v1, *movi)])),
+    }
+
+    duracion_turno = float(cfg["shift_end_min"] - cfg.get("shift_start_min", 0))
+
+    cargas = {}
+    cota = 0.0
+    for nombre, (cap_key, (ops, media, scv)) in recursos.items():
+        cap = int(cfg.get(cap_key, 0) or 0)
+        trabajo = ops * media
+        t_min = (trabajo / cap) if cap > 0 else (float("inf") if trabajo > 0 else 0.0)
+        cota = max(cota, t_min)
+        cargas[nombre] = {
+            "capacidad": cap, "operaciones": float(ops),
+            "media_servicio_min": media, "scv_servicio": scv,
+            "trabajo_total_min": trabajo, "tiempo_minimo_min": t_min,
+        }
+
+    # Si la cota supera el turno, las llegadas se reparten en la cota (no en el turno)
+    horizonte = max(duracion_turno, cota, 1e-9)
+    for nombre, info in cargas.items():
+        lam = info["operaciones"] / horizonte
+        cola = cola_mgc(lam, info["media_servicio_min"], info["scv_servicio"], info["capacidad"])
+        info["utilizacion_turno_nominal"] = (
+            info["trabajo_total_min"] / (info["capacidad"] * duracion_turno)
+            if info["capacidad"] > 0 and duracion_turno > 0 else float("inf")
+        )
+        info.update({
+            "llegadas_por_min": lam,
+            "rho": cola["rho"],
+            "p_espera": cola["p_espera"],
+            "espera_media_min": cola["espera_media_min"],
+            "cola_media": cola["cola_media"],
+        })
+
+    cuello = max(cargas, key=lambda k: cargas[k]["tiempo_minimo_min"]) if cargas else None
+    factible = bool(cota <= duracion_turno and all(
+        np.isfinite(c["utilizacion_turno_nominal"]) and c["utilizacion_turno_nominal"] < 1.0
+        for c in cargas.values()))
+    # infinitos (colas saturadas, recursos sin capacidad) -> None, serializable en JSON
+    for info in cargas.values():
+        for k, v in info.items():
+            if isinstance(v, float) and not math.isfinite(v):
+                info[k] = None
+    return {
+        "pallets": {"total": len(pallets), "mixtos": mixtos_total, "completos": len(pallets) - mixtos_total,
+                    "vuelta_1": len(pal_v1), "vueltas_2_mas": len(pal_v2)},
+        "vueltas": len(plan),
+        "camiones_v1": camiones_v1,
+        "recursos": cargas,
+        "cuello_botella": cuello,
+        "cota_inferior_fin_min": cota if math.isfinite(cota) else None,
+        "overrun_minimo_min": max(0.0, cota - duracion_turno) if math.isfinite(cota) else None,
+        "factible": factible,
+    }
+
+__all__ = ["estimar_cargas_noche", "erlang_c", "cola_mgc", "momentos_servicio"]
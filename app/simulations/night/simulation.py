@@ -1,18 +1,56 @@
 # app/simulations/night_shift/simulation.py
-import simpy
 from .rng import make_rng
+from ..instrumentation import crear_entorno, seccion, tiempos_secciones
+from ..trace_export import escribir_traza_turno
+from ..recursos import resumen_monitores
+from ..bitacora import bitacora_desde_cfg, DEBUG
+from ..presentacion import formatear_horas_centro
+from ..registros import estado_registros
 from .utils import hhmm_dias
-from .planning import generar_pallets_desde_cajas_dobles, construir_plan_desde_pallets
+from .planning import planificar_noche
 from .centro import Centro
 from .metrics import _resumir_grua, calcular_resumen_vueltas, calcular_ice_mixto, calcular_ocupacion_recursos
 from .reporting import generar_json_vueltas_camiones, generar_estado_inicial_dia
+from .camino_critico import camino_critico_noche, logs_operaciones
 
-def simular_turno_prioridad_rng(total_cajas_facturadas, cajas_para_pick, cfg, seed=None):
+LOGS_ACOTADOS = ("grua_ops", "tiempos_prep_mixto", "tiempos_chequeo_detallados", "linea_tiempo")
+# completos aunque haya presupuesto (se informan en registros_truncados con el motivo)
+LOGS_COMPLETOS = {"eventos": "un registro por camión y vuelta (crece con el plan, no con las operaciones); "
+                             "lo usan completo el reporte por camión, el estado inicial del día y el camino crítico"}
+
+def _resumen_plan(plan):
+    return [{
+        "vuelta": vuelta,
+        "modo": ("carga" if vuelta == 1 else "staging"),
+        "camiones": len(asign),
+        "pallets": sum(len(a["pallets"]) for a in asign),
+        "cajas": sum(p["cajas"] for a in asign for p in a["pallets"]),
+    } for (vuelta, asign) in plan]
+
+def preview_turno_noche(total_cajas_facturadas, cajas_para_pick, cfg, seed=None):
+    """Sólo planificación (sin SimPy): plan de vueltas, resumen de pallets y camiones."""
+    rng = make_rng(seed)
+    pallets, resumen_pallets, plan, desde_cache = planificar_noche(
+        total_cajas_facturadas, cajas_para_pick, cfg, rng, seed=seed)
+    camiones_unicos = {a["camion_id"] for (_, asign) in plan for a in asign}
+    return {
+        "pallets_pre": resumen_pallets,
+        "pallets_pre_total": len(pallets),
+        "vueltas": len(plan),
+        "resumen_plan": _resumen_plan(plan),
+        "camiones_unicos_estimados": len(camiones_unicos),
+        "planificacion_detalle": plan,
+        "plan_desde_cache": desde_cache,
+    }
+
+def simular_turno_prioridad_rng(total_cajas_facturadas, cajas_para_pick, cfg, seed=None, perfilar=False,
+                                traza=None, dia=0, bitacora=None, perfil_memoria=False):
     rng = make_rng(seed)
-    env = simpy.Environment()
+    env = crear_entorno(perfilar, perfil_memoria)
+    bitacora = bitacora_desde_cfg(cfg, bitacora)
 
-    pallets, resumen_pallets = generar_pallets_desde_cajas_dobles(total_cajas_facturadas, cajas_para_pick, cfg, rng)
-    plan = construir_plan_desde_pallets(pallets, cfg, rng)
+    with seccion(env, "planificar_noche"):
+        pallets, resumen_pallets, plan, _ = planificar_noche(total_cajas_facturadas, cajas_para_pick, cfg, rng, seed=seed)
 
     # Gates de PICK por vuelta
     pick_gate = {}
@@ -25,25 +63,44 @@ def simular_turno_prioridad_rng(total_cajas_facturadas, cajas_para_pick, cfg, se
     camiones_unicos = {a["camion_id"] for (_, asign) in plan for a in asign}
     centro = Centro(env, cfg, pick_gate, rng,
                     total_cajas_facturadas=total_cajas_facturadas,
-                    num_camiones_estimado=len(camiones_unicos))
+                    num_camiones_estimado=len(camiones_unicos), bitacora=bitacora)
+
+    try:
+        # Lanzar procesos por vuelta
+        for (vuelta, asignaciones) in plan:
+            for camion_data in asignaciones:
+                env.process(centro.procesa_camion_vuelta(vuelta, camion_data))
 
-    # Lanzar procesos por vuelta
-    for (vuelta, asignaciones) in plan:
-        for camion_data in asignaciones:
-            env.process(centro.procesa_camion_vuelta(vuelta, camion_data))
+        with seccion(env, "simpy.run"):
+            env.run()
+    finally:
+        # se cierra antes de formatear (los archivos llevan sólo minutos) y también si la corrida falla
+        registros_en_disco = centro.volcado.cerrar() if centro.volcado is not None else None
 
-    env.run()
+    # Los registros del motor sólo tienen minutos; HH:MM se arma acá, en lote
+    with seccion(env, "presentacion.formatear_horas"):
+        formatear_horas_centro(centro, cfg["shift_start_min"])
 
     total_fin = max((e["fin_min"] for e in centro.eventos), default=0)
-    resumen_por_vuelta = calcular_resumen_vueltas(plan, centro, cfg)
-    grua_metrics = _resumir_grua(centro, cfg, total_fin)
-    ice_mixto = calcular_ice_mixto(centro, cfg)
+    with seccion(env, "metricas.calcular_resumen_vueltas"):
+        resumen_por_vuelta = calcular_resumen_vueltas(plan, centro, cfg)
+    with seccion(env, "metricas._resumir_grua"):
+        grua_metrics = _resumir_grua(centro, cfg, total_fin)
+    with seccion(env, "metricas.calcular_ice_mixto"):
+        ice_mixto = calcular_ice_mixto(centro, cfg)
 
     # Reportes
-    vueltas_camiones_json = generar_json_vueltas_camiones(plan, centro)
-    estado_inicial_dia = generar_estado_inicial_dia(plan, centro)
+    with seccion(env, "reporting.generar_json_vueltas_camiones"):
+        vueltas_camiones_json = generar_json_vueltas_camiones(plan, centro)
+    with seccion(env, "reporting.generar_estado_inicial_dia"):
+        estado_inicial_dia = generar_estado_inicial_dia(plan, centro)
+
+    with seccion(env, "metricas.calcular_ocupacion_recursos"):
+        ocupacion = calcular_ocupacion_recursos(centro, cfg, total_fin)
 
-    ocupacion = calcular_ocupacion_recursos(centro, cfg, total_fin)
+    with seccion(env, "analisis.camino_critico"):
+        camino = camino_critico_noche(centro.eventos, logs_operaciones(centro), pick_gate,
+                                      overrun_min=max(0, total_fin - cfg["shift_end_min"]))
 
     linea_tiempo_ordenada = sorted(centro.linea_tiempo, key=lambda e: e["tiempo_min"])
 
@@ -65,13 +122,33 @@ def simular_turno_prioridad_rng(total_cajas_facturadas, cajas_para_pick, cfg, se
         "grua": grua_metrics,
         "ice_mixto": ice_mixto,
         "ocupacion_recursos": ocupacion,
+        "monitor_recursos": resumen_monitores(centro.recursos_monitoreados),
+        "camino_critico": camino,
+        # logs que superaron cfg["max_registros_log"] (quedan como muestra + agregados exactos)
+        "registros_truncados": estado_registros(
+            centro, LOGS_ACOTADOS, LOGS_COMPLETOS if cfg.get("max_registros_log") else None),
         "centro_eventos": centro.eventos,
         "grua_operaciones": centro.grua_ops,
         "planificacion_detalle": plan,
         "pick_gates": pick_gate,
         "estado_inicial_dia": estado_inicial_dia,
+        "eventos_procesados": env.eventos_procesados,
+        # pared por sección del motor (planificación, simpy.run, métricas, reportes)
+        "secciones_wall_s": tiempos_secciones(env),
     }
-    print(resultado["ocupacion_recursos"])
+    if bitacora.habilitado(DEBUG):
+        bitacora.debug("Ocupación recursos (noche)", t=total_fin, ocupacion=ocupacion)
 
     resultado.update(vueltas_camiones_json)
+    if registros_en_disco is not None:
+        resultado["registros_en_disco"] = registros_en_disco
+    if traza is not None:
+        # ruta o EscritorTraza (Chrome trace / Perfetto), ver trace_export
+        resultado["traza"] = escribir_traza_turno(
+            traza, centro, env, offset_min=cfg["shift_start_min"] + 1440 * dia, turno=f"noche d{dia}")
+    if perfilar:
+        resultado["perfil"] = env.resumen_perfil()
+    if env.picos_memoria:
+        # sólo en la corrida del perfil de memoria (perfil_memoria con tracemalloc activo)
+        resultado["secciones_memoria_pico_bytes"] = dict(env.picos_memoria)
     return resultado
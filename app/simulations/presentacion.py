@@ -0,0 +1,62 @@
+# app/simulations/presentacion.py
+"""
+Capa de presentación de los resultados.
+
+Los motores guardan sólo minutos (float, relativos al inicio del turno); los
+textos 'HH:MM' se generan una vez, al armar el resultado, y en lote: los
+minutos se redondean con numpy y cada minuto distinto se formatea una sola
+vez (en un turno hay pocos cientos de minutos distintos frente a miles de
+registros).
+"""
+import numpy as np
+
+from .night.utils import hhmm_dias
+
+# atributo del centro -> {campo texto: campo minutos | (campo minutos, origen fijo)}
+CAMPOS_HORA = {
+    "eventos": {"inicio_hhmm": "inicio_min", "fin_hhmm": "fin_min"},
+    "t1_eventos": {"inicio_hhmm": "inicio_min", "fin_hhmm": "fin_min"},
+    "linea_tiempo": {"hora": "tiempo_min"},
+    "salidas_camiones": {"salida_hhmm": "salida_min", "retorno_est_hhmm": "retorno_est_min"},
+    # 'timestamp' siempre se publicó sin sumar el inicio del turno
+    "tiempos_chequeo_detallados": {"timestamp": ("tiempo_inicio", 0.0)},
+}
+
+
+def hhmm_lote(minutos, origen_min=0.0):
+    """Como [hhmm_dias(origen_min + m) for m in minutos], con None para None."""
+    minutos = list(minutos)
+    if not minutos:
+        return []
+    arr = np.array([np.nan if m is None else m for m in minutos], dtype=float) + origen_min
+    validos = ~np.isnan(arr)
+    # np.rint redondea al par igual que round(), así el texto coincide con hhmm_dias
+    unicos, inversa = np.unique(np.rint(arr[validos]).astype(np.int64), return_inverse=True)
+    textos = [hhmm_dias(int(u)) for u in unicos]
+    out = [None] * len(minutos)
+    for i, j in zip(np.flatnonzero(validos).tolist(), inversa.tolist()):
+        out[i] = textos[j]
+    return out
+
+
+def formatear_registros(registros, campos, origen_min=0.0):
+    """Agrega a cada dict los campos de texto de 'campos' ({destino: origen})."""
+    if not registros:
+        return registros
+    for destino, fuente in campos.items():
+        fuente, origen = fuente if isinstance(fuente, tuple) else (fuente, origen_min)
+        textos = hhmm_lote((r.get(fuente) for r in registros), origen)
+        for r, txt in zip(registros, textos):
+            r[destino] = txt
+    return registros
+
+
+def formatear_horas_centro(centro, origen_min=0.0):
+    """Materializa los campos HH:MM de CAMPOS_HORA presentes en un Centro / CentroDia."""
+    for attr, campos in CAMPOS_HORA.items():
+        registros = getattr(centro, attr, None)
+        if registros:
+            formatear_registros(registros, campos, origen_min)
+
+
+__all__ = ["CAMPOS_HORA", "hhmm_lote", "formatear_registros", "formatear_horas_centro"]
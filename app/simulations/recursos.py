@@ -0,0 +1,242 @@
+# app/simulations/recursos.py
+"""
+Recursos SimPy monitoreados.
+
+Mantienen, en O(1) por cambio de estado, las integrales en el tiempo de
+usuarios en servicio, largo de cola y capacidad, de modo que la ocupación y
+la cola media salen exactas sin guardar un log por operación. Opcionalmente
+acumulan una serie submuestreada (promedio ponderado por tiempo en
+ventanas de 'muestreo_min', más el máximo de usuarios de cada ventana).
+
+Se actualizan al final de _trigger_put/_trigger_get (toda request/release
+pasa por ahí), al cancelar una request encolada y al cambiar la capacidad
+(asignar _capacity, como hace CentroDia._aplicar_capacidades).
+"""
+import simpy
+from simpy.resources.base import BaseResource
+from simpy.resources.resource import SortedQueue
+
+
+class _Cola(list):
+    recurso = None
+
+    def append(self, item):
+        list.append(self, item)
+        if self.recurso is not None:
+            self.recurso.solicitudes += 1
+
+    def remove(self, item):
+        list.remove(self, item)
+        if self.recurso is not None:
+            self.recurso._tick()
+
+
+class _ColaOrdenada(SortedQueue):
+    recurso = None
+
+    def append(self, item):
+        SortedQueue.append(self, item)
+        if self.recurso is not None:
+            self.recurso.solicitudes += 1
+
+    def remove(self, item):
+        list.remove(self, item)
+        if self.recurso is not None:
+            self.recurso._tick()
+
+
+class _Monitor:
+    """Mixin para simpy.Resource / PriorityResource."""
+
+    def __init__(self, env, capacity=1, nombre=None, muestreo_min=None):
+        self._mon_listo = False
+        super().__init__(env, capacity)
+        self.nombre = nombre
+        self.put_queue.recurso = self
+        self.muestreo_min = muestreo_min
+        self._t0 = self._t_ultimo = env.now
+        self._u = self._q = 0
+        self._c = self._capacity
+        self.area_usuarios = 0.0
+        self.area_cola = 0.0
+        self.area_capacidad = 0.0
+        self.usuarios_max = 0
+        self.cola_max = 0
+        self.solicitudes = 0
+        self.capacidad_max = self._c
+        # serie submuestreada: [(t_ini_ventana, usuarios_medio, cola_media, capacidad_media, usuarios_max)]
+        self.serie = [] if muestreo_min else None
+        self._vent = [0.0, 0.0, 0.0]    # áreas dentro de la ventana actual
+        self._vent_max = 0
+        self._vent_ini = self._t0
+        self._mon_listo = True
+
+    # capacidad asignable (cambios de dotación quedan en la integral)
+    @property
+    def _capacity(self):
+        return self._cap
+
+    @_capacity.setter
+    def _capacity(self, valor):
+        self._cap = valor
+        if getattr(self, "_mon_listo", False):
+            self.capacidad_max = max(self.capacidad_max, valor)
+            self._tick()
+
+    @property
+    def capacity(self):
+        return self._cap
+
+    def _acumular_serie(self, t_desde, t_hasta):
+        dt = self.muestreo_min
+        u, q, c = self._u, self._q, self._c
+        while t_desde < t_hasta:
+            fin_vent = self._vent_ini + dt
+            tramo = min(t_hasta, fin_vent) - t_desde
+            self._vent[0] += u * tramo
+            self._vent[1] += q * tramo
+            self._vent[2] += c * tramo
+            t_desde += tramo
+            if t_desde >= fin_vent:
+                self.serie.append((self._vent_ini, self._vent[0] / dt, self._vent[1] / dt, self._vent[2] / dt,
+                                   max(self._vent_max, u)))
+                self._vent = [0.0, 0.0, 0.0]
+                self._vent_max = u
+                self._vent_ini = fin_vent
+
+    def _tick(self):
+        ahora = self._env._now
+        dt = ahora - self._t_ultimo
+        if dt > 0:
+            self.area_usuarios += self._u * dt
+            self.area_cola += self._q * dt
+            self.area_capacidad += self._c * dt
+            if self.serie is not None:
+                self._acumular_serie(self._t_ultimo, ahora)
+            self._t_ultimo = ahora
+        u = self._u = len(self.users)
+        q = self._q = len(self.put_queue)
+        self._c = self._cap
+        if u > self.usuarios_max:
+            self.usuarios_max = u
+        if u > self._vent_max:
+            self._vent_max = u
+        if q > self.cola_max:
+            self.cola_max = q
+
+    def _trigger_put(self, get_event):
+        BaseResource._trigger_put(self, get_event)
+        self._tick()
+
+    def _trigger_get(self, put_event):
+        BaseResource._trigger_get(self, put_event)
+        self._tick()
+
+    def estadisticas(self, hasta=None):
+        """Promedios ponderados por tiempo en [t0, hasta] (por defecto env.now)."""
+        hasta = self._env.now if hasta is None else hasta
+        extra = max(0.0, hasta - self._t_ultimo)
+        horizonte = max(0.0, hasta - self._t0)
+        a_u = self.area_usuarios + self._u * extra
+        a_q = self.area_cola + self._q * extra
+        a_c = self.area_capacidad + self._c * extra
+        out = {
+            "horizonte_min": horizonte,
+            "capacidad_media": (a_c / horizonte) if horizonte > 0 else float(self._c),
+            "capacidad_max": self.capacidad_max,
+            "usuarios_medio": (a_u / horizonte) if horizonte > 0 else 0.0,
+            "usuarios_max": self.usuarios_max,
+            "cola_media": (a_q / horizonte) if horizonte > 0 else 0.0,
+            "cola_max": self.cola_max,
+            "solicitudes": self.solicitudes,
+            # Little: espera media en cola = área de cola / llegadas
+            "espera_media_min": (a_q / self.solicitudes) if self.solicitudes else 0.0,
+            "tiempo_ocupado_min": a_u,
+            "capacidad_x_tiempo": a_c,
+            "utilizacion_pct": (100.0 * a_u / a_c) if a_c > 0 else 0.0,
+        }
+        if self.serie is not None:
+            serie = self.serie
+            if extra > 0:
+                # cierra las ventanas completas hasta 'hasta' sin tocar el estado del monitor
+                estado = (list(self.serie), list(self._vent), self._vent_max, self._vent_ini)
+                self._acumular_serie(self._t_ultimo, hasta)
+                serie = self.serie
+                self.serie, self._vent, self._vent_max, self._vent_ini = estado
+            out["serie"] = [{"inicio_min": t, "usuarios_medio": u, "cola_media": q, "capacidad_media": c,
+                             "usuarios_max": m}
+                            for (t, u, q, c, m) in serie]
+        return out
+
+
+class RecursoMonitoreado(_Monitor, simpy.Resource):
+    PutQueue = _Cola
+
+
+class RecursoPrioridadMonitoreado(_Monitor, simpy.PriorityResource):
+    PutQueue = _ColaOrdenada
+
+
+class _CapacidadProgramada:
+    """
+    Capacidad variable en el tiempo (dotación por turno).
+
+    - Al subir la capacidad se atienden de inmediato las requests en cola.
+    - Al bajarla no se expulsa a nadie: los usuarios actuales terminan y no
+      se conceden nuevas requests hasta quedar bajo la nueva capacidad.
+    - escalon_capacidad guarda la función escalón [(t, capacidad), ...]
+      para los denominadores de utilización.
+    """
+
+    def __init__(self, env, capacity=1, **kw):
+        super().__init__(env, capacity, **kw)
+        self.escalon_capacidad = [(env.now, capacity)]
+
+    def fijar_capacidad(self, valor):
+        valor = int(valor)
+        if valor < 0:
+            raise ValueError('"capacity" must be >= 0.')
+        anterior = self._capacity
+        if valor == anterior:
+            return
+        self._capacity = valor
+        ahora = self._env.now
+        if self.escalon_capacidad and self.escalon_capacidad[-1][0] == ahora:
+            self.escalon_capacidad[-1] = (ahora, valor)
+        else:
+            self.escalon_capacidad.append((ahora, valor))
+        # _trigger_put concede de a una request (Resource._do_put corta el loop)
+        while valor > anterior and self.put_queue and len(self.users) < valor:
+            pendientes = len(self.put_queue)
+            self._trigger_put(None)
+            if len(self.put_queue) == pendientes:
+                break
+
+    def programar_capacidad(self, cambios):
+        """Proceso que aplica [(t, capacidad), ...] (tiempos del entorno) en orden."""
+        def _proceso():
+            for t, valor in sorted(cambios, key=lambda c: c[0]):
+                if t > self._env.now:
+                    yield self._env.timeout(t - self._env.now)
+                self.fijar_capacidad(valor)
+        return self._env.process(_proceso())
+
+
+class RecursoProgramado(_CapacidadProgramada, RecursoMonitoreado):
+    pass
+
+
+class RecursoPrioridadProgramado(_CapacidadProgramada, RecursoPrioridadMonitoreado):
+    pass
+
+
+def resumen_monitores(recursos, hasta=None):
+    """{nombre: estadisticas()} para un dict {nombre: recurso monitoreado}."""
+    return {nombre: r.estadisticas(hasta) for nombre, r in recursos.items()
+            if isinstance(r, _Monitor)}
+
+
+__all__ = [
+    "RecursoMonitoreado", "RecursoPrioridadMonitoreado",
+    "RecursoProgramado", "RecursoPrioridadProgramado", "resumen_monitores",
+]
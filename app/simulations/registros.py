@@ -0,0 +1,176 @@
+# app/simulations/registros.py
+"""
+Logs de operaciones con presupuesto de memoria.
+
+Sin presupuesto (por defecto) los motores usan listas comunes. Con
+cfg["max_registros_log"] (entero, o dict {nombre_log: entero}) cada log
+acotado es un RegistroAcotado:
+
+- hasta 'max_registros' se comporta como una lista normal;
+- al superarlo guarda una muestra uniforme (reservoir sampling, algoritmo R,
+  con su propio generador: no consume el RNG de la simulación) y mantiene
+  agregados exactos (n, suma, mín, máx) de los campos numéricos declarados,
+  en total y por las claves de agrupación declaradas.
+
+Las métricas que sólo necesitan totales/promedios usan agregar(), que da el
+mismo resultado para una lista completa y para un log truncado. El resultado
+de la simulación informa en 'registros_truncados' qué logs quedaron como
+muestra (las vistas por operación sobre ellos son aproximadas) y, con
+presupuesto, qué logs quedan completos igual y por qué (p.ej. 'eventos':
+un registro por camión y vuelta, que necesitan los reportes por camión).
+
+Con volcado a disco (ver volcado.py) cada registro se escribe además en su
+sumidero al agregarse; en ese caso el log completo queda en el archivo.
+"""
+import random
+
+__all__ = ["RegistroAcotado", "crear_registro", "agregar", "n_total", "estado_registros"]
+
+
+def _valor(item, campo):
+    try:
+        return item.get(campo) if isinstance(item, dict) else item[campo]
+    except (IndexError, KeyError, TypeError):
+        return None
+
+
+def _nuevas_stats(campos):
+    return {"n": 0, **{c: [0.0, None, None, 0] for c in campos}}   # [suma, min, max, n]
+
+
+def _acumular(stats, item, campos):
+    stats["n"] += 1
+    for c in campos:
+        v = _valor(item, c)
+        if v is None:
+            continue
+        s = stats[c]
+        s[0] += v
+        s[1] = v if s[1] is None or v < s[1] else s[1]
+        s[2] = v if s[2] is None or v > s[2] else s[2]
+        s[3] += 1
+
+
+def _exportar(stats, campos):
+    out = {"n": stats["n"]}
+    for c in campos:
+        suma, mn, mx, n = stats[c]
+        out[c] = {"suma": suma, "min": mn, "max": mx, "n": n}
+    return out
+
+
+class RegistroAcotado(list):
+    """
+    Lista con presupuesto de registros; al excederlo, muestra reservoir + agregados exactos.
+    max_registros=None: sin presupuesto (sólo tiene sentido con 'sumidero').
+    """
+
+    def __init__(self, max_registros, campos=(), agrupar_por=(), nombre=None, semilla=0, sumidero=None):
+        super().__init__()
+        self.max_registros = None if max_registros is None else int(max_registros)
+        self.sumidero = sumidero
+        self.campos = tuple(campos)
+        self.agrupar_por = tuple(agrupar_por)
+        self.nombre = nombre
+        self.n = 0
+        self.truncado = False
+        self._rng = random.Random(semilla)
+        self._agg = None
+
+    def append(self, item):
+        self.n += 1
+        if self.sumidero is not None:
+            self.sumidero.escribir(item)
+        if self._agg is not None:
+            self._sumar(item)
+        if self.max_registros is None or len(self) < self.max_registros:
+            list.append(self, item)
+            return
+        if not self.truncado:
+            # primer desborde: los agregados parten de todo lo visto hasta acá
+            self.truncado = True
+            self._agg = {}
+            for previo in self:
+                self._sumar(previo)
+            self._sumar(item)
+        j = self._rng.randrange(self.n)
+        if j < self.max_registros:
+            self[j] = item
+
+    def _sumar(self, item):
+        for por in (None,) + self.agrupar_por:
+            clave = (por, None if por is None else _valor(item, por))
+            stats = self._agg.get(clave)
+            if stats is None:
+                stats = self._agg[clave] = _nuevas_stats(self.campos)
+            _acumular(stats, item, self.campos)
+
+    def agregados(self, por=None):
+        """{grupo: {"n", campo: {suma, min, max, n}}} exactos (sólo si está truncado)."""
+        return {k[1]: _exportar(s, self.campos) for k, s in self._agg.items() if k[0] == por}
+
+    def estado(self):
+        return {"nombre": self.nombre, "n_total": self.n, "n_muestra": len(self),
+                "max_registros": self.max_registros, "truncado": self.truncado,
+                "agregados": self.agregados().get(None) if self.truncado else None}
+
+
+def crear_registro(cfg, nombre, campos=(), agrupar_por=(), volcado=None, acotar=True):
+    """
+    Lista común o RegistroAcotado según cfg["max_registros_log"] y 'volcado'
+    (VolcadoRegistros del turno). Con volcado y sin presupuesto propio, el log
+    se acota a volcado.max_en_memoria; acotar=False lo deja completo en memoria.
+    """
+    limite = cfg.get("max_registros_log") if acotar else None
+    if isinstance(limite, dict):
+        limite = limite.get(nombre, limite.get("*"))
+    sumidero = volcado.sumidero(nombre) if volcado is not None else None
+    if sumidero is not None and acotar and not limite:
+        limite = volcado.max_en_memoria
+    if not limite and sumidero is None:
+        return []
+    return RegistroAcotado(limite or None, campos=campos, agrupar_por=agrupar_por, nombre=nombre,
+                           semilla=cfg.get("semilla_muestreo_log", 0), sumidero=sumidero)
+
+
+def n_total(log):
+    """Registros vistos (no sólo los guardados)."""
+    return log.n if isinstance(log, RegistroAcotado) else len(log or ())
+
+
+def agregar(log, campos, por=None):
+    """
+    Agregados de 'campos' en total (por=None -> clave None) o por la clave 'por':
+    {grupo: {"n", campo: {suma, min, max, n}}}. Exactos también para logs truncados
+    si 'campos' y 'por' fueron declarados al crearlos.
+    """
+    campos = tuple(campos)
+    if isinstance(log, RegistroAcotado) and log.truncado \
+            and set(campos) <= set(log.campos) and (por is None or por in log.agrupar_por):
+        return {g: {"n": s["n"], **{c: s[c] for c in campos}} for g, s in log.agregados(por).items()}
+    grupos = {}
+    for item in log or ():
+        g = None if por is None else _valor(item, por)
+        stats = grupos.get(g)
+        if stats is None:
+            stats = grupos[g] = _nuevas_stats(campos)
+        _acumular(stats, item, campos)
+    return {g: _exportar(s, campos) for g, s in grupos.items()}
+
+
+def estado_registros(centro, nombres, completos=None):
+    """
+    {nombre: estado} de los logs acotados del centro que quedaron truncados y de
+    los 'completos' ({nombre: motivo}): logs que se dejan enteros aunque haya presupuesto.
+    """
+    out = {}
+    for nombre in nombres:
+        log = getattr(centro, nombre, None)
+        if isinstance(log, RegistroAcotado) and log.truncado:
+            out[nombre] = log.estado()
+    for nombre, motivo in (completos or {}).items():
+        log = getattr(centro, nombre, None)
+        if log is not None:
+            out[nombre] = {"nombre": nombre, "n_total": n_total(log), "n_muestra": len(log),
+                           "max_registros": None, "truncado": False, "sin_acotar": motivo}
+    return out
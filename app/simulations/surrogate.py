@@ -0,0 +1,314 @@
+# app/simulations/surrogate.py
+"""
+Metamodelo (proceso gaussiano) para respuestas what-if instantáneas.
+
+Se entrena con resultados ya simulados (réplicas de noche y, si existen, de
+día) y predice los KPIs de sweep.KPIS_NOCHE / sweep.KPIS_DIA con media y
+desviación estándar. Si la consulta cae fuera del dominio entrenado o la
+incertidumbre es alta, se corre la simulación real y el resultado se agrega
+como nueva observación.
+
+El reentrenamiento (O(n³) por KPI, más el ajuste de hiperparámetros) no
+corre en la consulta: agregar() lo dispara en un hilo de fondo cuando hay
+observaciones nuevas y, al terminar, el modelo entrenado se reemplaza de una
+vez. en_dominio() y predecir() sólo usan el último modelo entrenado.
+"""
+import threading
+from contextlib import nullcontext
+
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+
+from .night.config import DEFAULT_CONFIG
+from .sweep import KPIS_NOCHE, KPIS_DIA, kpis_noche, kpis_dia
+
+ENTRADAS = (
+    "total_cajas_facturadas", "cajas_para_pick",
+    "cap_picker", "cap_gruero", "cap_chequeador", "cap_parrillero",
+    "cap_movilizador", "cap_patio",
+)
+
+# Desviación estándar máxima aceptada por KPI (en sus unidades) para
+# responder con el sustituto; por encima se corre la simulación real.
+TOLERANCIAS_DEFECTO = {
+    "overrun_total_min": 15.0, "fin_real_min": 15.0, "ice_mixto": 5.0,
+    "grua_utilizacion": 0.05,
+    "ocup_pickers": 5.0, "ocup_chequeadores": 5.0, "ocup_grueros": 5.0,
+    "ocup_parrilleros": 5.0, "ocup_movilizadores": 5.0,
+}
+
+def vector_entradas(entradas):
+    """dict -> vector en el orden de ENTRADAS (faltantes desde DEFAULT_CONFIG)."""
+    return np.array([float(entradas.get(k, DEFAULT_CONFIG.get(k, 0)) or 0.0) for k in ENTRADAS])
+
+# ---------------------------------------------------------------------------
+# Proceso gaussiano con kernel RBF-ARD + ruido (una salida)
+# ---------------------------------------------------------------------------
+
+class _ProcesoGaussiano:
+    def __init__(self, log_params=None):
+        self.log_params = log_params   # [log ℓ_1..ℓ_d, log σ_f, log σ_n]
+
+    @staticmethod
+    def _kernel(A, B, ell, sf2):
+        # |a-b|² = |a|² + |b|² - 2ab: sin el tensor n×m×d de las diferencias
+        A, B = A / ell, B / ell
+        d2 = (A * A).sum(axis=1)[:, None] + (B * B).sum(axis=1)[None, :] - 2.0 * A @ B.T
+        return sf2 * np.exp(-0.5 * np.maximum(d2, 0.0))
+
+    def _nlml(self, lp, X, y):
+        d = X.shape[1]
+        ell, sf2, sn2 = np.exp(lp[:d]), np.exp(2 * lp[d]), np.exp(2 * lp[d + 1]) + 1e-8
+        K = self._kernel(X, X, ell, sf2) + sn2 * np.eye(len(X))
+        try:
+            c = cho_factor(K, lower=True)
+        except np.linalg.LinAlgError:
+            return 1e10
+        a = cho_solve(c, y)
+        return 0.5 * y @ a + np.log(np.diag(c[0])).sum()
+
+    def ajustar(self, X, y, optimizar=True):
+        d = X.shape[1]
+        if self.log_params is None or len(self.log_params) != d + 2:
+            self.log_params = np.concatenate([np.zeros(d) + np.log(0.5), [0.0, np.log(0.1)]])
+        if optimizar and len(X) >= 3:
+            res = minimize(self._nlml, self.log_params, args=(X, y), method="L-BFGS-B",
+                           bounds=[(-4, 3)] * d + [(-3, 3), (-6, 1)])
+            if np.isfinite(res.fun):
+                self.log_params = res.x
+        lp = self.log_params
+        self._ell, self._sf2 = np.exp(lp[:d]), np.exp(2 * lp[d])
+        sn2 = np.exp(2 * lp[d + 1]) + 1e-8
+        K = self._kernel(X, X, self._ell, self._sf2) + sn2 * np.eye(len(X))
+        self._chol = cho_factor(K, lower=True)
+        self._alpha = cho_solve(self._chol, y)
+        self._X = X
+
+    def predecir(self, Xq):
+        Ks = self._kernel(Xq, self._X, self._ell, self._sf2)
+        media = Ks @ self._alpha
+        v = cho_solve(self._chol, Ks.T)
+        var = np.maximum(self._sf2 - np.einsum("ij,ji->i", Ks, v), 0.0)
+        return media, np.sqrt(var)
+
+def _normalizar(X, lo, hi):
+    rango = np.where(hi > lo, hi - lo, 1.0)
+    return (X - lo) / rango
+
+# ---------------------------------------------------------------------------
+# Modelo sustituto multi-KPI
+# ---------------------------------------------------------------------------
+
+class ModeloSustituto:
+    """
+    Un GP por KPI sobre entradas normalizadas a [0,1] (caja del dominio observado).
+
+    - tolerancias: {kpi: std máxima} que decide el fallback a simulación
+      (por defecto TOLERANCIAS_DEFECTO).
+    - reoptimizar_cada: cada cuántas observaciones nuevas se reajustan los
+      hiperparámetros; entre medio sólo se refactoriza con los vigentes.
+    - max_observaciones: tope de observaciones (se conservan las más recientes).
+    - entrenar_en_fondo: agregar() reentrena en un hilo de fondo; con False
+      hay que llamar a entrenar() (las consultas nunca entrenan).
+    """
+    def __init__(self, tolerancias=None, tolerancia_dominio=0.05, min_observaciones=8,
+                 reoptimizar_cada=25, max_observaciones=1500, entrenar_en_fondo=True):
+        self.tolerancias = dict(TOLERANCIAS_DEFECTO if tolerancias is None else tolerancias)
+        self.tolerancia_dominio = tolerancia_dominio
+        self.min_observaciones = min_observaciones
+        self.reoptimizar_cada = reoptimizar_cada
+        self.max_observaciones = max_observaciones
+        self.entrenar_en_fondo = entrenar_en_fondo
+
+        self._X, self._Y = [], []          # vectores de entrada / dicts de KPIs
+        self._n_agregadas = 0              # total histórico (las viejas se descartan)
+        # último modelo entrenado: {"gps", "escala", "lo", "hi", "n"}; se reemplaza entero
+        self._modelo = None
+        self._n_ultima_opt = 0
+        self._lock = threading.Lock()              # datos
+        self._entrenando = threading.Lock()        # un entrenamiento a la vez
+        self._hilo = None
+
+    # ---- Datos ----------------------------------------------------------------
+    @property
+    def n_observaciones(self):
+        return len(self._X)
+
+    @property
+    def n_entrenado(self):
+        """Observaciones agregadas (total histórico) que ya ve el modelo vigente."""
+        modelo = self._modelo
+        return modelo["n"] if modelo is not None else 0
+
+    def agregar(self, entradas, kpis):
+        with self._lock:
+            self._X.append(vector_entradas(entradas))
+            self._Y.append({k: float(v) for k, v in kpis.items() if v is not None and np.isfinite(v)})
+            if len(self._X) > self.max_observaciones:
+                del self._X[0], self._Y[0]
+            self._n_agregadas += 1
+        if self.entrenar_en_fondo:
+            self._programar_entrenamiento()
+
+    def _programar_entrenamiento(self):
+        """Lanza el hilo de entrenamiento si no hay uno corriendo (él mismo sigue si llegan más datos)."""
+        with self._lock:
+            if len(self._X) < self.min_observaciones or self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._entrenar_pendientes, name="simucd-sustituto", daemon=True)
+            self._hilo.start()
+
+    def _entrenar_pendientes(self):
+        try:
+            while True:
+                with self._lock:
+                    if self.n_entrenado >= self._n_agregadas:
+                        return
+                if not self.entrenar():
+                    return
+        finally:
+            with self._lock:
+                self._hilo = None
+
+    def esperar_entrenamiento(self, timeout=None):
+        """Espera a que termine el entrenamiento de fondo en curso (si hay); True si terminó."""
+        hilo = self._hilo
+        if hilo is not None:
+            hilo.join(timeout)
+            return not hilo.is_alive()
+        return True
+
+    def agregar_resultado(self, entradas, resultado_noche, resultado_dia=None):
+        kpis = kpis_noche(resultado_noche)
+        if resultado_dia is not None:
+            kpis.update(kpis_dia(resultado_dia))
+        self.agregar(entradas, kpis)
+
+    def agregar_cubo(self, cubo, total_cajas_facturadas=20000, cajas_para_pick=19000):
+        """Incorpora un cubo de sweep.ejecutar_barrido (cada réplica es una observación)."""
+        from .sweep import _resolver_punto
+        forma = cubo["forma"][:-1]
+        for idx, punto in enumerate(cubo["puntos"]):
+            total, pick, noche, _ = _resolver_punto(punto, total_cajas_facturadas, cajas_para_pick, None, None)
+            entradas = dict(noche, total_cajas_facturadas=total, cajas_para_pick=pick)
+            pos = np.unravel_index(idx, forma)
+            for rep in range(cubo["forma"][-1]):
+                self.agregar(entradas, {k: arr[pos + (rep,)] for k, arr in cubo["kpis"].items()})
+
+    # ---- Entrenamiento ----------------------------------------------------------
+    def entrenar(self, forzar_optimizacion=False):
+        """Entrena con las observaciones actuales y reemplaza el modelo vigente; False si son pocas."""
+        with self._entrenando:
+            with self._lock:
+                n = len(self._X)
+                if n < self.min_observaciones:
+                    return False
+                X = np.vstack(self._X)
+                Y = list(self._Y)
+                n_agregadas = self._n_agregadas
+            lo, hi = X.min(axis=0), X.max(axis=0)
+            Xn = _normalizar(X, lo, hi)
+
+            previos = self._modelo["gps"] if self._modelo is not None else {}
+            optimizar = forzar_optimizacion or not previos or (n_agregadas - self._n_ultima_opt) >= self.reoptimizar_cada
+            gps, escala = {}, {}
+            for kpi in KPIS_NOCHE + KPIS_DIA:
+                filas = [i for i, y in enumerate(Y) if kpi in y]
+                if len(filas) < self.min_observaciones:
+                    continue
+                y = np.array([Y[i][kpi] for i in filas])
+                mu, sd = float(y.mean()), float(y.std())
+                if sd <= 1e-12:
+                    # KPI constante en lo observado (p.ej. overrun 0): sin GP
+                    gps[kpi] = None
+                    escala[kpi] = (mu, 0.0)
+                    continue
+                # GP nuevo (el vigente sigue atendiendo consultas), arrancando de sus hiperparámetros
+                previo = previos.get(kpi)
+                gp = _ProcesoGaussiano(previo.log_params if previo is not None else None)
+                gp.ajustar(Xn[filas], (y - mu) / sd, optimizar=optimizar)
+                gps[kpi] = gp
+                escala[kpi] = (mu, sd)
+            if optimizar:
+                self._n_ultima_opt = n_agregadas
+            self._modelo = {"gps": gps, "escala": escala, "lo": lo, "hi": hi, "n": n_agregadas}
+            return True
+
+    def en_dominio(self, entradas):
+        modelo = self._modelo
+        if modelo is None:
+            return False
+        lo, hi = modelo["lo"], modelo["hi"]
+        x = vector_entradas(entradas)
+        xn = _normalizar(x[None, :], lo, hi)[0]
+        # dimensiones sin variación en el entrenamiento: deben coincidir exactamente
+        fijas = hi <= lo
+        if np.any(fijas & (np.abs(x - lo) > 1e-9)):
+            return False
+        tol = self.tolerancia_dominio
+        return bool(np.all((xn >= -tol) & (xn <= 1 + tol)))
+
+    # ---- Consulta ---------------------------------------------------------------
+    def predecir(self, entradas):
+        """{kpi: {"media", "std", "std_relativa"}} con el modelo vigente (sin fallback ni entrenamiento)."""
+        modelo = self._modelo
+        if modelo is None or not modelo["gps"]:
+            return {}
+        xq = _normalizar(vector_entradas(entradas)[None, :], modelo["lo"], modelo["hi"])
+        out = {}
+        for kpi, gp in modelo["gps"].items():
+            mu, sd = modelo["escala"][kpi]
+            if gp is None:
+                out[kpi] = {"media": mu, "std": 0.0, "std_relativa": 0.0}
+                continue
+            m, s = gp.predecir(xq)
+            out[kpi] = {"media": float(m[0] * sd + mu), "std": float(s[0] * sd), "std_relativa": float(s[0])}
+        return out
+
+    def _prediccion(self, entradas):
+        """(predicción, motivo del fallback o None si el sustituto alcanza)."""
+        pred = self.predecir(entradas) if self.en_dominio(entradas) else {}
+        if not pred:
+            return pred, "fuera_de_dominio"
+        if any(pred[k]["std"] > tol for k, tol in self.tolerancias.items() if k in pred):
+            return pred, "incertidumbre_alta"
+        return pred, None
+
+    def responder(self, entradas):
+        """Respuesta del sustituto, o None si la consulta necesita simulación (ver consultar)."""
+        pred, motivo = self._prediccion(entradas)
+        if motivo is not None:
+            return None
+        return {"fuente": "sustituto", "kpis": pred, "n_observaciones": self.n_observaciones}
+
+    def consultar(self, entradas, seed=None, cfg=None, trabajador=None):
+        """
+        Predice con el sustituto o, si la consulta está fuera de dominio o es
+        demasiado incierta, corre simular_turno_prioridad_rng y aprende de ella.
+        trabajador: context manager dentro del cual se simula (p.ej. el turno
+        del planificador); sólo se entra si hay que simular.
+        """
+        pred, motivo = self._prediccion(entradas)
+        if motivo is None:
+            return {"fuente": "sustituto", "kpis": pred, "n_observaciones": self.n_observaciones}
+
+        from .night.simulation import simular_turno_prioridad_rng
+        config = dict(cfg or DEFAULT_CONFIG)
+        config.update({k: entradas[k] for k in ENTRADAS if k in entradas and k.startswith("cap_")})
+        with trabajador if trabajador is not None else nullcontext():
+            resultado = simular_turno_prioridad_rng(
+                total_cajas_facturadas=int(entradas["total_cajas_facturadas"]),
+                cajas_para_pick=int(entradas["cajas_para_pick"]),
+                cfg=config, seed=seed,
+            )
+        self.agregar_resultado(dict(config, **entradas), resultado)
+        kpis = {k: {"media": v, "std": 0.0, "std_relativa": 0.0} for k, v in kpis_noche(resultado).items()}
+        return {
+            "fuente": "simulacion",
+            "motivo": motivo,
+            "kpis": kpis,
+            "n_observaciones": self.n_observaciones,
+        }
+
+__all__ = ["ModeloSustituto", "ENTRADAS", "TOLERANCIAS_DEFECTO", "vector_entradas"]
@@ -0,0 +1,391 @@
+# app/simulations/sweep.py
+"""
+Barrido paramétrico sobre las simulaciones (noche o ciclo completo 24h).
+
+Cada eje es una clave de DEFAULT_CONFIG (noche), una clave de DAY_CONFIG con
+prefijo 'dia.' (p.ej. 'dia.cap_patio') o un eje de volumen:
+'total_cajas_facturadas', 'cajas_para_pick' o 'fraccion_pick'. Las
+dotaciones del día por turno ('dia.cap_gruero', ..., ver CAPS_TURNOS_DIA)
+fijan esa dotación en todos los turnos de shifts_day.
+
+Diseños:
+  - 'grid': producto cartesiano de los valores de cada eje -> cubo N-dimensional
+            con forma (len(eje_1), ..., len(eje_n), replicas).
+  - 'lhs' : hipercubo latino de n_puntos sobre rangos (lo, hi) -> forma (n_puntos, replicas).
+
+Los puntos se evalúan en un pool de procesos y cada réplica terminada se
+escribe en un checkpoint JSONL, de modo que un barrido interrumpido se
+reanuda donde quedó.
+"""
+import os
+import json
+import hashlib
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .night.config import DEFAULT_CONFIG
+from .day.config import DAY_CONFIG
+from .night.queueing import estimar_cargas_noche
+
+EJES_VOLUMEN = ("total_cajas_facturadas", "cajas_para_pick", "fraccion_pick")
+PREFIJO_DIA = "dia."
+
+# Claves que CentroDia lee con valor por defecto aunque no estén en DAY_CONFIG
+CLAVES_DIA_OPCIONALES = {
+    "cap_gruero": 4, "cap_chequeador": 2, "cap_parrillero": 1, "cap_movilizador": 1,
+    "cap_patio": 10, "cap_porteria": 1, "patio_eq_cap": 4,
+}
+# Capacidades del día que CentroDia._gestor_turnos pisa con shifts_day[*].caps:
+# como eje se aplican a la dotación de cada turno (la misma en todos).
+CAPS_TURNOS_DIA = {
+    "cap_gruero": "grua", "cap_chequeador": "chequeador", "cap_parrillero": "parrillero",
+    "cap_movilizador": "movilizador", "cap_porteria": "porteria",
+}
+
+KPIS_NOCHE = (
+    "fin_real_min", "overrun_total_min", "vueltas", "ice_mixto",
+    "grua_utilizacion", "grua_espera_media_min",
+    "ocup_pickers", "ocup_chequeadores", "ocup_grueros",
+    "ocup_parrilleros", "ocup_movilizadores",
+)
+KPIS_DIA = (
+    "dia_fin_real_min", "dia_camiones_cargados", "dia_t1_generados",
+    "dia_ocup_grueros", "dia_ocup_chequeadores", "dia_ocup_parrilleros",
+    "dia_ocup_movilizadores", "dia_ocup_porteros",
+)
+
+# ---------------------------------------------------------------------------
+# Extracción de KPIs (escalares) desde los resultados de los motores
+# ---------------------------------------------------------------------------
+
+def _ocup(resultado, recurso):
+    return float(((resultado.get("ocupacion_recursos") or {}).get(recurso) or {}).get("porcentaje_ocupacion", 0.0) or 0.0)
+
+def kpis_noche(resultado):
+    eventos = resultado.get("centro_eventos") or []
+    ice = (resultado.get("ice_mixto") or {}).get("valor")
+    grua = (resultado.get("grua") or {}).get("overall", {})
+    return {
+        "fin_real_min": float(max((e["fin_min"] for e in eventos), default=0.0)),
+        "overrun_total_min": float(resultado.get("overrun_total_min", 0.0)),
+        "vueltas": float(len(resultado.get("planificacion_detalle") or [])),
+        "ice_mixto": float(ice) if ice is not None else float("nan"),
+        "grua_utilizacion": float(grua.get("utilizacion_prom", 0.0)),
+        "grua_espera_media_min": float(grua.get("mean_wait_min", 0.0)),
+        "ocup_pickers": _ocup(resultado, "pickers"),
+        "ocup_chequeadores": _ocup(resultado, "chequeadores"),
+        "ocup_grueros": _ocup(resultado, "grueros"),
+        "ocup_parrilleros": _ocup(resultado, "parrilleros"),
+        "ocup_movilizadores": _ocup(resultado, "movilizadores"),
+    }
+
+def kpis_dia(resultado):
+    eventos = resultado.get("centro_eventos") or []
+    return {
+        "dia_fin_real_min": float(max((e.get("fin_min", 0.0) for e in eventos), default=0.0)),
+        "dia_camiones_cargados": float(resultado.get("num_vueltas", 0)),
+        "dia_t1_generados": float(resultado.get("t1_generados", 0)),
+        "dia_ocup_grueros": _ocup(resultado, "grueros"),
+        "dia_ocup_chequeadores": _ocup(resultado, "chequeadores"),
+        "dia_ocup_parrilleros": _ocup(resultado, "parrilleros"),
+        "dia_ocup_movilizadores": _ocup(resultado, "movilizadores"),
+        "dia_ocup_porteros": _ocup(resultado, "porteros"),
+    }
+
+# ---------------------------------------------------------------------------
+# Diseño del barrido
+# ---------------------------------------------------------------------------
+
+def _validar_eje(nombre):
+    if nombre in EJES_VOLUMEN:
+        return
+    if nombre.startswith(PREFIJO_DIA):
+        clave = nombre[len(PREFIJO_DIA):]
+        if clave not in DAY_CONFIG and clave not in CLAVES_DIA_OPCIONALES:
+            raise ValueError(f"Clave desconocida en DAY_CONFIG: {nombre!r}")
+        return
+    if nombre not in DEFAULT_CONFIG:
+        raise ValueError(f"Clave desconocida en DEFAULT_CONFIG: {nombre!r}")
+
+def _valor_base(nombre):
+    if nombre.startswith(PREFIJO_DIA):
+        clave = nombre[len(PREFIJO_DIA):]
+        return DAY_CONFIG.get(clave, CLAVES_DIA_OPCIONALES.get(clave))
+    return DEFAULT_CONFIG.get(nombre)
+
+def _muestra_lhs(nombre, rango, u):
+    """
+    Traduce u∈[0,1) a un valor del eje. Si la clave base es un rango (a, b),
+    se desplaza el rango completo conservando su ancho y el valor muestreado
+    es su centro; los rangos enteros se redondean.
+    """
+    lo, hi = float(rango[0]), float(rango[1])
+    x = lo + u * (hi - lo)
+    base = _valor_base(nombre)
+    if isinstance(base, (tuple, list)) and len(base) == 2:
+        ancho = float(base[1]) - float(base[0])
+        a, b = x - ancho / 2.0, x + ancho / 2.0
+        if all(isinstance(v, int) for v in base):
+            a = max(0, int(round(a))); b = max(a, int(round(b)))
+        return (a, b)
+    if isinstance(base, int) or nombre in ("total_cajas_facturadas", "cajas_para_pick"):
+        return int(round(x))
+    return x
+
+def hipercubo_latino(n_puntos, n_dims, rng):
+    """Matriz (n_puntos, n_dims) en [0,1): un estrato por punto y dimensión."""
+    u = (rng.random((n_puntos, n_dims)) + np.arange(n_puntos)[:, None]) / n_puntos
+    for j in range(n_dims):
+        u[:, j] = u[rng.permutation(n_puntos), j]
+    return u
+
+def disenar_barrido(ejes, diseno="grid", n_puntos=None, semilla=0):
+    """
+    Devuelve (nombres_ejes, forma, puntos). 'puntos' es una lista de dicts
+    {eje: valor} en orden C (row-major) respecto de 'forma'.
+    """
+    nombres = list(ejes.keys())
+    for n in nombres:
+        _validar_eje(n)
+
+    if diseno == "grid":
+        valores = [list(ejes[n]) for n in nombres]
+        forma = tuple(len(v) for v in valores)
+        puntos = [dict(zip(nombres, combo)) for combo in itertools.product(*valores)]
+    elif diseno == "lhs":
+        if not n_puntos or n_puntos <= 0:
+            raise ValueError("El diseño 'lhs' requiere n_puntos > 0")
+        u = hipercubo_latino(int(n_puntos), len(nombres), np.random.default_rng(semilla))
+        forma = (int(n_puntos),)
+        puntos = [
+            {n: _muestra_lhs(n, ejes[n], u[i, j]) for j, n in enumerate(nombres)}
+            for i in range(int(n_puntos))
+        ]
+    else:
+        raise ValueError(f"Diseño desconocido: {diseno!r} (use 'grid' o 'lhs')")
+    return nombres, forma, puntos
+
+# ---------------------------------------------------------------------------
+# Evaluación de un punto (se ejecuta en el pool de procesos)
+# ---------------------------------------------------------------------------
+
+def _resolver_punto(punto, total_cajas_facturadas, cajas_para_pick, cfg_noche, cfg_dia):
+    total = int(punto.get("total_cajas_facturadas", total_cajas_facturadas))
+    if "cajas_para_pick" in punto:
+        pick = int(punto["cajas_para_pick"])
+    else:
+        frac = float(punto.get("fraccion_pick", cajas_para_pick / max(1, total_cajas_facturadas)))
+        pick = int(round(total * frac))
+    pick = max(0, min(pick, total))
+
+    noche = dict(DEFAULT_CONFIG)
+    noche.update(cfg_noche or {})
+    dia = dict(cfg_dia or {})
+    caps_turnos = {}
+    for k, v in punto.items():
+        if k in EJES_VOLUMEN:
+            continue
+        if k.startswith(PREFIJO_DIA):
+            clave = k[len(PREFIJO_DIA):]
+            dia[clave] = v
+            if clave in CAPS_TURNOS_DIA:
+                caps_turnos[CAPS_TURNOS_DIA[clave]] = v
+        else:
+            noche[k] = tuple(v) if isinstance(v, list) else v
+    if caps_turnos:
+        # los cambios de turno reaplican shifts_day[*].caps: la dotación del eje va ahí
+        turnos = dia.get("shifts_day", DAY_CONFIG.get("shifts_day")) or []
+        dia["shifts_day"] = [dict(t, caps=dict(t.get("caps") or {}, **caps_turnos)) for t in turnos]
+    return total, pick, noche, dia
+
+def _evaluar_punto(tarea):
+    idx, rep, seed, modo, total, pick, cfg_noche, cfg_dia, columnas_dir = tarea
+    if columnas_dir:
+        from .columnar import guardar_columnas
+        destino = os.path.join(columnas_dir, f"p{idx:05d}_r{rep:03d}")
+    if modo == "noche":
+        from .night.simulation import simular_turno_prioridad_rng
+        res = simular_turno_prioridad_rng(total, pick, cfg_noche, seed=seed)
+        kpis = kpis_noche(res)
+        if columnas_dir:
+            guardar_columnas(res, destino, "noche")
+    else:
+        from .complete_cycle import simular_ciclo_completo_24h
+        res = simular_ciclo_completo_24h(total, pick, seed=seed, cfg_noche=cfg_noche, cfg_dia=cfg_dia)
+        kpis = kpis_noche(res["turno_noche"])
+        kpis.update(kpis_dia(res["turno_dia"]))
+        if columnas_dir:
+            guardar_columnas(res["turno_noche"], os.path.join(destino, "noche"), "noche")
+            guardar_columnas(res["turno_dia"], os.path.join(destino, "dia"), "dia")
+    return idx, rep, kpis
+
+# ---------------------------------------------------------------------------
+# Checkpoint
+# ---------------------------------------------------------------------------
+
+def _huella_barrido(spec):
+    txt = json.dumps(spec, sort_keys=True, default=str)
+    return hashlib.sha1(txt.encode("utf-8")).hexdigest()
+
+def _abrir_checkpoint(directorio, spec):
+    """Crea/valida el manifiesto y devuelve {(idx, rep): kpis} ya calculados."""
+    os.makedirs(directorio, exist_ok=True)
+    ruta_manifest = os.path.join(directorio, "manifest.json")
+    ruta_puntos = os.path.join(directorio, "puntos.jsonl")
+    huella = _huella_barrido(spec)
+
+    if os.path.exists(ruta_manifest):
+        with open(ruta_manifest, "r", encoding="utf-8") as f:
+            previo = json.load(f)
+        if previo.get("huella") != huella:
+            raise ValueError(f"El checkpoint en {directorio} corresponde a otro barrido")
+    else:
+        with open(ruta_manifest, "w", encoding="utf-8") as f:
+            json.dump({"huella": huella, "spec": spec}, f, ensure_ascii=False, default=str, indent=2)
+
+    hechos = {}
+    if os.path.exists(ruta_puntos):
+        with open(ruta_puntos, "r", encoding="utf-8") as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    rec = json.loads(linea)
+                except ValueError:
+                    continue  # última línea truncada por una interrupción
+                hechos[(rec["idx"], rec["rep"])] = rec["kpis"]
+    return hechos, ruta_puntos
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+def ejecutar_barrido(ejes, modo="noche", diseno="grid", n_puntos=None, replicas=1,
+                     semilla=0, total_cajas_facturadas=20000, cajas_para_pick=19000,
+                     cfg_noche=None, cfg_dia=None, max_workers=None, checkpoint_dir=None,
+                     podar_overrun_min=None, columnas_dir=None):
+    """
+    Ejecuta el barrido y devuelve el cubo de KPIs:
+
+        {
+          "ejes": [...], "valores": {eje: [...]}, "forma": (..., replicas),
+          "diseno": "grid"|"lhs", "kpis": {kpi: np.ndarray(float32)},
+          "semillas": np.ndarray(int64), "puntos": [...]
+        }
+
+    Las réplicas usan semilla + rep en todos los puntos (números aleatorios
+    comunes), lo que reduce el ruido al comparar puntos vecinos.
+    max_workers=0 evalúa en el proceso actual (útil para depurar).
+
+    podar_overrun_min: si se indica, los puntos cuyo overrun mínimo analítico
+    (night.queueing) supera ese valor no se simulan; quedan en NaN y
+    marcados en cubo["podados"].
+
+    columnas_dir: si se indica, cada réplica guarda además sus logs en formato
+    columnar (columnar.py) en columnas_dir/p<idx>_r<rep>/ (con noche/ y dia/
+    en modo 'ciclo'), para analizarlas después con columnar.abrir_corridas.
+    """
+    if modo not in ("noche", "ciclo"):
+        raise ValueError(f"Modo desconocido: {modo!r} (use 'noche' o 'ciclo')")
+    replicas = max(1, int(replicas))
+    nombres, forma, puntos = disenar_barrido(ejes, diseno=diseno, n_puntos=n_puntos, semilla=semilla)
+    nombres_kpi = KPIS_NOCHE + (KPIS_DIA if modo == "ciclo" else ())
+
+    tareas = []
+    podados = np.zeros(forma, dtype=bool)
+    for idx, punto in enumerate(puntos):
+        total, pick, noche, dia = _resolver_punto(punto, total_cajas_facturadas, cajas_para_pick, cfg_noche, cfg_dia)
+        if podar_overrun_min is not None:
+            est = estimar_cargas_noche(total, pick, noche, seed=int(semilla))
+            overrun_min = est["overrun_minimo_min"]
+            if overrun_min is None or overrun_min > podar_overrun_min:
+                podados[np.unravel_index(idx, forma)] = True
+                continue
+        for rep in range(replicas):
+            tareas.append((idx, rep, int(semilla) + rep, modo, total, pick, noche, dia, columnas_dir))
+
+    hechos, ruta_puntos = {}, None
+    if checkpoint_dir:
+        spec = {
+            "ejes": {k: list(v) for k, v in ejes.items()}, "modo": modo, "diseno": diseno,
+            "n_puntos": n_puntos, "replicas": replicas, "semilla": semilla,
+            "total_cajas_facturadas": total_cajas_facturadas, "cajas_para_pick": cajas_para_pick,
+            "cfg_noche": cfg_noche or {}, "cfg_dia": cfg_dia or {},
+            "podar_overrun_min": podar_overrun_min,
+        }
+        hechos, ruta_puntos = _abrir_checkpoint(checkpoint_dir, spec)
+    pendientes = [t for t in tareas if (t[0], t[1]) not in hechos]
+
+    def _guardar(idx, rep, kpis, f):
+        hechos[(idx, rep)] = kpis
+        if f is not None:
+            f.write(json.dumps({"idx": idx, "rep": rep, "kpis": kpis}) + "\n")
+            f.flush()
+
+    f = open(ruta_puntos, "a", encoding="utf-8") if ruta_puntos else None
+    try:
+        if max_workers == 0:
+            for t in pendientes:
+                _guardar(*_evaluar_punto(t), f)
+        elif pendientes:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futuros = [pool.submit(_evaluar_punto, t) for t in pendientes]
+                for fut in as_completed(futuros):
+                    _guardar(*fut.result(), f)
+    finally:
+        if f is not None:
+            f.close()
+
+    forma_cubo = tuple(forma) + (replicas,)
+    cubo = {k: np.full(forma_cubo, np.nan, dtype=np.float32) for k in nombres_kpi}
+    for (idx, rep), kpis in hechos.items():
+        pos = np.unravel_index(idx, forma) + (rep,)
+        for k in nombres_kpi:
+            v = kpis.get(k)
+            if v is not None:
+                cubo[k][pos] = v
+
+    if diseno == "grid":
+        valores = {n: list(ejes[n]) for n in nombres}
+    else:
+        valores = {n: [p[n] for p in puntos] for n in nombres}
+
+    return {
+        "ejes": nombres,
+        "valores": valores,
+        "forma": forma_cubo,
+        "diseno": diseno,
+        "modo": modo,
+        "kpis": cubo,
+        "podados": podados,
+        "semillas": np.arange(replicas, dtype=np.int64) + int(semilla),
+        "puntos": puntos,
+    }
+
+def guardar_cubo(cubo, ruta):
+    """Persiste el cubo en un .npz comprimido (arreglos + metadatos en JSON)."""
+    meta = {k: cubo[k] for k in ("ejes", "valores", "forma", "diseno", "modo", "puntos")}
+    np.savez_compressed(
+        ruta,
+        semillas=cubo["semillas"],
+        podados=cubo.get("podados", np.zeros(cubo["forma"][:-1], dtype=bool)),
+        _meta=np.frombuffer(json.dumps(meta, default=str).encode("utf-8"), dtype=np.uint8),
+        **{f"kpi__{k}": v for k, v in cubo["kpis"].items()},
+    )
+
+def cargar_cubo(ruta):
+    with np.load(ruta) as data:
+        meta = json.loads(bytes(data["_meta"]).decode("utf-8"))
+        meta["forma"] = tuple(meta["forma"])
+        meta["semillas"] = data["semillas"]
+        meta["podados"] = data["podados"]
+        meta["kpis"] = {k[len("kpi__"):]: data[k] for k in data.files if k.startswith("kpi__")}
+    return meta
+
+__all__ = [
+    "ejecutar_barrido", "disenar_barrido", "hipercubo_latino",
+    "kpis_noche", "kpis_dia", "guardar_cubo", "cargar_cubo",
+]
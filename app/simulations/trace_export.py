@@ -0,0 +1,185 @@
+# app/simulations/trace_export.py
+"""
+Exportación de operaciones simuladas a Chrome trace-event JSON (Perfetto,
+chrome://tracing).
+
+- Proceso 1: tiempo simulado. Una pista por unidad de recurso (grueros #1,
+  grueros #2, ...) y un slice por operación. SimPy no dice qué unidad atendió
+  cada request, así que las unidades se reconstruyen empaquetando intervalos
+  (la cantidad de pistas nunca supera la ocupación simultánea máxima).
+- Proceso 2 (opcional): tiempo de pared del motor (planificación, env.run,
+  métricas y reportes) a partir de los spans de instrumentation.seccion().
+
+Los eventos se escriben a disco a medida que se generan (con .gz si la ruta
+termina en .gz), de modo que trazas de varios días no se arman en memoria.
+1 minuto simulado = 1 minuto en el visor; los tiempos son absolutos desde
+las 00:00 del día 0 (se suma shift_start_min y 1440·dia).
+"""
+import gzip
+import heapq
+import json
+import time
+
+import numpy as np
+
+PID_SIM = 1
+PID_MOTOR = 2
+US_POR_MIN = 60_000_000
+
+# recurso -> [(atributo del centro, claves inicio/fin, nombre del slice)]
+FUENTES_OPERACIONES = {
+    "pickers": [("tiempos_prep_mixto", ("start", "end"), lambda o: "prep_mixto"),
+                ("pick_ops", ("start", "end"), lambda o: "pick")],
+    "grueros": [("grua_ops", ("start", "end"), lambda o: o.get("label", "grua"))],
+    "chequeadores": [("tiempos_chequeo_detallados", ("tiempo_inicio", "tiempo_fin"), lambda o: "chequeo_pallet"),
+                     ("cheq_pallet_ops", ("start", "end"), lambda o: "chequeo_pallet"),
+                     ("cheq_ops", ("start", "end"), lambda o: "chequeo_T1")],
+    "parrilleros": [("parr_ops", ("start", "end"), lambda o: "ajuste_capacidad")],
+    "movilizadores": [("movi_ops", ("start", "end"), lambda o: "mover_camion")],
+    "porteros": [("port_ops", ("start", "end"), lambda o: f"porteria_{o.get('tipo', '')}".rstrip("_"))],
+}
+
+_ARGS = ("camion", "vuelta", "label", "pallet_id", "wait", "tiempo_espera_min", "tipo")
+
+
+def asignar_carriles(inicios, fines):
+    """
+    Empaqueta intervalos en carriles (unidades de recurso): cada intervalo va al
+    carril libre de menor índice. Devuelve (orden por inicio, carril por intervalo).
+    """
+    inicios = np.asarray(inicios, dtype=float)
+    fines = np.asarray(fines, dtype=float)
+    orden = np.lexsort((fines, inicios))
+    carriles = np.empty(len(orden), dtype=np.int32)
+    ocupados, libres, n = [], [], 0
+    for i in orden:
+        s = inicios[i]
+        while ocupados and ocupados[0][0] <= s + 1e-9:
+            heapq.heappush(libres, heapq.heappop(ocupados)[1])
+        if libres:
+            c = heapq.heappop(libres)
+        else:
+            c, n = n, n + 1
+        carriles[i] = c
+        heapq.heappush(ocupados, (fines[i], c))
+    return orden, carriles
+
+
+class EscritorTraza:
+    """Escritor incremental de trace-event JSON ({"traceEvents": [...]})."""
+
+    def __init__(self, ruta, incluir_motor=False):
+        self.ruta = ruta
+        self.incluir_motor = incluir_motor
+        self._f = (gzip.open(ruta, "wt", encoding="utf-8") if str(ruta).endswith(".gz")
+                   else open(ruta, "w", encoding="utf-8"))
+        self._f.write('{"displayTimeUnit": "ms", "traceEvents": [\n')
+        self._primero = True
+        self._tids = {}           # (pid, nombre de pista) -> tid
+        self._t0_pared = time.perf_counter()
+        self.n_eventos = 0
+        self._meta(PID_SIM, 0, "process_name", {"name": "Simulación (tiempo simulado)"})
+        if incluir_motor:
+            self._meta(PID_MOTOR, 0, "process_name", {"name": "Motor (tiempo de pared)"})
+
+    # ---- Bajo nivel -------------------------------------------------------------
+    def _escribir(self, evento):
+        if not self._primero:
+            self._f.write(",\n")
+        self._f.write(json.dumps(evento, ensure_ascii=False, separators=(",", ":")))
+        self._primero = False
+        self.n_eventos += 1
+
+    def _meta(self, pid, tid, nombre, args):
+        self._escribir({"ph": "M", "pid": pid, "tid": tid, "name": nombre, "args": args})
+
+    def pista(self, pid, nombre, orden=None):
+        clave = (pid, nombre)
+        tid = self._tids.get(clave)
+        if tid is None:
+            tid = self._tids[clave] = len(self._tids) + 1
+            self._meta(pid, tid, "thread_name", {"name": nombre})
+            self._meta(pid, tid, "thread_sort_index", {"sort_index": tid if orden is None else orden})
+        return tid
+
+    def slice(self, pid, tid, nombre, ts_us, dur_us, args=None, cat="op"):
+        ev = {"ph": "X", "pid": pid, "tid": tid, "name": nombre, "cat": cat,
+              "ts": round(ts_us, 3), "dur": round(max(dur_us, 0.0), 3)}
+        if args:
+            ev["args"] = args
+        self._escribir(ev)
+
+    # ---- Alto nivel -------------------------------------------------------------
+    def agregar_recurso(self, recurso, ops, offset_min=0.0, turno=""):
+        """ops: [(inicio_min, fin_min, nombre, args)] de un recurso; una pista por unidad."""
+        if not ops:
+            return 0
+        ini = [o[0] for o in ops]
+        fin = [o[1] for o in ops]
+        orden, carriles = asignar_carriles(ini, fin)
+        tids = {}
+        base = (list(FUENTES_OPERACIONES).index(recurso) + 1) * 1000 if recurso in FUENTES_OPERACIONES else 9000
+        for i in orden:
+            c = int(carriles[i])
+            tid = tids.get(c)
+            if tid is None:
+                nombre = f"{recurso} #{c + 1}" + (f" ({turno})" if turno else "")
+                tid = tids[c] = self.pista(PID_SIM, nombre, orden=base + c)
+            s, e, nombre_op, args = ops[i]
+            self.slice(PID_SIM, tid, nombre_op, (offset_min + s) * US_POR_MIN, (e - s) * US_POR_MIN, args, cat=recurso)
+        return len(tids)
+
+    def agregar_centro(self, centro, offset_min=0.0, turno=""):
+        """Vuelca las operaciones de un Centro (noche) o CentroDia; devuelve pistas por recurso."""
+        pistas = {}
+        for recurso, fuentes in FUENTES_OPERACIONES.items():
+            ops = []
+            for attr, (k_ini, k_fin), nombre in fuentes:
+                for o in getattr(centro, attr, None) or []:
+                    s, e = o.get(k_ini), o.get(k_fin)
+                    if s is None or e is None or e <= s:
+                        continue
+                    args = {k: o[k] for k in _ARGS if k in o}
+                    ops.append((float(s), float(e), nombre(o), args))
+            if ops:
+                pistas[recurso] = self.agregar_recurso(recurso, ops, offset_min, turno)
+        return pistas
+
+    def agregar_spans_motor(self, spans, turno=""):
+        """spans: [(nombre, t_ini, t_fin)] en perf_counter (EntornoSim.spans_motor)."""
+        if not self.incluir_motor or not spans:
+            return
+        tid = self.pista(PID_MOTOR, f"motor {turno}".strip())
+        for nombre, t0, t1 in spans:
+            self.slice(PID_MOTOR, tid, nombre, (t0 - self._t0_pared) * 1e6, (t1 - t0) * 1e6, cat="motor")
+
+    def cerrar(self):
+        if self._f is not None:
+            self._f.write("\n]}\n")
+            self._f.close()
+            self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+        return False
+
+
+def escribir_traza_turno(traza, centro, env, offset_min=0.0, turno="", incluir_motor=False):
+    """
+    Exporta un turno. 'traza' puede ser una ruta (se crea y cierra el archivo)
+    o un EscritorTraza abierto (p.ej. compartido por noche y día del ciclo 24h).
+    """
+    if isinstance(traza, EscritorTraza):
+        traza.agregar_centro(centro, offset_min, turno)
+        traza.agregar_spans_motor(getattr(env, "spans_motor", None), turno)
+        return traza.ruta
+    with EscritorTraza(traza, incluir_motor=incluir_motor) as w:
+        w.agregar_centro(centro, offset_min, turno)
+        w.agregar_spans_motor(getattr(env, "spans_motor", None), turno)
+    return traza
+
+
+__all__ = ["EscritorTraza", "asignar_carriles", "escribir_traza_turno", "FUENTES_OPERACIONES"]
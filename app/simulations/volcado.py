@@ -0,0 +1,293 @@
+# app/simulations/volcado.py
+"""
+Volcado incremental de los logs de operaciones a disco.
+
+Con cfg["volcado_registros"] = {"directorio": ..., "formato": "jsonl" | "csv" | "bin",
+"comprimir": bool, ...} cada registro que el motor agrega a un log (grúa, chequeo,
+picking, patio, línea de tiempo y eventos de camión) se escribe también en
+<directorio>/<turno>_<log>.<formato>[.gz]:
+
+- los registros se juntan en un buffer y se escriben en bloque (una escritura
+  cada 'buffer_registros' registros), con gzip opcional;
+- en memoria cada log acotable queda como RegistroAcotado con a lo sumo
+  'max_en_memoria' registros (muestra + agregados exactos, ver registros.py),
+  así que la memoria no crece con el largo de la corrida. 'eventos' se
+  escribe pero no se acota (lo necesitan completo los reportes y el día);
+- el motor cierra los archivos al terminar (también si la corrida falla) y
+  el resultado trae el manifiesto en 'registros_en_disco' ({log: {ruta,
+  formato, registros, bytes}}).
+
+Formatos:
+- jsonl: un objeto JSON por línea.
+- csv: encabezado con las columnas del primer bloque; columnas nuevas
+  posteriores se descartan (quedan listadas en el manifiesto).
+- bin: 'TPSIMB1\\n' + largo (uint32 LE) + esquema JSON {"campos": [[nombre, dtype]],
+  "registro_bytes": n} y luego registros de ancho fijo (numpy structured):
+  números como float64 (None -> NaN) y textos como bytes de 'ancho_texto'.
+  Campos no escalares (listas, dicts) no van al binario.
+
+Los registros en tupla (p.ej. patio_eq_trace) se escriben como {"c0": ..., "c1": ...}.
+leer_registros() recorre cualquiera de los tres formatos.
+"""
+import abc
+import csv
+import gzip
+import io
+import json
+import os
+import struct
+
+import numpy as np
+
+MAGIA_BIN = b"TPSIMB1\n"
+BUFFER_REGISTROS = 4096
+MAX_EN_MEMORIA = 10_000
+ANCHO_TEXTO = 32
+
+
+def _como_dict(item):
+    if isinstance(item, dict):
+        return item
+    return {f"c{i}": v for i, v in enumerate(item)}
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+def _es_numero(v):
+    return isinstance(v, (int, float, bool, np.integer, np.floating, np.bool_))
+
+
+def _abrir(ruta, binario, comprimir, nivel):
+    if comprimir:
+        f = gzip.open(ruta, "wb", compresslevel=nivel)
+    else:
+        f = open(ruta, "wb", buffering=1 << 20)
+    return f if binario else io.TextIOWrapper(f, encoding="utf-8", newline="")
+
+
+class Sumidero(abc.ABC):
+    """Base: buffer de registros + escritura en bloque."""
+    formato = None
+    binario = False
+
+    def __init__(self, ruta, comprimir=False, nivel_compresion=6, buffer_registros=BUFFER_REGISTROS):
+        self.ruta = str(ruta)
+        self.comprimir = comprimir
+        self.buffer_registros = max(1, int(buffer_registros))
+        self._f = _abrir(self.ruta, self.binario, comprimir, nivel_compresion)
+        self._buffer = []
+        self.n = 0
+
+    def escribir(self, item):
+        self._buffer.append(_como_dict(item))
+        self.n += 1
+        if len(self._buffer) >= self.buffer_registros:
+            self.vaciar()
+
+    def vaciar(self):
+        if self._buffer and self._f is not None:
+            self._volcar(self._buffer)
+            self._buffer = []
+
+    @abc.abstractmethod
+    def _volcar(self, registros):
+        """Escribe un bloque de registros (dicts) en self._f."""
+
+    def cerrar(self):
+        """Vacía el buffer, cierra el archivo y devuelve su entrada del manifiesto."""
+        if self._f is not None:
+            try:
+                self.vaciar()
+            finally:
+                self._f.close()
+                self._f = None
+        return {"ruta": self.ruta, "formato": self.formato, "comprimido": self.comprimir,
+                "registros": self.n, "bytes": os.path.getsize(self.ruta)}
+
+
+class SumideroJSONL(Sumidero):
+    formato = "jsonl"
+
+    def _volcar(self, registros):
+        dumps = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_json_default).encode
+        self._f.write("".join(dumps(r) + "\n" for r in registros))
+
+
+class SumideroCSV(Sumidero):
+    formato = "csv"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._writer = csv.writer(self._f)
+        self.columnas = None
+        self.descartadas = set()
+
+    def _volcar(self, registros):
+        if self.columnas is None:
+            self.columnas = list(dict.fromkeys(k for r in registros for k in r))
+            self._writer.writerow(self.columnas)
+        conocidas = set(self.columnas)
+        filas = []
+        for r in registros:
+            nuevas = r.keys() - conocidas
+            if nuevas:
+                self.descartadas |= nuevas
+            filas.append(["" if (v := r.get(c)) is None
+                          else (json.dumps(v, default=_json_default) if isinstance(v, (list, dict, tuple)) else v)
+                          for c in self.columnas])
+        self._writer.writerows(filas)
+
+    def cerrar(self):
+        out = super().cerrar()
+        out["columnas"] = self.columnas or []
+        if self.descartadas:
+            out["columnas_descartadas"] = sorted(self.descartadas)
+        return out
+
+
+class SumideroBinario(Sumidero):
+    formato = "bin"
+    binario = True
+
+    def __init__(self, *args, ancho_texto=ANCHO_TEXTO, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ancho_texto = int(ancho_texto)
+        self.dtype = None
+
+    def _esquema(self, registros):
+        campos = []
+        for k in dict.fromkeys(k for r in registros for k in r):
+            valores = [r.get(k) for r in registros if r.get(k) is not None]
+            if all(_es_numero(v) for v in valores):
+                campos.append((k, "<f8"))
+            elif all(isinstance(v, str) for v in valores):
+                campos.append((k, f"S{self.ancho_texto}"))
+        self.dtype = np.dtype(campos)
+        cabecera = json.dumps({"campos": [list(c) for c in campos], "registro_bytes": self.dtype.itemsize}).encode()
+        self._f.write(MAGIA_BIN + struct.pack("<I", len(cabecera)) + cabecera)
+
+    def _volcar(self, registros):
+        if self.dtype is None:
+            self._esquema(registros)
+        bloque = np.zeros(len(registros), dtype=self.dtype)
+        for nombre in self.dtype.names:
+            if self.dtype[nombre].kind == "f":
+                col = [r.get(nombre) for r in registros]
+                bloque[nombre] = [np.nan if v is None or not _es_numero(v) else v for v in col]
+            else:
+                bloque[nombre] = [str(r.get(nombre) or "").encode("utf-8")[:self.ancho_texto] for r in registros]
+        self._f.write(bloque.tobytes())
+
+    def cerrar(self):
+        out = super().cerrar()
+        out["campos"] = [[n, self.dtype[n].str] for n in self.dtype.names] if self.dtype is not None else []
+        return out
+
+
+_SUMIDEROS = {"jsonl": SumideroJSONL, "csv": SumideroCSV, "bin": SumideroBinario}
+
+
+class VolcadoRegistros:
+    """Sumideros de los logs de un turno, en un directorio."""
+
+    def __init__(self, directorio, formato="jsonl", comprimir=False, prefijo="", logs=None,
+                 max_en_memoria=MAX_EN_MEMORIA, buffer_registros=BUFFER_REGISTROS,
+                 nivel_compresion=6, ancho_texto=ANCHO_TEXTO):
+        if formato not in _SUMIDEROS:
+            raise ValueError(f"Formato de volcado desconocido: {formato!r} (jsonl, csv o bin)")
+        self.directorio = str(directorio)
+        self.formato = formato
+        self.comprimir = bool(comprimir)
+        self.prefijo = prefijo
+        self.logs = set(logs) if logs is not None else None
+        self.max_en_memoria = max_en_memoria
+        self._opciones = {"comprimir": self.comprimir, "nivel_compresion": nivel_compresion,
+                          "buffer_registros": buffer_registros}
+        if formato == "bin":
+            self._opciones["ancho_texto"] = ancho_texto
+        self.sumideros = {}
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def sumidero(self, nombre):
+        """Sumidero abierto para el log 'nombre' (None si el log no se vuelca)."""
+        if self.logs is not None and nombre not in self.logs:
+            return None
+        s = self.sumideros.get(nombre)
+        if s is None:
+            archivo = f"{self.prefijo}{nombre}.{self.formato}" + (".gz" if self.comprimir else "")
+            s = self.sumideros[nombre] = _SUMIDEROS[self.formato](
+                os.path.join(self.directorio, archivo), **self._opciones)
+        return s
+
+    def cerrar(self):
+        """Cierra todos los archivos (aunque alguno falle); {log: entrada del manifiesto}."""
+        manifiesto, error = {}, None
+        for nombre, s in self.sumideros.items():
+            try:
+                manifiesto[nombre] = s.cerrar()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            raise error
+        return manifiesto
+
+
+def volcado_desde_cfg(cfg, turno):
+    """VolcadoRegistros de cfg["volcado_registros"] (dict de opciones) o None."""
+    opciones = cfg.get("volcado_registros")
+    if not opciones:
+        return None
+    if isinstance(opciones, VolcadoRegistros):
+        return opciones
+    return VolcadoRegistros(**{"prefijo": f"{turno}_", **opciones})
+
+
+def _formato_de_ruta(ruta):
+    base = str(ruta)[:-3] if str(ruta).endswith(".gz") else str(ruta)
+    ext = os.path.splitext(base)[1].lstrip(".")
+    if ext not in _SUMIDEROS:
+        raise ValueError(f"No se reconoce el formato de {ruta!r}")
+    return ext, str(ruta).endswith(".gz")
+
+
+def leer_registros(ruta, bloque=BUFFER_REGISTROS):
+    """Itera los registros (dicts) de un archivo volcado, en cualquiera de los formatos."""
+    formato, comprimido = _formato_de_ruta(ruta)
+    abrir = gzip.open if comprimido else open
+    if formato == "bin":
+        with abrir(ruta, "rb") as f:
+            if f.read(len(MAGIA_BIN)) != MAGIA_BIN:
+                raise ValueError(f"{ruta!r} no es un volcado binario")
+            (largo,) = struct.unpack("<I", f.read(4))
+            esquema = json.loads(f.read(largo))
+            dtype = np.dtype([tuple(c) for c in esquema["campos"]])
+            textos = [n for n in dtype.names if dtype[n].kind == "S"]
+            while True:
+                datos = f.read(dtype.itemsize * bloque)
+                if not datos:
+                    break
+                for fila in np.frombuffer(datos, dtype=dtype).tolist():
+                    r = dict(zip(dtype.names, fila))
+                    for n in textos:
+                        r[n] = r[n].decode("utf-8", errors="replace")
+                    yield r
+        return
+    with abrir(ruta, "rt", encoding="utf-8", newline="") as f:
+        if formato == "jsonl":
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+        else:
+            yield from csv.DictReader(f)
+
+
+__all__ = [
+    "VolcadoRegistros", "Sumidero", "SumideroJSONL", "SumideroCSV", "SumideroBinario",
+    "volcado_desde_cfg", "leer_registros",
+]
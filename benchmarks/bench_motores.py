@@ -0,0 +1,228 @@
+"""
+Benchmark de los motores de simulación (noche, día y ciclo completo 24h).
+
+Cada caso (motor × volumen de cajas × dotación) corre en un proceso nuevo
+con semillas fijas, de modo que el pico de RSS sea el de esa corrida (el
+estado inicial del día, que sale de simular la noche, se prepara en otro
+proceso). Se reporta tiempo de pared (mediana de las repeticiones), eventos
+SimPy procesados, eventos/s, pico de RSS y, en una repetición aparte con
+tracemalloc (para no contaminar el tiempo), el pico de memoria trazada y las
+asignaciones vivas al terminar la corrida (bloques, con el resultado todavía
+en memoria).
+
+La comparación con el baseline marca regresión en cualquiera de
+METRICAS_REGRESION (tiempo, eventos, RSS, memoria trazada, asignaciones).
+
+Uso:
+    python benchmarks/bench_motores.py                       # corre y guarda benchmarks/resultados.json
+    python benchmarks/bench_motores.py --rapido              # sólo 5k y 20k cajas
+    python benchmarks/bench_motores.py --guardar-baseline    # además fija benchmarks/baseline.json
+    python benchmarks/bench_motores.py --umbral 0.15         # falla (exit 1) si alguna métrica empeora >15%
+"""
+import sys
+import os
+import io
+import json
+import time
+import argparse
+import platform
+import statistics
+import contextlib
+import tracemalloc
+import multiprocessing
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+VOLUMENES = (5000, 20000, 50000, 200000)
+VOLUMENES_RAPIDO = (5000, 20000)
+FRACCION_PICK = 0.9
+MOTORES = ("noche", "dia", "ciclo")
+# métricas de cada caso que se comparan con el baseline (más es peor en todas)
+METRICAS_REGRESION = ("wall_s", "eventos_procesados", "rss_pico_mb", "tracemalloc_pico_mb", "asignaciones")
+
+# Dotaciones de noche (las del día vienen de DAY_CONFIG["shifts_day"])
+DOTACIONES = {
+    "base": {},
+    "reducida": {"cap_picker": 8, "cap_gruero": 2, "cap_chequeador": 1},
+    "ampliada": {"cap_picker": 24, "cap_gruero": 6, "cap_chequeador": 3, "cap_parrillero": 2},
+}
+
+
+def _rss_pico_mb():
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb / (1024.0 * 1024.0) if sys.platform == "darwin" else kb / 1024.0
+
+
+def _ejecutar(motor, cajas, dotacion, seed, estado_dia=None):
+    """Corre una simulación y devuelve (eventos SimPy procesados, resultado)."""
+    from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+    from app.simulations.day.simulation import simular_turno_dia
+    from app.simulations.complete_cycle import simular_ciclo_completo_24h
+
+    pick = int(cajas * FRACCION_PICK)
+    cfg = dict(DEFAULT_CONFIG, **DOTACIONES[dotacion])
+    if motor == "noche":
+        r = simular_turno_prioridad_rng(cajas, pick, cfg, seed=seed)
+        return r["eventos_procesados"], r
+    if motor == "dia":
+        r = simular_turno_dia(estado_dia, seed=seed)
+        return r["eventos_procesados"], r
+    r = simular_ciclo_completo_24h(cajas, pick, seed=seed, cfg_noche=DOTACIONES[dotacion])
+    return r["turno_noche"]["eventos_procesados"] + r["turno_dia"]["eventos_procesados"], r
+
+
+def _estado_dia(args):
+    """El día parte del estado que deja la noche. Se ejecuta en su propio proceso
+    (spawn) para que la noche no cuente en el pico de RSS del caso de día."""
+    cajas, dotacion, seed = args
+    from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+    cfg = dict(DEFAULT_CONFIG, **DOTACIONES[dotacion])
+    with contextlib.redirect_stdout(io.StringIO()):
+        return simular_turno_prioridad_rng(cajas, int(cajas * FRACCION_PICK), cfg, seed=seed)["estado_inicial_dia"]
+
+
+def _caso(args):
+    """Se ejecuta en un proceso nuevo (spawn)."""
+    motor, cajas, dotacion, seed, repeticiones, estado_base = args
+    import copy
+    from app.simulations.night import DEFAULT_CONFIG
+
+    cfg = dict(DEFAULT_CONFIG, **DOTACIONES[dotacion])
+    estado = lambda: copy.deepcopy(estado_base) if estado_base is not None else None
+
+    tiempos, eventos = [], 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeticiones):
+            estado_dia = estado()
+            t0 = time.perf_counter()
+            eventos, _ = _ejecutar(motor, cajas, dotacion, seed, estado_dia)
+            tiempos.append(time.perf_counter() - t0)
+        rss = _rss_pico_mb()
+
+        estado_dia = estado()
+        tracemalloc.start()
+        _, resultado = _ejecutar(motor, cajas, dotacion, seed, estado_dia)
+        _, pico = tracemalloc.get_traced_memory()
+        # bloques vivos al terminar (lo que queda de la corrida, resultado incluido)
+        asignaciones = sum(st.count for st in tracemalloc.take_snapshot().statistics("filename"))
+        del resultado
+        tracemalloc.stop()
+
+    wall = statistics.median(tiempos)
+    return {
+        "motor": motor, "cajas": cajas, "dotacion": dotacion, "seed": seed,
+        # entradas del escenario de noche (las usa el modelo de costo del servicio)
+        "entradas": {"total_cajas_facturadas": cajas, "cajas_para_pick": int(cajas * FRACCION_PICK),
+                     **{k: cfg[k] for k in ("cap_picker", "cap_gruero", "cap_chequeador", "cap_parrillero")}},
+        "repeticiones": repeticiones,
+        "wall_s": wall, "wall_min_s": min(tiempos), "wall_max_s": max(tiempos),
+        "eventos_procesados": eventos,
+        "eventos_por_s": (eventos / wall) if wall > 0 else None,
+        "rss_pico_mb": rss,
+        # pico de bytes vivos trazados por tracemalloc (no es una cuenta de asignaciones)
+        "tracemalloc_pico_mb": pico / (1024.0 * 1024.0),
+        "asignaciones": asignaciones,
+    }
+
+
+def clave_caso(c):
+    return f"{c['motor']}|{c['cajas']}|{c['dotacion']}"
+
+
+def correr(volumenes=VOLUMENES, motores=MOTORES, dotaciones=tuple(DOTACIONES), seed=42, repeticiones=3):
+    ctx = multiprocessing.get_context("spawn")
+    casos = []
+    for motor in motores:
+        for cajas in volumenes:
+            for dot in dotaciones:
+                estado_base = None
+                if motor == "dia":
+                    with ctx.Pool(1) as pool:
+                        estado_base = pool.apply(_estado_dia, ((cajas, dot, seed),))
+                with ctx.Pool(1) as pool:
+                    c = pool.apply(_caso, ((motor, cajas, dot, seed, repeticiones, estado_base),))
+                casos.append(c)
+                print(f"{clave_caso(c):28s} wall={c['wall_s']*1000:9.1f} ms  "
+                      f"eventos={c['eventos_procesados']:>9}  rss={c['rss_pico_mb'] or 0:7.1f} MB  "
+                      f"tracemalloc={c['tracemalloc_pico_mb']:7.1f} MB  asignaciones={c['asignaciones']:>9}")
+    import simpy
+    return {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "simpy": getattr(simpy, "__version__", None),
+            "seed": seed, "repeticiones": repeticiones,
+        },
+        "casos": casos,
+    }
+
+
+def comparar(actual, baseline, umbral=0.10, metricas=METRICAS_REGRESION):
+    """Lista de regresiones: (caso, métrica) cuyo valor supera baseline·(1+umbral)."""
+    base = {clave_caso(c): c for c in baseline.get("casos", [])}
+    regresiones = []
+    for c in actual.get("casos", []):
+        b = base.get(clave_caso(c))
+        if not b:
+            continue
+        for metrica in metricas:
+            # métricas que el baseline no tiene (o sin RSS en la plataforma) no se comparan
+            if not b.get(metrica) or c.get(metrica) is None:
+                continue
+            ratio = c[metrica] / b[metrica]
+            if ratio > 1.0 + umbral:
+                regresiones.append({"caso": clave_caso(c), "metrica": metrica,
+                                    "baseline": b[metrica], "actual": c[metrica], "ratio": ratio})
+    return regresiones
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark de motores de simulación")
+    ap.add_argument("--rapido", action="store_true", help="sólo 5k y 20k cajas, 1 repetición")
+    ap.add_argument("--motores", nargs="+", choices=MOTORES, default=list(MOTORES))
+    ap.add_argument("--dotaciones", nargs="+", choices=list(DOTACIONES), default=list(DOTACIONES))
+    ap.add_argument("--repeticiones", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--salida", default=os.path.join(DIR, "resultados.json"))
+    ap.add_argument("--baseline", default=os.path.join(DIR, "baseline.json"))
+    ap.add_argument("--guardar-baseline", action="store_true")
+    ap.add_argument("--umbral", type=float, default=0.10, help="regresión tolerada (0.10 = +10%%)")
+    args = ap.parse_args(argv)
+
+    res = correr(
+        volumenes=VOLUMENES_RAPIDO if args.rapido else VOLUMENES,
+        motores=args.motores, dotaciones=args.dotaciones, seed=args.seed,
+        repeticiones=1 if args.rapido else args.repeticiones,
+    )
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados: {args.salida}")
+
+    if args.guardar_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2, ensure_ascii=False)
+        print(f"Baseline actualizado: {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regresiones = comparar(res, baseline, umbral=args.umbral)
+        for r in regresiones:
+            print(f"⚠️  REGRESIÓN {r['caso']} {r['metrica']}: {r['baseline']:.4g} -> {r['actual']:.4g} "
+                  f"(x{r['ratio']:.2f})")
+        if regresiones:
+            return 1
+        print(f"✅ Sin regresiones (umbral +{args.umbral:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.simulations.analysis_helpers import ranking_cuellos_botella, descomposicion_estadia
+
+
+def test_ranking_por_espera_y_utilizacion():
+    res = {"monitor_recursos": {
+        "grueros": {"utilizacion_pct": 60.0, "cola_media": 2.0, "horizonte_min": 100.0},
+        "pickers": {"utilizacion_pct": 90.0, "cola_media": 0.5, "horizonte_min": 100.0},
+        "parrilleros": {"utilizacion_pct": 30.0, "cola_media": 0.0, "horizonte_min": 100.0},
+        "movilizadores": {"utilizacion_pct": 40.0, "cola_media": 0.0, "horizonte_min": 100.0},
+        "patio_camiones": {"utilizacion_pct": 99.0, "cola_media": 9.0, "horizonte_min": 100.0},
+    }}
+    r = ranking_cuellos_botella(res)
+    assert [x["recurso"] for x in r] == ["grueros", "pickers", "movilizadores", "parrilleros"]
+    assert r[0]["parte_espera_pct"] == 80.0 and r[0]["espera_cola_min"] == 200.0
+
+
+def test_descomposicion_estadia():
+    res = {
+        "centro_eventos": [
+            {"camion_id": "A", "vuelta": 1, "inicio_min": 0.0, "fin_min": 50.0, "tiempo_espera_chequeo_min": 5.0},
+            {"camion_id": "A", "vuelta": 2, "inicio_min": 60.0, "fin_min": 70.0},
+            {"camion_id": "T1-1", "vuelta": None, "inicio_min": 0.0, "fin_min": 9.0},
+        ],
+        "grua_operaciones": [
+            {"camion": "A", "vuelta": 1, "wait": 4.0, "hold": 1.0},
+            {"camion": "A", "vuelta": 1, "wait": 6.0, "hold": 2.0},
+            {"camion": "A", "vuelta": 2, "wait": 0.0, "hold": 3.0},
+            {"camion": "B", "vuelta": 1, "wait": 9.0, "hold": 9.0},
+        ],
+    }
+    d = descomposicion_estadia(res)
+    assert len(d) == 2
+    assert d[0] == {"camion_id": "A", "vuelta": 1, "estadia_min": 50.0, "espera_grua_min": 10.0,
+                    "servicio_grua_min": 3.0, "espera_chequeo_min": 5.0, "resto_min": 32.0}
+    assert d[1]["resto_min"] == 7.0
@@ -0,0 +1,43 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.simulations.bitacora import Bitacora, SalidaMemoria, BITACORA_NULA, bitacora_desde_cfg, DEBUG, INFO, TRAZA
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+
+
+class _Caro:
+    formateos = 0
+
+    def __str__(self):
+        _Caro.formateos += 1
+        return "caro"
+
+
+def test_niveles_y_formateo_diferido():
+    mem = SalidaMemoria()
+    b = Bitacora(nivel=INFO, salidas=[mem])
+    b.debug("no %s", _Caro())
+    b.info("sí %s", _Caro(), t=3.0, k=1)
+    assert len(mem.registros) == 1 and _Caro.formateos == 0
+    assert mem.volcar()[0]["mensaje"] == "[   3.00 min] sí caro | k=1"
+    assert not b.habilitado(TRAZA)
+
+
+def test_ring_buffer_y_muestreo():
+    mem = SalidaMemoria(capacidad=3)
+    b = Bitacora(nivel=DEBUG, salidas=[mem], muestreo=0.5)
+    for i in range(10):
+        b.debug("r%d", i)
+    b.warning("siempre")
+    assert [r.args for r in mem.registros][:2] == [(7,), (9,)]
+    assert mem.registros[-1].mensaje == "siempre"
+    assert mem.descartados == 3
+
+
+def test_motor_silencioso_por_defecto(capsys):
+    assert bitacora_desde_cfg({}) is BITACORA_NULA
+    mem = SalidaMemoria()
+    simular_turno_prioridad_rng(800, 700, dict(DEFAULT_CONFIG), seed=1,
+                                bitacora=Bitacora(nivel=DEBUG, salidas=[mem]))
+    assert capsys.readouterr().out == ""
+    assert any(r.mensaje.startswith("Salida camión") for r in mem.registros)
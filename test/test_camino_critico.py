@@ -0,0 +1,37 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+from app.simulations.night.camino_critico import camino_critico_noche
+
+
+def test_cadena_con_gate_y_rama_paralela():
+    eventos = [
+        {"camion_id": "A", "vuelta": 1, "inicio_min": 0.0, "fin_min": 30.0},
+        {"camion_id": "B", "vuelta": 2, "inicio_min": 10.0, "fin_min": 25.0},
+        {"camion_id": "C", "vuelta": 2, "inicio_min": 10.0, "fin_min": 40.0},
+    ]
+    logs = {
+        "pickers": [{"camion": "A", "vuelta": 1, "start": 2.0, "end": 10.0, "tiempo_espera_min": 2.0}],
+        "grueros": [
+            {"camion": "C", "vuelta": 2, "start": 14.0, "end": 20.0, "wait": 4.0, "label": "acomodo_v2"},
+            {"camion": "C", "vuelta": 2, "start": 21.0, "end": 40.0, "wait": 1.0, "label": "acomodo_v2"},
+            {"camion": "B", "vuelta": 2, "start": 10.0, "end": 25.0, "wait": 0.0, "label": "acomodo_v2"},
+        ],
+    }
+    gates = {0: {"done_time": 0}, 1: {"done_time": 10.0}, 2: {"done_time": 10.0}}
+    c = camino_critico_noche(eventos, logs, gates, overrun_min=5.0)
+    assert c["camion_critico"] == "C"
+    assert [(t["camion"], t["recurso"]) for t in c["tramos"]] == [
+        ("A", "pickers"), (None, "pick_gate"), ("C", "grueros"), ("C", "grueros")]
+    assert c["atribucion_min"] == {"servicio_grueros": 25.0, "servicio_pickers": 8.0,
+                                   "espera_grueros": 5.0, "espera_pickers": 2.0}
+    assert c["atribucion_overrun_min"] == {"grueros": 5.0 * 5 / 7, "pickers": 5.0 * 2 / 7}
+
+
+def test_camino_cubre_el_fin_del_turno():
+    r = simular_turno_prioridad_rng(8000, 4000, dict(DEFAULT_CONFIG, cap_chequeador=1), seed=2)
+    c = r["camino_critico"]
+    assert abs(sum(c["atribucion_min"].values()) - c["fin_min"]) < 1e-6
+    assert "sin_registro" not in c["atribucion_min"]
+    assert c["atribucion_min"]["espera_chequeadores"] > 0
@@ -0,0 +1,33 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from app.simulations.columnar import guardar_columnas, ResultadoColumnar, abrir_corridas
+from app.simulations.analysis_helpers import descomposicion_estadia, resumen_kpis_noche, resumen_replicas
+from app.simulations.sweep import ejecutar_barrido
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+
+
+def test_columnas_memmap_y_analisis_iguales(tmp_path):
+    res = simular_turno_prioridad_rng(3000, 2800, dict(DEFAULT_CONFIG), seed=3)
+    guardar_columnas(res, tmp_path / "r0", "noche")
+    col = ResultadoColumnar(tmp_path / "r0")
+
+    grua = col.tabla("grua_ops")
+    assert isinstance(grua["wait"], np.memmap) and not grua["wait"].flags.writeable
+    np.testing.assert_array_equal(grua["hold"], [o["hold"] for o in res["grua_operaciones"]])
+    assert col.decodificar("grua_ops", "label")[:5] == [o["label"] for o in res["grua_operaciones"][:5]]
+
+    assert descomposicion_estadia(col) == descomposicion_estadia(res)
+    assert resumen_kpis_noche(col) == resumen_kpis_noche(res)
+
+
+def test_barrido_guarda_columnas_por_replica(tmp_path):
+    cubo = ejecutar_barrido({"total_cajas_facturadas": [1500, 3000]}, replicas=2, semilla=7,
+                            total_cajas_facturadas=3000, cajas_para_pick=2000, max_workers=0,
+                            checkpoint_dir=str(tmp_path), columnas_dir=str(tmp_path))
+    corridas = abrir_corridas(tmp_path, turno="noche")
+    assert len(corridas) == 4
+    resumen = resumen_replicas(corridas)
+    assert np.isclose(resumen["fin_real_min"]["media"], np.nanmean(cubo["kpis"]["fin_real_min"]))
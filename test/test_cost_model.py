@@ -0,0 +1,76 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+
+import pytest
+
+from app.services.cost_model import ModeloCosto
+from app.services.job_queue import ColaTrabajos
+from app.services.scheduler import Saturado
+from app.services.run_store import AlmacenCorridas
+from app.services.simulation_service import SimulationService
+
+
+def _entradas(cajas, gruero=4):
+    return {"total_cajas_facturadas": cajas, "cajas_para_pick": int(cajas * 0.9), "cap_gruero": gruero}
+
+
+def test_ajuste_sigue_las_observaciones():
+    modelo = ModeloCosto()
+    sin_datos = modelo.estimar(_entradas(5000))
+    assert modelo.estimar(_entradas(50000))["wall_s"] > sin_datos["wall_s"]
+
+    for cajas in (2000, 5000, 10000, 20000, 50000, 100000):
+        for gruero in (2, 4, 8):
+            modelo.agregar(_entradas(cajas, gruero), wall_s=2e-5 * cajas, memoria_mb=1 + cajas / 1e4)
+    estimacion = modelo.estimar(_entradas(30000))
+    assert estimacion["wall_s"] == pytest.approx(0.6, rel=0.15)
+    assert estimacion["wall_s"] <= estimacion["wall_s_p90"]
+    assert estimacion["observaciones"] == 18
+
+    presupuestos = {"inline_max_s": 1.0, "max_s": 10.0, "max_mb": 1000.0}
+    assert modelo.decidir(modelo.estimar(_entradas(5000)), presupuestos) == "inline"
+    assert modelo.decidir(modelo.estimar(_entradas(100000)), presupuestos) == "cola"
+    assert modelo.decidir(modelo.estimar(_entradas(2000000)), presupuestos) == "rechazar"
+
+
+def test_servicio_encola_y_aprende_de_corridas_guardadas(tmp_path):
+    servicio = SimulationService(almacen=AlmacenCorridas(tmp_path / "corridas.sqlite"))
+    servicio.presupuestos = {"inline_max_s": 0.0, "max_s": 600.0, "max_mb": 1e6}
+    parametros = dict(cajas_facturadas=2000, cajas_piqueadas=1800, pickers=20, grueros=4,
+                      chequeadores=4, parrilleros=6, seed=3)
+    estimacion = servicio.estimate_night_cost(**parametros)
+    assert estimacion["modo"] == "cola"
+
+    trabajo = servicio.submit_night_simulation(estimacion=estimacion, **parametros)
+    for _ in range(200):
+        estado = servicio.get_job(trabajo["id"])
+        if estado["estado"] in ("terminado", "error"):
+            break
+        time.sleep(0.05)
+    assert estado["estado"] == "terminado" and estado["resultado"]["corrida_id"]
+    assert servicio.get_run(estado["resultado"]["corrida_id"])["costo"]["wall_s"] > 0
+
+    # ya guardada: se sirve inline desde el almacén; un servicio nuevo recupera el costo medido
+    assert servicio.estimate_night_cost(**parametros)["modo"] == "inline"
+    otro = SimulationService(almacen=servicio.almacen)
+    otro.estimate_night_cost(**dict(parametros, seed=None))
+    assert otro.costo.n_observaciones() >= 1
+
+
+def test_cola_de_trabajos_acotada():
+    liberar = threading.Event()
+    cola = ColaTrabajos(trabajadores=1, max_pendientes=2)
+    ids = [cola.enviar(liberar.wait, 5)["id"] for _ in range(2)]
+    with pytest.raises(Saturado) as e:
+        cola.enviar(liberar.wait, 5)
+    assert e.value.reintentar_s >= 1 and cola.pendientes() == 2
+    liberar.set()
+    for _ in range(200):
+        if all(cola.estado(i)["estado"] == "terminado" for i in ids):
+            break
+        time.sleep(0.01)
+    assert cola.pendientes() == 0
+    cola.enviar(lambda: None)
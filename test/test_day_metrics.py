@@ -0,0 +1,29 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from app.simulations.day.metrics import _integral_activos, curvas_ocupacion
+from app.simulations.day.config import get_day_config
+
+
+def test_integral_activos_coincide_con_interseccion_por_ventana():
+    rng = np.random.default_rng(0)
+    ini = rng.uniform(0, 100, 300)
+    fin = ini + rng.uniform(0.1, 5, 300)
+    bordes = np.arange(0, 110, 7.0)
+    por_bin = np.diff(_integral_activos(ini, fin, bordes))
+    fuerza_bruta = [sum(max(0.0, min(e, we) - max(s, ws)) for s, e in zip(ini, fin))
+                    for ws, we in zip(bordes[:-1], bordes[1:])]
+    np.testing.assert_allclose(por_bin, fuerza_bruta, atol=1e-9)
+
+
+def test_curvas_ocupacion_respeta_capacidad_por_turno():
+    class Centro:
+        grua_ops = [{"start": 0.0, "end": 60.0}, {"start": 30.0, "end": 90.0}]
+    cfg = get_day_config()
+    curvas = curvas_ocupacion(Centro(), cfg, bin_min=60)
+    grua = curvas["recursos"]["grueros"]
+    assert grua["activo_min"][:2] == [90.0, 30.0]
+    assert curvas["inicio_hhmm"][:2] == ["08:00", "09:00"]
+    assert sum(grua["capacidad_x_tiempo"]) > 0
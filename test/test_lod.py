@@ -0,0 +1,68 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pytest
+
+from app.services.run_store import AlmacenCorridas
+from app.simulations.lod import MAX_BUCKETS, separar_series, construir_piramide, consultar_piramide
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+
+
+def _series():
+    cfg = dict(DEFAULT_CONFIG, monitor_muestreo_min=1)
+    res = simular_turno_prioridad_rng(3000, 2800, cfg, seed=4)
+    series = separar_series(res)
+    assert all("serie" not in est for est in res["monitor_recursos"].values())
+    return res, series
+
+
+def test_niveles_conservan_areas_y_consulta_agrega_la_base():
+    _, series = _series()
+    piramide = construir_piramide(series)
+    base = piramide["niveles"][1.0]
+    for ancho, nivel in piramide["niveles"].items():
+        assert nivel[..., :3].sum(axis=0) == pytest.approx(base[..., :3].sum(axis=0))
+        assert nivel[..., 3].max(axis=0) == pytest.approx(base[..., 3].max(axis=0))
+
+    grua = series["grueros"]
+    out = consultar_piramide(piramide, 60, t_desde=30, t_hasta=270, recursos=["grueros"])
+    assert out["nivel_min"] == 15 and out["inicio_min"] == [30.0, 90.0, 150.0, 210.0]
+    tramo = grua[30:270]
+    for i in range(4):
+        bloque = tramo[i * 60:(i + 1) * 60]
+        u = sum(p["usuarios_medio"] for p in bloque)
+        c = sum(p["capacidad_media"] for p in bloque)
+        assert out["recursos"]["grueros"]["usuarios_medio"][i] == pytest.approx(u / 60)
+        assert out["recursos"]["grueros"]["ocupacion"][i] == pytest.approx(u / c)
+        assert out["recursos"]["grueros"]["usuarios_max"][i] == max(p["usuarios_max"] for p in bloque)
+    with pytest.raises(ValueError):
+        consultar_piramide(piramide, 2.5)
+
+
+def test_almacen_guarda_y_consulta_lod(tmp_path):
+    res, series = _series()
+    almacen = AlmacenCorridas(tmp_path / "corridas.sqlite")
+    id_corrida = almacen.guardar({"total_cajas_facturadas": 3000}, {}, res, seed=4, series=series)
+    out = almacen.lod(id_corrida, 240)
+    ocupacion = np.array(out["recursos"]["patio_camiones"]["ocupacion"])
+    assert len(out["inicio_min"]) == int(np.ceil(len(series["patio_camiones"]) / 240))
+    assert ((ocupacion >= 0) & (ocupacion <= 1 + 1e-9)).all()
+    with pytest.raises(KeyError):
+        almacen.lod("nada", 60)
+
+
+def test_consulta_se_recorta_a_lo_simulado_y_acota_los_buckets():
+    serie = [{"inicio_min": float(i), "usuarios_medio": 1.0, "cola_media": 0.0, "capacidad_media": 2.0,
+              "usuarios_max": 1} for i in range(MAX_BUCKETS + 100)]
+    piramide = construir_piramide({"grueros": serie})
+
+    # un tramo enorme no reserva memoria por lo pedido: se recorta al horizonte
+    out = consultar_piramide(piramide, 60, t_desde=-1e9, t_hasta=1e10)
+    assert out["inicio_min"][0] == 0.0 and len(out["inicio_min"]) == int(np.ceil(len(serie) / 60))
+    assert consultar_piramide(piramide, 1e9)["recursos"]["grueros"]["ocupacion"] == [pytest.approx(0.5)]
+
+    with pytest.raises(ValueError, match="buckets"):
+        consultar_piramide(piramide, 1, t_desde=0, t_hasta=1e10)
+    with pytest.raises(ValueError):
+        consultar_piramide(piramide, 60, t_desde=1e9, t_hasta=1e10)
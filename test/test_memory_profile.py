@@ -0,0 +1,46 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import tracemalloc
+
+from app.services.run_store import AlmacenCorridas
+from app.services.simulation_service import SimulationService
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+
+
+def test_perfil_memoria_por_modulo_guardado_con_la_corrida(tmp_path):
+    servicio = SimulationService(almacen=AlmacenCorridas(tmp_path / "corridas.sqlite"))
+    parametros = dict(cajas_facturadas=3000, cajas_piqueadas=2800, pickers=20, grueros=4,
+                      chequeadores=4, parrilleros=6, seed=5)
+    servicio.run_night_simulation(**parametros)
+    resultado = servicio.run_night_simulation(**parametros, perfil_memoria=True)
+    assert not tracemalloc.is_tracing()
+
+    # con perfil se simula aunque la corrida ya esté guardada
+    assert resultado["desde_cache"] is False
+    perfil = resultado["perfil_memoria"]
+    assert {"planificar_noche", "simpy.run", "serializacion"} <= set(perfil["fases_pico_mb"])
+    assert perfil["pico_mb"] >= max(perfil["fases_pico_mb"].values()) > 0
+    assert {"night/centro.py", "night/planning.py", "serializacion"} <= set(perfil["modulos"])
+    assert perfil["top_sitios"][0]["mb"] >= perfil["top_sitios"][-1]["mb"]
+
+    assert servicio.get_run_memory_profile(resultado["corrida_id"]) == perfil
+    assert servicio.get_run(resultado["corrida_id"])["costo"]["memoria_mb"] == perfil["pico_mb"]
+
+
+def test_corrida_sin_perfil_no_toca_el_pico_de_tracemalloc():
+    cfg = dict(DEFAULT_CONFIG)
+    tracemalloc.start()
+    try:
+        bloque = bytearray(8 * 1024 * 1024)
+        del bloque
+        pico_antes = tracemalloc.get_traced_memory()[1]
+        # otra corrida concurrente al perfil: ni reinicia el pico ni informa picos por sección
+        resultado = simular_turno_prioridad_rng(3000, 2800, cfg, seed=5)
+        assert "secciones_memoria_pico_bytes" not in resultado
+        assert tracemalloc.get_traced_memory()[1] >= pico_antes
+
+        propia = simular_turno_prioridad_rng(3000, 2800, cfg, seed=5, perfil_memoria=True)
+        assert {"planificar_noche", "simpy.run"} <= set(propia["secciones_memoria_pico_bytes"])
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,32 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from app.core.metrics import RegistroMetricas
+
+
+def test_formato_prometheus():
+    registro = RegistroMetricas()
+    pedidos = registro.contador("pedidos_total", "Pedidos", ("ruta",))
+    pedidos.inc(ruta="/a")
+    pedidos.inc(2, ruta='/b"x')
+    latencia = registro.histograma("latencia_seconds", "Latencia", cubetas=(0.1, 1.0))
+    for v in (0.05, 0.5, 3.0):
+        latencia.observe(v)
+    registro.medidor("cola", "Cola", ("prioridad",), funcion=lambda: {"lote": 3, "interactiva": 1})
+
+    texto = registro.exponer()
+    assert "# TYPE pedidos_total counter" in texto
+    assert 'pedidos_total{ruta="/a"} 1.0' in texto and 'pedidos_total{ruta="/b\\"x"} 2' in texto
+    assert 'latencia_seconds_bucket{le="0.1"} 1' in texto
+    assert 'latencia_seconds_bucket{le="1.0"} 2' in texto
+    assert 'latencia_seconds_bucket{le="+Inf"} 3' in texto
+    assert "latencia_seconds_sum 3.55" in texto and "latencia_seconds_count 3" in texto
+    assert 'cola{prioridad="interactiva"} 1' in texto and 'cola{prioridad="lote"} 3' in texto
+
+    assert registro.contador("pedidos_total", "Pedidos", ("ruta",)) is pedidos
+    with pytest.raises(ValueError):
+        registro.medidor("pedidos_total", "Pedidos", ("ruta",))
+    with pytest.raises(ValueError):
+        pedidos.inc(ruta="/a", metodo="GET")
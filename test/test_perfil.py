@@ -0,0 +1,19 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+
+
+def test_perfil_no_altera_resultado_y_separa_fases():
+    base = simular_turno_prioridad_rng(3000, 2000, DEFAULT_CONFIG, seed=3)
+    perf = simular_turno_prioridad_rng(3000, 2000, DEFAULT_CONFIG, seed=3, perfilar=True)
+    assert "perfil" not in base
+    assert perf["turno_fin_real"] == base["turno_fin_real"]
+    assert perf["eventos_procesados"] == base["eventos_procesados"]
+
+    p = perf["perfil"]
+    assert "procesa_camion_vuelta" in p["procesos"]
+    assert any(k.startswith("_usar_grua[") for k in p["fases"])
+    assert "metricas.calcular_ocupacion_recursos" in p["secciones"]
+    eventos = p["kernel"]["eventos"] + sum(a["eventos"] for a in p["procesos"].values())
+    assert eventos >= perf["eventos_procesados"] - 1
@@ -0,0 +1,56 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import copy
+
+from app.simulations.night import simular_turno_prioridad_rng, preview_turno_noche, DEFAULT_CONFIG
+from app.simulations.night.planning import planificar_noche, limpiar_cache_planes
+from app.simulations.night.rng import make_rng
+
+
+def _sin_cache(seed):
+    rng = make_rng(seed)
+    pallets, resumen, plan, desde_cache = planificar_noche(3000, 2800, DEFAULT_CONFIG, rng, seed=None)
+    assert not desde_cache
+    return (pallets, resumen, plan), rng.bit_generator.state
+
+
+def test_hit_identico_a_planificar_sin_cache():
+    limpiar_cache_planes()
+    esperado, estado = _sin_cache(7)
+    for desde_cache_esperado in (False, True):
+        rng = make_rng(7)
+        pallets, resumen, plan, desde_cache = planificar_noche(3000, 2800, DEFAULT_CONFIG, rng, seed=7)
+        assert desde_cache is desde_cache_esperado
+        assert (pallets, resumen, plan) == esperado
+        # el rng queda donde lo deja la planificación: la simulación sigue igual
+        assert rng.bit_generator.state == estado
+
+
+def test_mutar_el_plan_devuelto_no_corrompe_la_cache():
+    limpiar_cache_planes()
+    esperado, _ = _sin_cache(11)
+    for _ in range(2):
+        pallets, resumen, plan, _ = planificar_noche(3000, 2800, DEFAULT_CONFIG, make_rng(11), seed=11)
+        plan[0][1][0]["pallets"].clear()
+        plan.append((99, []))
+        pallets[0]["cajas"] = -1
+        resumen.clear()
+    pallets, resumen, plan, desde_cache = planificar_noche(3000, 2800, DEFAULT_CONFIG, make_rng(11), seed=11)
+    assert desde_cache and (pallets, resumen, plan) == esperado
+
+
+def test_preview_coincide_con_la_planificacion_de_la_corrida():
+    limpiar_cache_planes()
+    corrida = simular_turno_prioridad_rng(3000, 2800, dict(DEFAULT_CONFIG), seed=5)
+    preview = preview_turno_noche(3000, 2800, DEFAULT_CONFIG, seed=5)
+    assert preview["plan_desde_cache"]
+    for clave in ("pallets_pre", "pallets_pre_total", "planificacion_detalle"):
+        assert preview[clave] == corrida[clave]
+    # en la corrida 'vueltas' es el detalle por vuelta (reporting); acá, la cantidad
+    assert preview["vueltas"] == len(corrida["planificacion_detalle"]) == len(corrida["vueltas"])
+    # y sin caché da lo mismo
+    limpiar_cache_planes()
+    otra = preview_turno_noche(3000, 2800, DEFAULT_CONFIG, seed=5)
+    assert not otra["plan_desde_cache"]
+    assert copy.deepcopy(otra["planificacion_detalle"]) == preview["planificacion_detalle"]
@@ -0,0 +1,19 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.simulations.night.utils import hhmm_dias
+from app.simulations.presentacion import hhmm_lote, formatear_registros
+
+
+def test_hhmm_lote_coincide_con_hhmm_dias():
+    minutos = [0, 59.5, 60.5, 1439.6, 1500, 2 * 1440 + 7.25, None, -3]
+    esperado = [None if m is None else hhmm_dias(480 + m) for m in minutos]
+    assert hhmm_lote(minutos, 480) == esperado
+    assert hhmm_lote([]) == []
+
+
+def test_formatear_registros_con_origen_fijo():
+    regs = [{"inicio_min": 10.0, "t": 5.0}, {"inicio_min": 70.0, "t": None}]
+    formatear_registros(regs, {"inicio_hhmm": "inicio_min", "ts": ("t", 0.0)}, origen_min=1200)
+    assert [r["inicio_hhmm"] for r in regs] == ["20:10", "21:10"]
+    assert [r["ts"] for r in regs] == ["00:05", None]
@@ -0,0 +1,26 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from app.simulations.night.queueing import erlang_c, cola_mgc, estimar_cargas_noche
+from app.simulations.night.config import DEFAULT_CONFIG
+
+
+def test_erlang_c_valores_conocidos():
+    assert erlang_c(1, 0.5) == pytest.approx(0.5)          # M/M/1: P(espera) = rho
+    assert erlang_c(2, 1.0) == pytest.approx(1.0 / 3.0)
+    # M/M/1 con SCV=1: Wq = rho/(mu - lambda)
+    cola = cola_mgc(0.5, 1.0, 1.0, 1)
+    assert cola["espera_media_min"] == pytest.approx(1.0)
+
+
+def test_estimacion_noche_detecta_infactible():
+    ok = estimar_cargas_noche(5000, 4000, DEFAULT_CONFIG, seed=1)
+    assert ok["factible"] and ok["overrun_minimo_min"] == 0.0
+
+    cfg = dict(DEFAULT_CONFIG, cap_picker=1)
+    malo = estimar_cargas_noche(20000, 19000, cfg, seed=1)
+    assert not malo["factible"]
+    assert malo["cuello_botella"] == "pickers"
+    assert malo["recursos"]["pickers"]["espera_media_min"] is None   # cola saturada
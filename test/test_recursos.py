@@ -0,0 +1,71 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import simpy
+
+from app.simulations.recursos import RecursoPrioridadMonitoreado, RecursoProgramado
+
+
+def test_integrales_ponderadas_por_tiempo():
+    env = simpy.Environment()
+    r = RecursoPrioridadMonitoreado(env, capacity=2, muestreo_min=5)
+
+    def trabajo(prio):
+        with r.request(priority=prio) as req:
+            yield req
+            yield env.timeout(4)
+
+    def cambio_dotacion():
+        yield env.timeout(6)
+        r._capacity = 3
+
+    for i in range(5):
+        env.process(trabajo(i))
+    env.process(cambio_dotacion())
+    env.run()
+
+    e = r.estadisticas()
+    assert env.now == 12
+    assert e["tiempo_ocupado_min"] == 20          # 2·4 + 2·4 + 1·4
+    assert e["capacidad_x_tiempo"] == 30          # 2·6 + 3·6
+    assert abs(e["cola_media"] - 16 / 12) < 1e-12
+    assert e["solicitudes"] == 5 and e["cola_max"] == 3
+    assert abs(e["espera_media_min"] - 3.2) < 1e-12
+    assert [round(p["cola_media"], 6) for p in e["serie"]] == [2.6, 0.6]
+    assert [p["usuarios_max"] for p in e["serie"]] == [2, 2]
+
+
+def test_capacidad_programada_despierta_cola_y_drena_al_bajar():
+    env = simpy.Environment()
+    r = RecursoProgramado(env, capacity=1)
+    inicios = []
+
+    def trabajo(dur):
+        with r.request() as req:
+            yield req
+            inicios.append(env.now)
+            yield env.timeout(dur)
+
+    for _ in range(3):
+        env.process(trabajo(10))
+    r.programar_capacidad([(2, 3), (5, 1)])
+    env.process(trabajo(1))       # llega con 3 en servicio y capacidad 1: espera el drenaje
+    env.run()
+
+    # subida a 3 en t=2 atiende la cola sin esperar una liberación
+    assert inicios[:3] == [0, 2, 2]
+    # la bajada a 1 no expulsa: el cuarto entra cuando quedan <1 en servicio (t=12)
+    assert inicios[3] == 12
+    assert r.escalon_capacidad == [(0, 1), (2, 3), (5, 1)]
+    assert r.estadisticas()["capacidad_x_tiempo"] == 1 * 2 + 3 * 3 + 1 * 8
+
+
+def test_ocupacion_noche_usa_la_duracion_del_turno_configurada():
+    from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+
+    cfg = dict(DEFAULT_CONFIG, shift_start_min=0, shift_end_min=600)
+    ocupacion = simular_turno_prioridad_rng(3000, 2800, cfg, seed=5)["ocupacion_recursos"]
+    pickers = ocupacion["pickers"]
+    assert pickers["tiempo_total_disponible_min"] == cfg["cap_picker"] * 600
+    assert abs(pickers["porcentaje_ocupacion"]
+               - round(100 * pickers["tiempo_activo_total_min"] / (cfg["cap_picker"] * 600), 2)) < 1e-9
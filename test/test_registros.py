@@ -0,0 +1,56 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.simulations.registros import RegistroAcotado, crear_registro, agregar, n_total
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+from app.services.run_store import AlmacenCorridas
+from app.services.simulation_service import SimulationService
+
+
+def _ops(n):
+    return [{"vuelta": 1 + i % 3, "wait": float(i % 7), "hold": 1.0 + i % 5} for i in range(n)]
+
+
+def test_bajo_presupuesto_es_lista():
+    assert crear_registro({}, "grua_ops") == []
+    log = crear_registro({"max_registros_log": {"grua_ops": 100}}, "grua_ops", campos=("wait",))
+    for o in _ops(10):
+        log.append(o)
+    assert list(log) == _ops(10) and not log.truncado and n_total(log) == 10
+
+
+def test_truncado_agregados_exactos():
+    ops = _ops(1000)
+    log = RegistroAcotado(50, campos=("wait", "hold"), agrupar_por=("vuelta",))
+    for o in ops:
+        log.append(o)
+    assert len(log) == 50 and log.n == 1000 and log.truncado
+    assert all(o in ops for o in log)
+    assert agregar(log, ("wait", "hold")) == agregar(ops, ("wait", "hold"))
+    assert agregar(log, ("hold",), por="vuelta") == agregar(ops, ("hold",), por="vuelta")
+
+
+def test_motor_noche_totales_iguales_con_presupuesto():
+    cfg = dict(DEFAULT_CONFIG)
+    completo = simular_turno_prioridad_rng(3000, 2800, dict(cfg), seed=3)
+    cfg["max_registros_log"] = 50
+    acotado = simular_turno_prioridad_rng(3000, 2800, cfg, seed=3)
+    assert acotado["grua"] == completo["grua"]
+    assert acotado["turno_fin_real"] == completo["turno_fin_real"]
+    estado = acotado["registros_truncados"]["grua_ops"]
+    assert estado["n_muestra"] == 50 and estado["n_total"] == len(completo["grua_operaciones"])
+    assert completo["registros_truncados"] == {}
+    # eventos queda completo a propósito y se informa con el motivo
+    eventos = acotado["registros_truncados"]["eventos"]
+    assert not eventos["truncado"] and eventos["sin_acotar"]
+    assert eventos["n_total"] == eventos["n_muestra"] == len(completo["centro_eventos"])
+
+
+def test_servicio_aplica_presupuesto_por_defecto(tmp_path):
+    servicio = SimulationService(almacen=AlmacenCorridas(tmp_path / "corridas.sqlite"))
+    assert servicio.max_registros_log
+    servicio.max_registros_log = 50
+    resultado = servicio.run_night_simulation(cajas_facturadas=3000, cajas_piqueadas=2800, pickers=20,
+                                              grueros=4, chequeadores=4, parrilleros=6, seed=3)
+    assert resultado["registros_truncados"]["grua_ops"]["n_muestra"] == 50
+    assert len(resultado["grua_operaciones"]) == 50
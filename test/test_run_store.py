@@ -0,0 +1,107 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from app.services.run_store import AlmacenCorridas, huella_cfg
+from app.simulations.surrogate import ModeloSustituto
+from app.simulations.sweep import kpis_noche
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+
+
+def _correr(almacen, cajas, gruero, seed):
+    cfg = dict(DEFAULT_CONFIG, cap_gruero=gruero)
+    res = simular_turno_prioridad_rng(cajas, cajas - 200, cfg, seed=seed)
+    entradas = {"total_cajas_facturadas": cajas, "cajas_para_pick": cajas - 200, "cap_gruero": gruero}
+    return almacen.guardar(entradas, cfg, res, seed=seed), cfg, res
+
+
+def test_guardar_buscar_paginar_y_cache(tmp_path):
+    almacen = AlmacenCorridas(tmp_path / "corridas.sqlite")
+    id1, cfg, res = _correr(almacen, 3000, 4, seed=1)
+    _correr(almacen, 3000, 5, seed=1)
+    _correr(almacen, 2000, 4, seed=2)
+
+    encontradas = almacen.buscar({"total_cajas_facturadas": 3000, "cap_gruero": 4})
+    assert encontradas["total"] == 1 and encontradas["corridas"][0]["id"] == id1
+    assert encontradas["corridas"][0]["kpis"] == pytest.approx(kpis_noche(res), nan_ok=True)
+    assert almacen.buscar(limite=2)["total"] == 3 and len(almacen.buscar(limite=2)["corridas"]) == 2
+    with pytest.raises(ValueError):
+        almacen.buscar({"cap_patio": 3})
+
+    pagina = almacen.pagina(id1, "grua_operaciones", limite=3)
+    assert pagina["total"] == len(res["grua_operaciones"]) and len(pagina["registros"]) == 3
+
+    entradas = {"total_cajas_facturadas": 3000, "cajas_para_pick": 2800, "cap_gruero": 4}
+    assert almacen.buscar_cache(cfg, 1, entradas=entradas) == id1
+    assert almacen.buscar_cache(cfg, 9, entradas=entradas) is None
+    assert almacen.buscar_cache(cfg, None, entradas=entradas) is None
+    guardado = almacen.resultado(id1)
+    assert guardado["turno_fin_real"] == res["turno_fin_real"]
+    assert guardado["grua_operaciones"] == list(res["grua_operaciones"])
+
+    modelo = ModeloSustituto()
+    assert AlmacenCorridas(tmp_path / "corridas.sqlite").cargar_en_sustituto(modelo) == 3
+    assert modelo.n_observaciones == 3
+
+
+def test_pagina_con_cursor_filtros_y_orden(tmp_path):
+    almacen = AlmacenCorridas(tmp_path / "corridas.sqlite")
+    id1, _, res = _correr(almacen, 3000, 4, seed=1)
+    ops = res["grua_operaciones"]
+    camion = ops[0]["camion"]
+    esperado = [o for _, _, o in sorted((o["start"], i, o) for i, o in enumerate(ops)
+                                        if o["camion"] == camion and o["vuelta"] == 1 and o["start"] >= 5.0)]
+
+    vistos, cursor = [], None
+    while True:
+        p = almacen.pagina(id1, "grua_operaciones", cursor=cursor, limite=4, camion=camion, vuelta=1, t_desde=5.0)
+        vistos += p["registros"]
+        cursor = p["siguiente"]
+        if cursor is None:
+            break
+    assert vistos == esperado
+
+    ultimos = almacen.pagina(id1, "timeline", orden="desc", limite=2)["registros"]
+    assert [e["tiempo_min"] for e in ultimos] == sorted((e["tiempo_min"] for e in res["timeline"]), reverse=True)[:2]
+    with pytest.raises(ValueError):
+        almacen.pagina(id1, "timeline", cursor="no-es-un-cursor")
+    with pytest.raises(KeyError):
+        almacen.pagina("nada", "timeline")
+
+
+def test_huella_incluye_version_del_motor(monkeypatch):
+    import app.services.run_store as run_store
+    antes = huella_cfg({"cap_gruero": 4})
+    monkeypatch.setattr(run_store, "VERSION_MOTOR", run_store.VERSION_MOTOR + 1)
+    assert huella_cfg({"cap_gruero": 4}) != antes
+
+
+def test_retencion_poda_las_corridas_mas_viejas(tmp_path):
+    almacen = AlmacenCorridas(tmp_path / "corridas.sqlite", max_corridas=2)
+    ids = [_correr(almacen, 3000, 4, seed=s)[0] for s in (1, 2, 3)]
+    assert [c["id"] for c in almacen.buscar()["corridas"]] == ids[:0:-1]
+    with pytest.raises(KeyError):
+        almacen.resultado(ids[0])
+    assert not (tmp_path / "corridas" / ids[0]).exists()
+    assert almacen.podar(max_dias=-1) == 2 and almacen.buscar()["total"] == 0
+
+
+def test_escritura_en_fondo(tmp_path, monkeypatch):
+    almacen = AlmacenCorridas(tmp_path / "corridas.sqlite", escritura_en_fondo=True)
+    id1, cfg, res = _correr(almacen, 3000, 4, seed=1)
+    # la fila está en el acto (búsquedas y caché); el detalle se espera al leerlo
+    assert almacen.buscar_cache(cfg, 1, entradas={"total_cajas_facturadas": 3000, "cajas_para_pick": 2800,
+                                                  "cap_gruero": 4}) == id1
+    assert almacen.pagina(id1, "grua_operaciones", limite=5)["total"] == len(res["grua_operaciones"])
+    assert almacen.resultado(id1)["timeline"] == list(res["timeline"])
+
+    # si el detalle no se puede escribir, la corrida no queda a medias
+    def _falla(*args):
+        raise OSError("disco lleno")
+    monkeypatch.setattr(almacen, "_escribir_archivos_y_registros", _falla)
+    id2, _, _ = _correr(almacen, 3000, 5, seed=1)
+    almacen.esperar_escrituras()
+    assert almacen.obtener(id2) is None
+    with pytest.raises(KeyError):
+        almacen.resultado(id2)
@@ -0,0 +1,92 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+
+import pytest
+
+from app.services.scheduler import PlanificadorSimulaciones, Saturado
+
+
+def _correr(planificador, turnos, orden):
+    """Un hilo por turno: espera trabajador, anota el cliente y lo libera enseguida."""
+    def usar(turno):
+        with turno:
+            orden.append((turno.prioridad, turno.cliente))
+    hilos = [threading.Thread(target=usar, args=(t,)) for t in turnos]
+    for h in hilos:
+        h.start()
+    return hilos
+
+
+def test_prioridad_y_turnos_entre_clientes():
+    planificador = PlanificadorSimulaciones(capacidad=1, max_cola=20, max_por_cliente=10)
+    ocupa = planificador.reservar("x")
+    ocupa.__enter__()   # toma el único trabajador; los demás quedan esperando
+
+    turnos = ([planificador.reservar("a", "lote") for _ in range(3)] +
+              [planificador.reservar("a") for _ in range(4)] + [planificador.reservar("b") for _ in range(2)])
+    orden = []
+    hilos = _correr(planificador, turnos, orden)
+    while sum(t.esperando for t in turnos) < len(turnos):
+        time.sleep(0.01)
+    assert planificador.metricas()["en_cola"] == {"interactiva": 6, "lote": 3}
+
+    ocupa.cerrar()
+    for h in hilos:
+        h.join(5)
+    # 'a' no acapara al trabajador: se alterna con 'b' y el lote va al final
+    assert orden[:4] == [("interactiva", "a"), ("interactiva", "b"), ("interactiva", "a"), ("interactiva", "b")]
+    assert [p for p, _ in orden[6:]] == ["lote"] * 3
+    m = planificador.metricas()
+    assert m["en_cola_total"] == 0 and m["atendidos"] == 10 and m["espera_p95_s"] > 0
+
+
+def test_cola_llena_rechaza_con_reintento():
+    planificador = PlanificadorSimulaciones(capacidad=1, max_cola=3, max_por_cliente=2)
+    planificador.reservar("a"), planificador.reservar("a")
+    with pytest.raises(Saturado) as e:
+        planificador.reservar("a")
+    assert e.value.reintentar_s >= 1
+    descartado = planificador.reservar("b")
+    with pytest.raises(Saturado):
+        planificador.reservar("c")
+    descartado.cerrar()   # una reserva sin usar libera su lugar
+    planificador.reservar("c")
+    assert planificador.metricas()["rechazados"] == 2
+
+
+def test_espera_en_el_event_loop_sin_hilos():
+    import asyncio
+
+    planificador = PlanificadorSimulaciones(capacidad=1, max_cola=10, max_por_cliente=10)
+
+    async def escenario():
+        ocupa = planificador.reservar("x")
+        await ocupa.esperar()
+        hilos = threading.active_count()
+        orden = []
+
+        async def usar(turno):
+            await turno.esperar()
+            with turno:   # ya asignado: no vuelve a esperar
+                orden.append(turno.cliente)
+
+        turnos = [planificador.reservar(c) for c in ("a", "a", "b")]
+        tareas = [asyncio.create_task(usar(t)) for t in turnos]
+        cancelado = planificador.reservar("c")
+        espera_cancelada = asyncio.create_task(cancelado.esperar())
+        await asyncio.sleep(0.01)
+        assert threading.active_count() == hilos and planificador.metricas()["en_cola_total"] == 4
+
+        espera_cancelada.cancel()   # el cliente corta: la reserva se libera
+        await asyncio.sleep(0.01)
+        assert cancelado.cerrado and planificador.metricas()["en_cola_total"] == 3
+        ocupa.cerrar()
+        await asyncio.wait_for(asyncio.gather(*tareas), 5)
+        return orden
+
+    assert asyncio.run(escenario()) == ["a", "b", "a"]
+    m = planificador.metricas()
+    assert m["ocupados"] == {"interactiva": 0, "lote": 0} and m["atendidos"] == 4
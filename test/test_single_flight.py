@@ -0,0 +1,101 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import time
+
+import pytest
+
+from app.services import simulation_service as modulo
+from app.services.run_store import AlmacenCorridas
+from app.services.simulation_service import SimulationService
+from app.services.scheduler import PlanificadorSimulaciones, Saturado
+
+
+def test_pedidos_identicos_comparten_una_corrida(tmp_path, monkeypatch):
+    corridas = []
+    original = modulo.simular_turno_prioridad_rng
+
+    def contar(**kwargs):
+        corridas.append(kwargs["seed"])
+        time.sleep(0.2)   # deja llegar a los demás pedidos mientras corre
+        return original(**kwargs)
+
+    monkeypatch.setattr(modulo, "simular_turno_prioridad_rng", contar)
+    servicio = SimulationService(almacen=AlmacenCorridas(tmp_path / "corridas.sqlite"))
+    parametros = dict(cajas_facturadas=2000, cajas_piqueadas=1800, pickers=20, grueros=4,
+                      chequeadores=4, parrilleros=6, seed=7)
+
+    resultados = [None] * 4
+
+    def pedir(i):
+        resultados[i] = servicio.run_night_simulation(**parametros)
+
+    hilos = [threading.Thread(target=pedir, args=(i,)) for i in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert corridas == [7]
+    assert len({r["corrida_id"] for r in resultados}) == 1
+    assert sum(bool(r.get("compartida")) for r in resultados) == 3
+    assert servicio._en_vuelo == {}
+
+    # ya terminada, la misma corrida sale del almacén; con otra semilla se corre de nuevo
+    assert servicio.run_night_simulation(**parametros)["desde_cache"] is True
+    servicio.run_night_simulation(**dict(parametros, seed=8))
+    assert corridas == [7, 8]
+
+
+def test_seguidores_no_ocupan_turno_del_planificador(tmp_path, monkeypatch):
+    corridas, en_curso, seguir = [], threading.Event(), threading.Event()
+    original = modulo.simular_turno_prioridad_rng
+
+    def lenta(**kwargs):
+        corridas.append(kwargs["seed"])
+        en_curso.set()
+        seguir.wait(5)
+        return original(**kwargs)
+
+    monkeypatch.setattr(modulo, "simular_turno_prioridad_rng", lenta)
+    servicio = SimulationService(almacen=AlmacenCorridas(tmp_path / "corridas.sqlite"))
+    servicio.planificador = PlanificadorSimulaciones(capacidad=1, max_cola=10, max_por_cliente=10)
+    parametros = dict(cajas_facturadas=2000, cajas_piqueadas=1800, pickers=20, grueros=4,
+                      chequeadores=4, parrilleros=6, seed=7)
+
+    def pedir(cliente):
+        servicio.run_night_simulation(turno=servicio.reservar_turno(cliente), **parametros)
+
+    hilos = [threading.Thread(target=pedir, args=("a",))]
+    hilos[0].start()
+    assert en_curso.wait(5)
+    hilos += [threading.Thread(target=pedir, args=(c,)) for c in ("b", "c", "d")]
+    for h in hilos[1:]:
+        h.start()
+    # los que se suman a la corrida en curso liberan su reserva antes de esperarla
+    limite = time.monotonic() + 5
+    while servicio.planificador.metricas()["en_cola_total"] and time.monotonic() < limite:
+        time.sleep(0.01)
+    m = servicio.planificador.metricas()
+    assert m["en_cola_total"] == 0 and m["ocupados"]["interactiva"] == 1
+
+    seguir.set()
+    for h in hilos:
+        h.join(10)
+    assert corridas == [7]
+    assert servicio.planificador.metricas()["ocupados"]["interactiva"] == 0
+
+
+def test_sin_turno_se_reserva_antes_de_simular(tmp_path):
+    servicio = SimulationService(almacen=AlmacenCorridas(tmp_path / "corridas.sqlite"))
+    parametros = dict(cajas_facturadas=2000, cajas_piqueadas=1800, pickers=20, grueros=4,
+                      chequeadores=4, parrilleros=6, seed=7)
+    servicio.run_night_simulation(**parametros)
+
+    servicio.planificador = PlanificadorSimulaciones(capacidad=1, max_cola=1, max_por_cliente=1)
+    servicio.reservar_turno("otro")   # llena la cola
+    # lo guardado no necesita trabajador; lo que hay que simular pasa por la admisión
+    assert servicio.run_night_simulation(**parametros)["desde_cache"] is True
+    with pytest.raises(Saturado):
+        servicio.run_night_simulation(**dict(parametros, seed=8))
@@ -0,0 +1,60 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+import pytest
+
+from app.simulations.surrogate import ModeloSustituto
+
+
+def _f(cajas, pickers):
+    return 30.0 + 0.004 * cajas - 4.0 * pickers + 0.5 * pickers ** 2
+
+
+def _modelo(**kwargs):
+    modelo = ModeloSustituto(**kwargs)
+    for cajas in np.linspace(3000, 6000, 7):
+        for pickers in range(4, 10):
+            modelo.agregar({"total_cajas_facturadas": cajas, "cajas_para_pick": 2800, "cap_picker": pickers},
+                           {"overrun_total_min": _f(cajas, pickers), "vueltas": 2})
+    return modelo
+
+
+def test_ajuste_y_prediccion_sobre_funcion_conocida():
+    modelo = _modelo(entrenar_en_fondo=False)
+    consulta = {"total_cajas_facturadas": 4250, "cajas_para_pick": 2800, "cap_picker": 6.5}
+    # las consultas no entrenan: sin entrenar() no hay modelo
+    assert modelo.predecir(consulta) == {} and not modelo.en_dominio(consulta)
+
+    assert modelo.entrenar()
+    pred = modelo.predecir(consulta)
+    assert pred["overrun_total_min"]["media"] == pytest.approx(_f(4250, 6.5), abs=0.5)
+    assert pred["overrun_total_min"]["std"] < 1.0
+    # KPI constante: sin GP, media exacta
+    assert pred["vueltas"] == {"media": 2.0, "std": 0.0, "std_relativa": 0.0}
+
+
+def test_entrenamiento_de_fondo():
+    modelo = _modelo()
+    assert modelo.esperar_entrenamiento(timeout=60)
+    assert modelo.n_entrenado == modelo.n_observaciones
+    assert "overrun_total_min" in modelo.predecir({"total_cajas_facturadas": 4000, "cap_picker": 5})
+
+
+def test_en_dominio_rechaza_fuera_de_la_caja_observada():
+    modelo = _modelo(entrenar_en_fondo=False)
+    modelo.entrenar()
+    assert modelo.en_dominio({"total_cajas_facturadas": 4000, "cajas_para_pick": 2800, "cap_picker": 5})
+    assert not modelo.en_dominio({"total_cajas_facturadas": 20000, "cajas_para_pick": 2800, "cap_picker": 5})
+    # dimensión sin variación al entrenar: debe coincidir
+    assert not modelo.en_dominio({"total_cajas_facturadas": 4000, "cajas_para_pick": 2000, "cap_picker": 5})
+
+
+def test_fuera_de_dominio_corre_la_simulacion_real():
+    modelo = _modelo(entrenar_en_fondo=False)
+    modelo.entrenar()
+    n = modelo.n_observaciones
+    out = modelo.consultar({"total_cajas_facturadas": 2000, "cajas_para_pick": 1800, "cap_picker": 5}, seed=3)
+    assert out["fuente"] == "simulacion" and out["motivo"] == "fuera_de_dominio"
+    assert out["kpis"]["overrun_total_min"]["std"] == 0.0
+    assert modelo.n_observaciones == n + 1
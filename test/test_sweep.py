@@ -0,0 +1,82 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from app.simulations.sweep import ejecutar_barrido, disenar_barrido, guardar_cubo, cargar_cubo
+
+
+def test_barrido_grid_forma_y_checkpoint(tmp_path):
+    ejes = {"total_cajas_facturadas": [1500, 3000], "p_defecto": [0.0, 0.2]}
+    ckpt = tmp_path / "ckpt"
+
+    cubo = ejecutar_barrido(ejes, replicas=2, semilla=7, total_cajas_facturadas=3000,
+                            cajas_para_pick=2000, max_workers=0, checkpoint_dir=str(ckpt))
+    assert cubo["forma"] == (2, 2, 2)
+    assert cubo["kpis"]["overrun_total_min"].dtype == np.float32
+    assert not np.isnan(cubo["kpis"]["fin_real_min"]).any()
+
+    # Reanudar: todos los puntos vienen del checkpoint y el cubo es idéntico
+    lineas = (ckpt / "puntos.jsonl").read_text().splitlines()
+    assert len(lineas) == 8
+    otra = ejecutar_barrido(ejes, replicas=2, semilla=7, total_cajas_facturadas=3000,
+                            cajas_para_pick=2000, max_workers=0, checkpoint_dir=str(ckpt))
+    assert len((ckpt / "puntos.jsonl").read_text().splitlines()) == 8
+    np.testing.assert_array_equal(otra["kpis"]["fin_real_min"], cubo["kpis"]["fin_real_min"])
+
+    ruta = tmp_path / "cubo.npz"
+    guardar_cubo(cubo, str(ruta))
+    leido = cargar_cubo(str(ruta))
+    assert leido["ejes"] == ["total_cajas_facturadas", "p_defecto"]
+    np.testing.assert_array_equal(leido["kpis"]["vueltas"], cubo["kpis"]["vueltas"])
+
+
+def test_hipercubo_latino_respeta_rangos():
+    nombres, forma, puntos = disenar_barrido(
+        {"p_defecto": (0.0, 0.1), "capacidad_pallets_camion": (8, 20)}, diseno="lhs", n_puntos=10, semilla=1
+    )
+    assert forma == (10,)
+    assert all(0.0 <= p["p_defecto"] < 0.1 for p in puntos)
+    # rango entero: conserva el ancho del valor base (10, 16)
+    assert all(b - a == 6 for a, b in (p["capacidad_pallets_camion"] for p in puntos))
+    # un punto por estrato
+    estratos = sorted(int(p["p_defecto"] / 0.01) for p in puntos)
+    assert estratos == list(range(10))
+
+
+def test_eje_de_dotacion_del_dia_llega_a_los_turnos():
+    ejes = {"dia.cap_gruero": [1, 6]}
+    cubo = ejecutar_barrido(ejes, modo="ciclo", replicas=1, semilla=3, total_cajas_facturadas=20000,
+                            cajas_para_pick=19000, max_workers=0)
+    ocup = cubo["kpis"]["dia_ocup_grueros"][:, 0]
+    # con 1 gruero todo el día la grúa está mucho más ocupada que con 6
+    assert ocup[0] > ocup[1]
+
+
+def test_poda_analitica_no_simula_escenarios_infactibles(tmp_path, monkeypatch):
+    import json
+    from app.simulations import sweep
+    from app.simulations.night.config import DEFAULT_CONFIG
+    from app.simulations.night.queueing import estimar_cargas_noche
+
+    # 200k cajas con la dotación base: el overrun mínimo analítico supera por mucho el umbral
+    assert estimar_cargas_noche(200000, 180000, DEFAULT_CONFIG, seed=7)["overrun_minimo_min"] > 60
+    evaluados = []
+    original = sweep._evaluar_punto
+
+    def contar(tarea):
+        evaluados.append(tarea[4])
+        return original(tarea)
+
+    monkeypatch.setattr(sweep, "_evaluar_punto", contar)
+    ejes = {"total_cajas_facturadas": [3000, 200000]}
+    ckpt = tmp_path / "ckpt"
+    cubo = ejecutar_barrido(ejes, replicas=2, semilla=7, total_cajas_facturadas=3000, cajas_para_pick=2700,
+                            max_workers=0, checkpoint_dir=str(ckpt), podar_overrun_min=60)
+
+    assert cubo["podados"].tolist() == [False, True]
+    assert evaluados == [3000, 3000]   # sólo las réplicas del punto factible
+    assert not np.isnan(cubo["kpis"]["fin_real_min"][0]).any()
+    assert np.isnan(cubo["kpis"]["fin_real_min"][1]).all()
+    spec = json.loads((ckpt / "manifest.json").read_text())["spec"]
+    assert spec["podar_overrun_min"] == 60
@@ -0,0 +1,23 @@
+import sys, os, json
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+from app.simulations.trace_export import asignar_carriles
+
+
+def test_asignar_carriles_reutiliza_unidades_libres():
+    orden, carriles = asignar_carriles([0, 1, 2, 5, 5.5], [3, 4, 5, 6, 7])
+    assert list(carriles) == [0, 1, 2, 0, 1]
+
+
+def test_traza_noche_una_pista_por_unidad(tmp_path):
+    ruta = tmp_path / "noche.json"
+    cfg = dict(DEFAULT_CONFIG, cap_gruero=3)
+    r = simular_turno_prioridad_rng(3000, 2000, cfg, seed=5, traza=str(ruta))
+    assert r["traza"] == str(ruta)
+
+    eventos = json.loads(ruta.read_text())["traceEvents"]
+    pistas = {e["args"]["name"] for e in eventos if e["name"] == "thread_name"}
+    assert 0 < sum(p.startswith("grueros #") for p in pistas) <= 3
+    slices = [e for e in eventos if e["ph"] == "X" and e["cat"] == "grueros"]
+    assert len(slices) == len(r["grua_operaciones"])
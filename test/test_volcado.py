@@ -0,0 +1,68 @@
+import sys, os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from app.simulations.volcado import VolcadoRegistros, leer_registros
+from app.simulations.night import simular_turno_prioridad_rng, DEFAULT_CONFIG
+
+
+@pytest.mark.parametrize("formato,comprimir", [("jsonl", False), ("csv", True), ("bin", True)])
+def test_sumideros_ida_y_vuelta(tmp_path, formato, comprimir):
+    volcado = VolcadoRegistros(tmp_path, formato=formato, comprimir=comprimir, buffer_registros=7)
+    s = volcado.sumidero("ops")
+    for i in range(20):
+        s.escribir({"vuelta": i % 3, "label": f"op{i}", "wait": i * 0.5})
+    s.escribir(("GET", 1.5))
+    info = volcado.cerrar()["ops"]
+    assert info["registros"] == 21 and info["ruta"].endswith(formato + (".gz" if comprimir else ""))
+    filas = list(leer_registros(info["ruta"]))
+    assert len(filas) == 21
+    assert filas[3]["label"] == "op3" and float(filas[3]["wait"]) == 1.5
+
+
+def test_motor_noche_vuelca_logs_completos(tmp_path):
+    completo = simular_turno_prioridad_rng(3000, 2800, dict(DEFAULT_CONFIG), seed=3)
+    cfg = dict(DEFAULT_CONFIG, volcado_registros={"directorio": str(tmp_path), "max_en_memoria": 40})
+    volcado = simular_turno_prioridad_rng(3000, 2800, cfg, seed=3)
+    assert volcado["grua"] == completo["grua"]
+    assert len(volcado["grua_operaciones"]) == 40
+    manifiesto = volcado["registros_en_disco"]
+    grua = list(leer_registros(manifiesto["grua_ops"]["ruta"]))
+    assert grua == list(completo["grua_operaciones"])
+    assert manifiesto["eventos"]["registros"] == len(volcado["centro_eventos"]) == len(completo["centro_eventos"])
+
+
+def test_sumidero_base_es_abstracto(tmp_path):
+    from app.simulations.volcado import Sumidero
+    with pytest.raises(TypeError):
+        Sumidero(tmp_path / "x.jsonl")
+
+
+def test_servicio_poda_logs_y_borra_los_de_corridas_fallidas(tmp_path, monkeypatch):
+    import app.services.simulation_service as servicio_mod
+    from app.services.run_store import AlmacenCorridas
+
+    servicio = servicio_mod.SimulationService(directorio_registros=str(tmp_path / "logs"),
+                                              almacen=AlmacenCorridas(tmp_path / "corridas.sqlite"))
+    servicio.max_registros = 1
+    parametros = dict(cajas_facturadas=2000, cajas_piqueadas=1800, pickers=20, grueros=4,
+                      chequeadores=4, parrilleros=6, seed=3)
+    ids = [servicio.run_night_simulation_con_registros(**parametros)["registros_en_disco"]["id"] for _ in range(2)]
+    assert sorted(os.listdir(tmp_path / "logs")) == [ids[1]] and list(servicio.registros_en_disco) == [ids[1]]
+    assert os.path.exists(servicio.ruta_registro(ids[1], "noche_grua_ops.jsonl.gz"))
+    with pytest.raises(KeyError):
+        servicio.ruta_registro(ids[0], "noche_grua_ops.jsonl.gz")
+
+    # vencidos: no se sirven y se borran en la próxima corrida
+    servicio.registros_ttl_s = 0
+    with pytest.raises(KeyError):
+        servicio.ruta_registro(ids[1], "noche_grua_ops.jsonl.gz")
+
+    def _falla(**kwargs):
+        os.makedirs(kwargs["cfg"]["volcado_registros"]["directorio"])
+        raise RuntimeError("motor")
+    monkeypatch.setattr(servicio_mod, "simular_turno_prioridad_rng", _falla)
+    with pytest.raises(Exception, match="motor"):
+        servicio.run_night_simulation_con_registros(**parametros)
+    assert os.listdir(tmp_path / "logs") == [] and not servicio.registros_en_disco